@@ -0,0 +1,36 @@
+"""Add per-stage timings, byte volume and latency histogram to ingestion_runs.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STAGE_COLUMNS = ("fetch_ms", "parse_ms", "write_ms", "flush_ms", "ack_ms")
+
+
+def upgrade() -> None:
+    for name in STAGE_COLUMNS:
+        op.add_column("ingestion_runs", sa.Column(name, sa.Integer(), server_default="0", nullable=False))
+    op.add_column("ingestion_runs", sa.Column("bytes_ingested", sa.BigInteger(), server_default="0", nullable=False))
+    op.add_column("ingestion_runs", sa.Column("latency_histogram", JSONB, nullable=True))
+    op.add_column("ingestion_runs", sa.Column("latency_samples", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("ingestion_runs", sa.Column("latency_sum_ms", sa.BigInteger(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("ingestion_runs", "latency_sum_ms")
+    op.drop_column("ingestion_runs", "latency_samples")
+    op.drop_column("ingestion_runs", "latency_histogram")
+    op.drop_column("ingestion_runs", "bytes_ingested")
+    for name in reversed(STAGE_COLUMNS):
+        op.drop_column("ingestion_runs", name)
@@ -0,0 +1,87 @@
+"""Convert audit_events into a monthly range-partitioned table.
+
+The old heap is renamed, a partitioned audit_events is created with one
+partition per month from the oldest event through three months ahead plus a
+DEFAULT catch-all, and the rows are copied across. (tenant_id, timestamp DESC)
+is declared on the parent, so every partition gets its own copy of the index.
+Later months are added by app/workers/audit_maintenance.py.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, tenant_id, timestamp, actor_user_id, action, entity_type, entity_id, metadata"
+
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    m date := date_trunc('month', COALESCE((SELECT min(timestamp) FROM audit_events_legacy), now()))::date;
+    last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+BEGIN
+    WHILE m <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF audit_events FOR VALUES FROM (%L) TO (%L)',
+            'audit_events_p' || to_char(m, 'YYYYMM'), m, (m + interval '1 month')::date
+        );
+        m := (m + interval '1 month')::date;
+    END LOOP;
+END $$
+"""
+
+
+def _audit_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", UUID(as_uuid=True), nullable=False),
+        sa.Column("tenant_id", UUID(as_uuid=True), sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("actor_user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("action", sa.String(100), nullable=False),
+        sa.Column("entity_type", sa.String(50), server_default=""),
+        sa.Column("entity_id", sa.String(100), server_default=""),
+        sa.Column("metadata", JSONB, nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    op.drop_index("ix_audit_events_tenant_id", table_name="audit_events")
+    op.drop_index("ix_audit_events_timestamp", table_name="audit_events")
+    op.rename_table("audit_events", "audit_events_legacy")
+    op.execute("ALTER TABLE audit_events_legacy RENAME CONSTRAINT audit_events_pkey TO audit_events_legacy_pkey")
+
+    op.create_table(
+        "audit_events",
+        *_audit_columns(),
+        sa.PrimaryKeyConstraint("id", "timestamp"),
+        postgresql_partition_by="RANGE (timestamp)",
+    )
+    op.create_index(
+        "ix_audit_events_tenant_timestamp", "audit_events", ["tenant_id", "timestamp"],
+        postgresql_ops={"timestamp": "DESC"},
+    )
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute("CREATE TABLE audit_events_default PARTITION OF audit_events DEFAULT")
+
+    op.execute(f"INSERT INTO audit_events ({COLUMNS}) SELECT {COLUMNS} FROM audit_events_legacy")
+    op.drop_table("audit_events_legacy")
+
+
+def downgrade() -> None:
+    op.rename_table("audit_events", "audit_events_partitioned")
+    op.create_table("audit_events", *_audit_columns(), sa.PrimaryKeyConstraint("id", name="audit_events_pkey_plain"))
+    op.execute(f"INSERT INTO audit_events ({COLUMNS}) SELECT {COLUMNS} FROM audit_events_partitioned")
+    # Dropping the parent drops every attached partition; detached ones are left for the operator.
+    op.drop_table("audit_events_partitioned")
+    op.execute("ALTER TABLE audit_events RENAME CONSTRAINT audit_events_pkey_plain TO audit_events_pkey")
+    op.create_index("ix_audit_events_tenant_id", "audit_events", ["tenant_id"])
+    op.create_index("ix_audit_events_timestamp", "audit_events", ["timestamp"])
@@ -0,0 +1,41 @@
+"""Composite indexes for keyset pagination of the audit log.
+
+(tenant_id, timestamp DESC, id DESC) INCLUDE (action, entity_type) matches the
+list order and cursor predicate, replacing the (tenant_id, timestamp DESC)
+index from 004. (tenant_id, action, timestamp DESC, id DESC) serves the action
+filter. Both are created on the partitioned parent and cascade to every partition.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_audit_events_tenant_ts_id", "audit_events", ["tenant_id", "timestamp", "id"],
+        postgresql_ops={"timestamp": "DESC", "id": "DESC"},
+        postgresql_include=["action", "entity_type"],
+    )
+    op.create_index(
+        "ix_audit_events_tenant_action_ts_id", "audit_events", ["tenant_id", "action", "timestamp", "id"],
+        postgresql_ops={"timestamp": "DESC", "id": "DESC"},
+    )
+    op.drop_index("ix_audit_events_tenant_timestamp", table_name="audit_events")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_audit_events_tenant_timestamp", "audit_events", ["tenant_id", "timestamp"],
+        postgresql_ops={"timestamp": "DESC"},
+    )
+    op.drop_index("ix_audit_events_tenant_action_ts_id", table_name="audit_events")
+    op.drop_index("ix_audit_events_tenant_ts_id", table_name="audit_events")
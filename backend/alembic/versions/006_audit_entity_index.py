@@ -0,0 +1,24 @@
+"""Index audit events by entity for history lookups.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_audit_events_tenant_entity_ts", "audit_events", ["tenant_id", "entity_type", "entity_id", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_events_tenant_entity_ts", table_name="audit_events")
@@ -0,0 +1,25 @@
+"""GIN (jsonb_path_ops) index on audit_events.metadata for containment search.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_audit_events_metadata", "audit_events", ["metadata"],
+        postgresql_using="gin", postgresql_ops={"metadata": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_events_metadata", table_name="audit_events")
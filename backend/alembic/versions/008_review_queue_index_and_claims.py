@@ -0,0 +1,33 @@
+"""Partial index for the review queue and claim columns on invoices.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("invoices", sa.Column("claimed_by_user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True))
+    op.add_column("invoices", sa.Column("claimed_until", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_invoices_review_queue", "invoices", ["tenant_id", "created_at"],
+        postgresql_ops={"created_at": "DESC"},
+        postgresql_include=["source"],
+        postgresql_where=sa.text("status IN ('NEW', 'VALIDATED', 'APPROVAL_PENDING')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoices_review_queue", table_name="invoices")
+    op.drop_column("invoices", "claimed_until")
+    op.drop_column("invoices", "claimed_by_user_id")
@@ -0,0 +1,30 @@
+"""pg_trgm GIN indexes for invoice vendor, number and email search.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_COLUMNS = ("vendor", "invoice_number", "email_subject", "email_from")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for col in TRIGRAM_COLUMNS:
+        op.create_index(
+            f"ix_invoices_{col}_trgm", "invoices", [col],
+            postgresql_using="gin", postgresql_ops={col: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    for col in TRIGRAM_COLUMNS:
+        op.drop_index(f"ix_invoices_{col}_trgm", table_name="invoices")
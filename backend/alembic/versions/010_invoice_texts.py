@@ -0,0 +1,40 @@
+"""invoice_texts: extracted file text with a GIN-indexed tsvector for full-text search.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "invoice_texts",
+        sa.Column("invoice_id", UUID(as_uuid=True), sa.ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("tenant_id", UUID(as_uuid=True), sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("file_path", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False, server_default=""),
+        sa.Column("page_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("extracted_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "search_vector", TSVECTOR(), sa.Computed("to_tsvector('simple', content)", persisted=True), nullable=False,
+        ),
+    )
+    op.create_index("ix_invoice_texts_tenant_id", "invoice_texts", ["tenant_id"])
+    op.create_index("ix_invoice_texts_search_vector", "invoice_texts", ["search_vector"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoice_texts_search_vector", table_name="invoice_texts")
+    op.drop_index("ix_invoice_texts_tenant_id", table_name="invoice_texts")
+    op.drop_table("invoice_texts")
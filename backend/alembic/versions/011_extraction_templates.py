@@ -0,0 +1,38 @@
+"""extraction_templates: learned per-sender / per-vendor field extraction layouts.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "extraction_templates",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("tenant_id", UUID(as_uuid=True), sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("sender_domain", sa.String(255), nullable=False, server_default=""),
+        sa.Column("vendor", sa.String(255), nullable=False, server_default=""),
+        sa.Column("patterns", JSONB(), nullable=False, server_default="{}"),
+        sa.Column("constants", JSONB(), nullable=False, server_default="{}"),
+        sa.Column("positions", JSONB(), nullable=False, server_default="{}"),
+        sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("misses", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("tenant_id", "sender_domain", "vendor", name="uq_extraction_templates_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("extraction_templates")
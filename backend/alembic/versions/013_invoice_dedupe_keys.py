@@ -0,0 +1,32 @@
+"""invoices.dedupe_key / content_sha256 with partial indexes for duplicate detection.
+
+Existing rows keep NULL until app.services.dedupe.sweep_duplicates backfills them
+(scripts/sweep_duplicates.py).
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEDUPE_COLUMNS = ("dedupe_key", "content_sha256")
+
+
+def upgrade() -> None:
+    for col in DEDUPE_COLUMNS:
+        op.add_column("invoices", sa.Column(col, sa.String(64), nullable=True))
+        op.create_index(f"ix_invoices_{col}", "invoices", ["tenant_id", col], postgresql_where=sa.text(f"{col} <> ''"))
+
+
+def downgrade() -> None:
+    for col in DEDUPE_COLUMNS:
+        op.drop_index(f"ix_invoices_{col}", table_name="invoices")
+        op.drop_column("invoices", col)
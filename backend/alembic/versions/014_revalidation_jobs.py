@@ -0,0 +1,42 @@
+"""revalidation_jobs: chunked re-checks of open invoices after a tenant settings change.
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision: str = "014"
+down_revision: Union[str, None] = "013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revalidation_jobs",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("tenant_id", UUID(as_uuid=True), sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("settings_version", sa.Integer(), nullable=False),
+        sa.Column("requested_by_user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="PENDING"),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("processed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("exceptions_resolved", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("exceptions_created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_invoice_id", UUID(as_uuid=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_revalidation_jobs_tenant_id", "revalidation_jobs", ["tenant_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revalidation_jobs_tenant_id", table_name="revalidation_jobs")
+    op.drop_table("revalidation_jobs")
@@ -0,0 +1,69 @@
+"""Open-exception partial index and trigger-maintained exception counters.
+
+Adds invoices.exception_count / open_exception_count and tenant_exception_stats,
+kept current by statement-level triggers on invoice_exceptions, and backfills
+both from the existing rows.
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+# Frozen DDL shared with create_all, so migrated and freshly created databases get the same triggers
+from app.db.ddl.exception_counters import DROP_STATEMENTS, STATEMENTS
+
+revision: str = "015"
+down_revision: Union[str, None] = "014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("invoices", sa.Column("exception_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("invoices", sa.Column("open_exception_count", sa.Integer(), nullable=False, server_default="0"))
+    op.create_table(
+        "tenant_exception_stats",
+        sa.Column("tenant_id", UUID(as_uuid=True), sa.ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("total_exceptions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("open_exceptions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("invoices_with_exceptions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("invoices_with_open_exceptions", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_invoice_exceptions_open", "invoice_exceptions", ["tenant_id", "code", "invoice_id"],
+        postgresql_where=sa.text("resolved_at IS NULL"),
+    )
+
+    # Backfill before the triggers exist, so the existing rows are counted exactly once
+    op.execute("""
+        UPDATE invoices i SET exception_count = c.n_total, open_exception_count = c.n_open
+        FROM (
+            SELECT invoice_id, count(*) AS n_total, count(*) FILTER (WHERE resolved_at IS NULL) AS n_open
+            FROM invoice_exceptions GROUP BY invoice_id
+        ) c
+        WHERE i.id = c.invoice_id
+    """)
+    op.execute("""
+        INSERT INTO tenant_exception_stats
+            (tenant_id, total_exceptions, open_exceptions, invoices_with_exceptions, invoices_with_open_exceptions)
+        SELECT tenant_id, sum(exception_count), sum(open_exception_count),
+            count(*) FILTER (WHERE exception_count > 0), count(*) FILTER (WHERE open_exception_count > 0)
+        FROM invoices GROUP BY tenant_id
+    """)
+
+    for statement in STATEMENTS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DROP_STATEMENTS:
+        op.execute(statement)
+    op.drop_index("ix_invoice_exceptions_open", table_name="invoice_exceptions")
+    op.drop_table("tenant_exception_stats")
+    op.drop_column("invoices", "open_exception_count")
+    op.drop_column("invoices", "exception_count")
@@ -0,0 +1,40 @@
+"""Composite (tenant_id, date) indexes for invoices, payments and invoice_exceptions.
+
+Hot queries filter by tenant plus a date range (and for invoices often a
+status). These replace the single-column tenant_id indexes from 001, which
+every new index leads with.
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "016"
+down_revision: Union[str, None] = "015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_invoices_tenant_status_created", "invoices", ["tenant_id", "status", "created_at"]),
+    ("ix_invoices_tenant_created", "invoices", ["tenant_id", "created_at"]),
+    ("ix_payments_tenant_paid_at", "payments", ["tenant_id", "paid_at"]),
+    ("ix_invoice_exceptions_tenant_created", "invoice_exceptions", ["tenant_id", "created_at"]),
+)
+REPLACED = ("invoices", "payments", "invoice_exceptions")
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for table in REPLACED:
+        op.drop_index(f"ix_{table}_tenant_id", table_name=table)
+
+
+def downgrade() -> None:
+    for table in REPLACED:
+        op.create_index(f"ix_{table}_tenant_id", table, ["tenant_id"])
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
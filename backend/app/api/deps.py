@@ -1,17 +1,28 @@
 """Authentication and RBAC dependencies."""
+import ipaddress
 import uuid
 from collections.abc import Callable
 
 from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.security import decode_access_token
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.user import User
 
 
 def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     """Extract and validate JWT from Authorization header or cookie."""
+    return _authenticate(request, db)
+
+
+def get_current_read_user(request: Request, db: Session = Depends(get_read_db)) -> User:
+    """get_current_user for read-only endpoints: looks the user up through the endpoint's get_read_db session."""
+    return _authenticate(request, db)
+
+
+def _authenticate(request: Request, db: Session) -> User:
     token: str | None = None
 
     auth_header = request.headers.get("Authorization")
@@ -39,10 +50,14 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     return user
 
 
-def require_roles(*roles: str) -> Callable:
-    """Dependency factory: restricts endpoint to users with one of the given roles."""
+def require_roles(*roles: str, reader: bool = False) -> Callable:
+    """Dependency factory: restricts endpoint to users with one of the given roles.
 
-    def _check(current_user: User = Depends(get_current_user)) -> User:
+    reader=True authenticates through get_read_db, for read-only endpoints.
+    """
+    user_dependency = get_current_read_user if reader else get_current_user
+
+    def _check(current_user: User = Depends(user_dependency)) -> User:
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -51,3 +66,18 @@ def require_roles(*roles: str) -> Callable:
         return current_user
 
     return _check
+
+
+def require_metrics_client(request: Request):
+    """GET /metrics guard: Prometheus scrapers carry no user token, so allow by client network instead.
+
+    An empty METRICS_ALLOWED_NETWORKS lets every client through.
+    """
+    if not settings.METRICS_ALLOWED_NETWORKS:
+        return
+    try:
+        address = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        address = None
+    if address is None or not any(address in ipaddress.ip_network(n) for n in settings.METRICS_ALLOWED_NETWORKS):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Client may not scrape metrics")
@@ -0,0 +1,50 @@
+"""Opaque keyset cursors for endpoints that page on (timestamp, id) or (rank, id) rather than OFFSET."""
+import base64
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_ESTIMATE_HEADER = "X-Total-Estimate"
+
+
+def _encode(key: str, row_id: uuid.UUID) -> str:
+    raw = f"{key}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> tuple[str, uuid.UUID]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    key, _, row_id = base64.urlsafe_b64decode(padded).decode().partition("|")
+    return key, uuid.UUID(row_id)
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(timestamp: datetime, row_id: uuid.UUID) -> str:
+    return _encode(timestamp.isoformat(), row_id)
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; a tampered or truncated cursor is a 400, not a 500."""
+    try:
+        ts, row_id = _decode(cursor)
+        return datetime.fromisoformat(ts), row_id
+    except ValueError:
+        raise _invalid_cursor() from None
+
+
+def encode_rank_cursor(rank: float, row_id: uuid.UUID) -> str:
+    # repr() round-trips the float exactly, so the next page resumes at the same rank
+    return _encode(repr(rank), row_id)
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        rank, row_id = _decode(cursor)
+        return float(rank), row_id
+    except ValueError:
+        raise _invalid_cursor() from None
@@ -2,14 +2,16 @@
 from datetime import UTC, date, datetime, timedelta
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, case, extract
+from sqlalchemy import Integer, cast, func, case, extract, true
+from sqlalchemy.dialects.postgresql import array
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.deps import get_current_read_user
+from app.db.session import get_read_db
 from app.models.approval import Approval
 from app.models.audit_event import AuditEvent
-from app.models.ingestion_run import IngestionRun
+from app.models.exception_stats import TenantExceptionStats
+from app.models.ingestion_run import LATENCY_BUCKETS_MS, IngestionRun
 from app.models.invoice import Invoice, InvoiceStatus
 from app.models.invoice_exception import InvoiceException
 from app.models.payment import Payment
@@ -28,28 +30,33 @@ def _parse_date(s: str | None, default_days_ago: int = 90) -> date:
 
 
 @router.get("/overview")
-def overview(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def overview(db: Session = Depends(get_read_db), current_user: User = Depends(get_current_read_user)):
     tid = current_user.tenant_id
-    total = db.query(func.count(Invoice.id)).filter(Invoice.tenant_id == tid).scalar() or 0
     by_status = (
         db.query(Invoice.status, func.count(Invoice.id))
         .filter(Invoice.tenant_id == tid)
         .group_by(Invoice.status)
         .all()
     )
+    total = sum(c for _, c in by_status)
     total_paid = (
         db.query(func.sum(Payment.paid_amount))
         .filter(Payment.tenant_id == tid)
         .scalar()
     ) or 0
-    total_exceptions = db.query(func.count(InvoiceException.id)).filter(InvoiceException.tenant_id == tid).scalar() or 0
-    clean_invoices = total - db.query(func.count(func.distinct(InvoiceException.invoice_id))).filter(InvoiceException.tenant_id == tid).scalar()
+    # Trigger-maintained rollup (app/models/exception_stats.py); no row yet means no exceptions
+    stats = db.get(TenantExceptionStats, tid) or TenantExceptionStats(
+        total_exceptions=0, open_exceptions=0, invoices_with_exceptions=0, invoices_with_open_exceptions=0,
+    )
+    clean_invoices = total - stats.invoices_with_exceptions
 
     return {
         "total_invoices": total,
         "by_status": {s: c for s, c in by_status},
         "total_paid": float(total_paid),
-        "total_exceptions": total_exceptions,
+        "total_exceptions": stats.total_exceptions,
+        "open_exceptions": stats.open_exceptions,
+        "invoices_with_open_exceptions": stats.invoices_with_open_exceptions,
         "clean_invoice_count": max(0, clean_invoices),
         "clean_invoice_pct": round(max(0, clean_invoices) / total * 100, 1) if total > 0 else 0,
     }
@@ -59,8 +66,8 @@ def overview(db: Session = Depends(get_db), current_user: User = Depends(get_cur
 def payment_analytics(
     from_date: str | None = None,
     to_date: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     tid = current_user.tenant_id
     fd = _parse_date(from_date, 180)
@@ -112,8 +119,8 @@ def payment_analytics(
 def effectiveness_analytics(
     from_date: str | None = None,
     to_date: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     tid = current_user.tenant_id
     fd = _parse_date(from_date, 180)
@@ -172,10 +179,11 @@ def effectiveness_analytics(
     )
 
     # Clean invoice percentage
-    total_inv = db.query(func.count(Invoice.id)).filter(Invoice.tenant_id == tid, Invoice.created_at.between(fd_dt, td_dt)).scalar() or 0
-    inv_with_exc = db.query(func.count(func.distinct(InvoiceException.invoice_id))).filter(
-        InvoiceException.tenant_id == tid, InvoiceException.created_at.between(fd_dt, td_dt)
-    ).scalar() or 0
+    in_range = db.query(
+        func.count(Invoice.id).label("total"),
+        func.count(Invoice.id).filter(Invoice.exception_count > 0).label("with_exceptions"),
+    ).filter(Invoice.tenant_id == tid, Invoice.created_at.between(fd_dt, td_dt)).one()
+    total_inv, inv_with_exc = in_range.total, in_range.with_exceptions
 
     return {
         "exception_rate_over_time": [
@@ -193,8 +201,8 @@ def effectiveness_analytics(
 def ingestion_analytics(
     from_date: str | None = None,
     to_date: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     tid = current_user.tenant_id
     fd = _parse_date(from_date, 90)
@@ -248,12 +256,105 @@ def ingestion_analytics(
     }
 
 
+INGESTION_STAGES = ("fetch", "parse", "write", "flush", "ack")
+# Upper bounds (ms) for the per-run stage duration histograms
+STAGE_BUCKETS_MS = (10, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 30_000)
+
+
+@router.get("/ingestion/performance")
+def ingestion_performance(
+    from_date: str | None = None,
+    to_date: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
+):
+    """Where ingestion time goes: per-stage rollups, throughput and email-to-invoice latency."""
+    tid = current_user.tenant_id
+    fd = _parse_date(from_date, 7)
+    td = _parse_date(to_date, 0) if to_date else date.today()
+    fd_dt = datetime(fd.year, fd.month, fd.day, tzinfo=UTC)
+    td_dt = datetime(td.year, td.month, td.day, 23, 59, 59, tzinfo=UTC)
+
+    # Idle polls (nothing fetched) would drown the distributions, so only runs that saw mail count
+    run_filter = (
+        IngestionRun.run_started_at.between(fd_dt, td_dt),
+        (IngestionRun.tenant_id == tid) | (IngestionRun.tenant_id.is_(None)),
+        IngestionRun.emails_seen > 0,
+    )
+
+    totals = db.query(
+        func.count(IngestionRun.id).label("runs"),
+        func.coalesce(func.sum(IngestionRun.emails_seen), 0).label("emails"),
+        func.coalesce(func.sum(IngestionRun.invoices_created), 0).label("invoices"),
+        func.coalesce(func.sum(IngestionRun.bytes_ingested), 0).label("bytes"),
+        func.coalesce(func.sum(
+            extract("epoch", IngestionRun.run_finished_at) - extract("epoch", IngestionRun.run_started_at)
+        ), 0).label("wall_seconds"),
+        func.coalesce(func.sum(IngestionRun.latency_samples), 0).label("latency_samples"),
+        func.coalesce(func.sum(IngestionRun.latency_sum_ms), 0).label("latency_sum_ms"),
+    ).filter(*run_filter).one()
+
+    stages = {}
+    grand_total_ms = 0
+    for stage in INGESTION_STAGES:
+        col = getattr(IngestionRun, f"{stage}_ms")
+        summary = db.query(
+            func.coalesce(func.sum(col), 0).label("total"),
+            func.percentile_cont(0.5).within_group(col).label("p50"),
+            func.percentile_cont(0.95).within_group(col).label("p95"),
+            func.max(col).label("max"),
+        ).filter(*run_filter).one()
+        bucket = func.width_bucket(col, array(STAGE_BUCKETS_MS))
+        counts = dict(db.query(bucket, func.count(IngestionRun.id)).filter(*run_filter).group_by(bucket).all())
+        bounds = [str(b) for b in STAGE_BUCKETS_MS] + ["+Inf"]
+        stages[stage] = {
+            "total_ms": int(summary.total),
+            "p50_ms": round(float(summary.p50 or 0), 1),
+            "p95_ms": round(float(summary.p95 or 0), 1),
+            "max_ms": int(summary.max or 0),
+            # width_bucket returns how many bounds are <= v, i.e. the index of the first bound above v
+            "histogram": [{"lt": lt, "count": int(counts.get(i, 0))} for i, lt in enumerate(bounds)],
+        }
+        grand_total_ms += int(summary.total)
+    for stage in stages.values():
+        stage["share_pct"] = round(stage["total_ms"] / grand_total_ms * 100, 1) if grand_total_ms else 0
+
+    # Merge the per-run latency histograms server-side
+    kv = func.jsonb_each_text(IngestionRun.latency_histogram).table_valued("key", "value").lateral()
+    latency_rows = (
+        db.query(kv.c.key, func.sum(cast(kv.c.value, Integer)))
+        .select_from(IngestionRun)
+        .join(kv, true())
+        .filter(*run_filter)
+        .group_by(kv.c.key)
+        .all()
+    )
+    latency_counts = {k: int(v) for k, v in latency_rows}
+    latency_bounds = [str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"]
+
+    wall = float(totals.wall_seconds or 0)
+    return {
+        "runs": totals.runs,
+        "emails": int(totals.emails),
+        "invoices": int(totals.invoices),
+        "bytes_ingested": int(totals.bytes),
+        "throughput_emails_per_sec": round(int(totals.emails) / wall, 2) if wall > 0 else 0,
+        "throughput_mb_per_sec": round(int(totals.bytes) / 1e6 / wall, 2) if wall > 0 else 0,
+        "stages": stages,
+        "latency": {
+            "samples": int(totals.latency_samples),
+            "mean_ms": round(int(totals.latency_sum_ms) / int(totals.latency_samples), 1) if totals.latency_samples else 0,
+            "histogram": [{"le": le, "count": latency_counts.get(le, 0)} for le in latency_bounds],
+        },
+    }
+
+
 @router.get("/audit-effectiveness")
 def audit_effectiveness(
     from_date: str | None = None,
     to_date: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     tid = current_user.tenant_id
     fd = _parse_date(from_date, 180)
@@ -278,7 +379,8 @@ def audit_effectiveness(
         AuditEvent.tenant_id == tid, AuditEvent.action.in_(["INVOICE_UPLOADED", "INVOICE_MANUAL_EDIT"]),
         AuditEvent.timestamp.between(fd_dt, td_dt),
     ).scalar() or 0
-    auto_extractions = db.query(func.count(AuditEvent.id)).filter(
+    # An email invoice logs EMAIL_RECEIVED and then INVOICE_AUTO_EXTRACTED; count it once
+    auto_extractions = db.query(func.count(func.distinct(AuditEvent.entity_id))).filter(
         AuditEvent.tenant_id == tid, AuditEvent.action.in_(["EMAIL_RECEIVED", "INVOICE_AUTO_EXTRACTED"]),
         AuditEvent.timestamp.between(fd_dt, td_dt),
     ).scalar() or 0
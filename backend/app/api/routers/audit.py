@@ -1,60 +1,250 @@
 """Audit log endpoints."""
-from datetime import UTC, date, datetime
+import json
+from datetime import UTC, date, datetime, timedelta
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, aliased
 
 from app.api.deps import get_current_user, require_roles
-from app.db.session import get_db
+from app.api.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER, decode_cursor, encode_cursor
+from app.core.config import settings
+from app.db.explain import estimate_rows
+from app.db.session import get_read_db
 from app.models.audit_event import AuditEvent
 from app.models.user import Role, User
-from app.schemas.audit import AuditEventResponse
+from app.schemas.audit import AuditEntityBatchRequest, AuditEntityHistory, AuditEventResponse
+from app.services.audit_archive import estimate_archived, search_archive, search_archive_entities
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
 AUDIT_ROLES = [Role.ADMIN.value, Role.AUDITOR.value, Role.APPROVER.value]
 
+# Keys written into AuditEvent.metadata by log_event callers that auditors may search on
+SEARCHABLE_METADATA_KEYS = frozenset({
+    "message_id", "filename", "from_email", "subject", "sha256", "email", "role", "vendor", "method",
+})
+
+
+def _reaches_archive(start: datetime | None) -> bool:
+    """Whether a range starting at `start` (naive UTC, None = unbounded) can include archived events."""
+    if settings.AUDIT_HOT_DAYS <= 0:
+        return False
+    hot_start = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=settings.AUDIT_HOT_DAYS)
+    return start is None or start < hot_start
+
+
+def _metadata_filter(raw: str) -> dict:
+    """Parse a `metadata` containment filter, rejecting anything the GIN index can't narrow down.
+
+    `{}` contains-matches every row and containers/nulls hash to nothing
+    selective, so only non-empty objects of known keys with scalar values pass.
+    """
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = None
+    if not isinstance(value, dict) or not value:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="metadata must be a non-empty JSON object")
+    unknown = sorted(set(value) - SEARCHABLE_METADATA_KEYS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"metadata keys not searchable: {', '.join(unknown)}",
+        )
+    for key, item in value.items():
+        if item is None or isinstance(item, dict | list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"metadata.{key} must be a string, number or boolean",
+            )
+    return value
+
+
+def _event_to_response(e: AuditEvent) -> AuditEventResponse:
+    return AuditEventResponse(
+        id=str(e.id),
+        tenant_id=str(e.tenant_id),
+        timestamp=e.timestamp.isoformat() if e.timestamp else "",
+        actor_user_id=str(e.actor_user_id) if e.actor_user_id else None,
+        action=e.action,
+        entity_type=e.entity_type or "",
+        entity_id=e.entity_id or "",
+        metadata_json=e.metadata_json,
+    )
+
 
 @router.get("", response_model=list[AuditEventResponse])
 def list_audit_events(
+    response: Response,
     action: str | None = None,
     entity_type: str | None = None,
     from_date: str | None = None,
     to_date: str | None = None,
+    metadata: str | None = None,
+    cursor: str | None = None,
+    include_total: bool = False,
     page: int = 1,
     page_size: int = 50,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(*AUDIT_ROLES)),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_roles(*AUDIT_ROLES, reader=True)),
 ):
-    q = db.query(AuditEvent).filter(AuditEvent.tenant_id == current_user.tenant_id)
-    if action:
-        q = q.filter(AuditEvent.action == action)
-    if entity_type:
-        q = q.filter(AuditEvent.entity_type == entity_type)
+    """Newest first, keyset-paginated on (timestamp, id).
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page;
+    each page is one index range scan no matter how deep. `page` is the legacy
+    OFFSET paging and is ignored when a cursor is given. include_total adds an
+    X-Total-Estimate header with the planner's row estimate (no COUNT(*)).
+    metadata is a JSON object matched by containment, e.g. {"message_id": "<abc@x>"}.
+    When the range reaches past the AUDIT_HOT_DAYS window, archived segments are
+    searched as well and merged into the same ordering.
+    """
+    metadata_filter = _metadata_filter(metadata) if metadata else None
+    from_dt = to_dt = None
     if from_date:
         try:
             fd = date.fromisoformat(from_date)
-            q = q.filter(AuditEvent.timestamp >= datetime(fd.year, fd.month, fd.day, tzinfo=UTC))
+            from_dt = datetime(fd.year, fd.month, fd.day, tzinfo=UTC)
         except ValueError:
             pass
     if to_date:
         try:
             td = date.fromisoformat(to_date)
-            q = q.filter(AuditEvent.timestamp <= datetime(td.year, td.month, td.day, 23, 59, 59, tzinfo=UTC))
+            to_dt = datetime(td.year, td.month, td.day, 23, 59, 59, tzinfo=UTC)
         except ValueError:
             pass
 
-    events = q.order_by(AuditEvent.timestamp.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    q = db.query(AuditEvent).filter(AuditEvent.tenant_id == current_user.tenant_id)
+    if action:
+        q = q.filter(AuditEvent.action == action)
+    if entity_type:
+        q = q.filter(AuditEvent.entity_type == entity_type)
+    if metadata_filter:
+        q = q.filter(AuditEvent.metadata_json.contains(metadata_filter))
+    if from_dt:
+        q = q.filter(AuditEvent.timestamp >= from_dt)
+    if to_dt:
+        q = q.filter(AuditEvent.timestamp <= to_dt)
+
+    # Archived events are all older than the hot window; OFFSET paging can't be merged, so it stays hot-only
+    archive_start = from_dt.replace(tzinfo=None) if from_dt else None
+    archive_end = to_dt.replace(tzinfo=None) if to_dt else None
+    use_archive = _reaches_archive(archive_start) and (cursor or page <= 1)
+
+    if include_total:
+        total = estimate_rows(db, q.statement)
+        if use_archive:
+            total += estimate_archived(current_user.tenant_id, archive_start, archive_end)
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(total)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        q = q.filter(tuple_(AuditEvent.timestamp, AuditEvent.id) < tuple_(*position))
+    elif page > 1:
+        q = q.offset((page - 1) * page_size)
+    events = q.order_by(AuditEvent.timestamp.desc(), AuditEvent.id.desc()).limit(page_size).all()
+
+    if use_archive:
+        # A full hot page only needs archived events at or after its oldest entry
+        if len(events) == page_size:
+            archive_start = max(archive_start or events[-1].timestamp, events[-1].timestamp)
+        archived = search_archive(
+            current_user.tenant_id, start=archive_start, end=archive_end, before=position,
+            action=action, entity_type=entity_type, metadata=metadata_filter, limit=page_size,
+        )
+        if archived:
+            merged = {e.id: e for e in archived} | {e.id: e for e in events}
+            events = sorted(merged.values(), key=lambda e: (e.timestamp, e.id), reverse=True)[:page_size]
+
+    if len(events) == page_size:
+        last = events[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.timestamp, last.id)
+    return [_event_to_response(e) for e in events]
+
+
+@router.get("/entity/{entity_type}/{entity_id}", response_model=list[AuditEventResponse])
+def entity_history(
+    entity_type: str,
+    entity_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_roles(*AUDIT_ROLES, reader=True)),
+):
+    """The most recent `limit` events for one entity, returned oldest first (timeline order).
+
+    Archived events are all older than the hot ones, so the archive is only
+    searched when the hot table holds fewer than `limit`.
+    """
+    events = (
+        db.query(AuditEvent)
+        .filter(
+            AuditEvent.tenant_id == current_user.tenant_id,
+            AuditEvent.entity_type == entity_type,
+            AuditEvent.entity_id == entity_id,
+        )
+        .order_by(AuditEvent.timestamp.desc(), AuditEvent.id.desc())
+        .limit(limit)
+        .all()
+    )
+    if len(events) < limit and _reaches_archive(None):
+        events += search_archive(
+            current_user.tenant_id, before=(events[-1].timestamp, events[-1].id) if events else None,
+            entity_type=entity_type, entity_id=entity_id, limit=limit - len(events),
+        )
+    return [_event_to_response(e) for e in reversed(events)]
+
+
+@router.post("/entity/batch", response_model=list[AuditEntityHistory])
+def entity_history_batch(
+    body: AuditEntityBatchRequest,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_roles(*AUDIT_ROLES, reader=True)),
+):
+    """Histories for up to 100 entities in one query, each capped at limit_per_entity and oldest first.
+
+    Entities with no events are returned with an empty list, in request order.
+    Entities with fewer than limit_per_entity hot events are completed from the
+    archive, in one pass over it.
+    """
+    keys = list(dict.fromkeys((e.entity_type, e.entity_id) for e in body.entities))
+    ranked = (
+        select(
+            AuditEvent,
+            func.row_number().over(
+                partition_by=(AuditEvent.entity_type, AuditEvent.entity_id),
+                order_by=(AuditEvent.timestamp.desc(), AuditEvent.id.desc()),
+            ).label("rn"),
+        )
+        .where(
+            AuditEvent.tenant_id == current_user.tenant_id,
+            tuple_(AuditEvent.entity_type, AuditEvent.entity_id).in_(keys),
+        )
+        .subquery()
+    )
+    event = aliased(AuditEvent, ranked)
+    events = (
+        db.query(event)
+        .filter(ranked.c.rn <= body.limit_per_entity)
+        .order_by(ranked.c.timestamp, ranked.c.id)
+        .all()
+    )
+
+    histories: dict[tuple[str, str], list[AuditEvent]] = {key: [] for key in keys}
+    for e in events:
+        histories[(e.entity_type, e.entity_id)].append(e)
+
+    short = [key for key, history in histories.items() if len(history) < body.limit_per_entity]
+    if short and _reaches_archive(None):
+        archived = search_archive_entities(current_user.tenant_id, short, body.limit_per_entity)
+        for key, older in archived.items():
+            hot = histories[key]
+            hot_ids = {e.id for e in hot}
+            older = [e for e in older if e.id not in hot_ids][: body.limit_per_entity - len(hot)]
+            histories[key] = [*reversed(older), *hot]
+
     return [
-        AuditEventResponse(
-            id=str(e.id),
-            tenant_id=str(e.tenant_id),
-            timestamp=e.timestamp.isoformat() if e.timestamp else "",
-            actor_user_id=str(e.actor_user_id) if e.actor_user_id else None,
-            action=e.action,
-            entity_type=e.entity_type or "",
-            entity_id=e.entity_id or "",
-            metadata_json=e.metadata_json,
+        AuditEntityHistory(
+            entity_type=entity_type, entity_id=entity_id, events=[_event_to_response(e) for e in history],
         )
-        for e in events
+        for (entity_type, entity_id), history in histories.items()
     ]
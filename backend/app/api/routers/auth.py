@@ -8,9 +8,9 @@ from sqlalchemy.orm import Session
 from app.api.deps import get_current_user
 from app.core.security import create_access_token, verify_password
 from app.db.session import get_db
-from app.models.audit_event import AuditEvent
 from app.models.user import User
 from app.schemas.auth import LoginRequest, TokenResponse, UserMeResponse
+from app.services.audit import log_event
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -26,7 +26,9 @@ def login(body: LoginRequest, response: Response, db: Session = Depends(get_db))
     token = create_access_token({"sub": str(user.id), "tenant_id": str(user.tenant_id), "role": user.role})
     response.set_cookie("access_token", token, httponly=True, samesite="lax", max_age=28800)
 
-    db.add(AuditEvent(tenant_id=user.tenant_id, actor_user_id=user.id, action="LOGIN", entity_type="user", entity_id=str(user.id)))
+    # Logins don't change any other state, so the event may go through the write-behind buffer
+    log_event(db, user.tenant_id, "LOGIN", entity_type="user", entity_id=str(user.id),
+              actor_user_id=user.id, transactional=False)
     db.commit()
 
     return TokenResponse(access_token=token)
@@ -5,8 +5,8 @@ from fastapi import APIRouter, Depends, Query
 from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.deps import get_current_read_user
+from app.db.session import get_read_db
 from app.models.invoice import Invoice, InvoiceStatus
 from app.models.payment import Payment
 from app.models.user import User
@@ -18,8 +18,8 @@ router = APIRouter(prefix="/exports", tags=["exports"])
 def payment_pack_csv(
     from_date: str = Query(..., alias="from"),
     to_date: str = Query(..., alias="to"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     tid = current_user.tenant_id
     fd = date.fromisoformat(from_date)
@@ -30,7 +30,7 @@ def payment_pack_csv(
     rows = (
         db.query(Invoice, Payment)
         .join(Payment, Payment.invoice_id == Invoice.id)
-        .filter(Invoice.tenant_id == tid, Payment.paid_at.between(fd_dt, td_dt))
+        .filter(Payment.tenant_id == tid, Payment.paid_at.between(fd_dt, td_dt))
         .all()
     )
 
@@ -48,8 +48,8 @@ def payment_pack_csv(
 @router.get("/weekly-pack.md")
 def weekly_pack_md(
     week_start: str = Query(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     tid = current_user.tenant_id
     ws = date.fromisoformat(week_start)
@@ -60,7 +60,7 @@ def weekly_pack_md(
     invoices = db.query(Invoice).filter(Invoice.tenant_id == tid, Invoice.created_at.between(ws_dt, we_dt)).all()
     payments = (
         db.query(Payment).join(Invoice, Payment.invoice_id == Invoice.id)
-        .filter(Invoice.tenant_id == tid, Payment.paid_at.between(ws_dt, we_dt))
+        .filter(Payment.tenant_id == tid, Payment.paid_at.between(ws_dt, we_dt))
         .all()
     )
 
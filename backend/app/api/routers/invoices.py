@@ -1,29 +1,44 @@
-"""Invoice endpoints: upload, list, detail, approve, reject, mark-paid."""
+"""Invoice endpoints: upload, list, search, review queue and claims, detail, approve, reject, mark-paid."""
+import hashlib
 import os
 import uuid
-from datetime import UTC, date, datetime
+from collections import Counter
+from datetime import UTC, date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile, status
 from fastapi.responses import FileResponse
-from sqlalchemy import func
+from sqlalchemy import String, cast, func, literal, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import REAL
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, require_roles
+from app.api.deps import get_current_read_user, get_current_user, require_roles
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_rank_cursor, encode_rank_cursor
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.approval import Approval
-from app.models.audit_event import AuditEvent
-from app.models.invoice import Invoice, InvoiceStatus
+from app.models.invoice import REVIEW_STATUSES, TRIGRAM_COLUMNS, Invoice, InvoiceStatus
 from app.models.invoice_exception import InvoiceException
+from app.models.invoice_text import TEXT_SEARCH_CONFIG, InvoiceText
 from app.models.payment import Payment
 from app.models.user import Role, User
-from app.schemas.invoice import InvoiceListResponse, InvoiceResponse
-from app.services.validation import validate_invoice
+from app.schemas.invoice import (
+    ExceptionResolveRequest,
+    ExceptionResolveResponse,
+    InvoiceListResponse,
+    InvoiceResponse,
+    InvoiceSearchHit,
+    InvoiceTextHit,
+    VendorSuggestion,
+)
+from app.services.audit import log_event
+from app.services.validation import sync_review_statuses, validate_invoice
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
 ALL_ROLES = [r.value for r in Role]
 WRITE_ROLES = [Role.ADMIN.value, Role.APPROVER.value, Role.UPLOADER.value]
+APPROVER_ROLES = [Role.ADMIN.value, Role.APPROVER.value]
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5"
 
 
 def _inv_to_response(inv: Invoice) -> InvoiceResponse:
@@ -41,6 +56,8 @@ def _inv_to_response(inv: Invoice) -> InvoiceResponse:
         email_subject=inv.email_subject,
         email_from=inv.email_from,
         attachment_count=inv.attachment_count or 0,
+        claimed_by_user_id=str(inv.claimed_by_user_id) if inv.claimed_by_user_id else None,
+        claimed_until=inv.claimed_until.isoformat() if inv.claimed_until else None,
         created_at=inv.created_at.isoformat() if inv.created_at else "",
         updated_at=inv.updated_at.isoformat() if inv.updated_at else "",
         exceptions=[
@@ -109,12 +126,13 @@ def upload_invoice(
         file_path=save_path,
         original_filename=file.filename or "",
         source="UPLOAD",
+        content_sha256=hashlib.sha256(content).hexdigest(),
     )
     db.add(inv)
     db.flush()
 
     # Run validation
-    exceptions = validate_invoice(inv, current_user.tenant)
+    exceptions = validate_invoice(inv, current_user.tenant, db)
     for exc in exceptions:
         exc.tenant_id = current_user.tenant_id
         db.add(exc)
@@ -124,14 +142,10 @@ def upload_invoice(
     else:
         inv.status = InvoiceStatus.APPROVAL_PENDING.value
 
-    db.add(AuditEvent(
-        tenant_id=current_user.tenant_id,
-        actor_user_id=current_user.id,
-        action="INVOICE_UPLOADED",
-        entity_type="invoice",
-        entity_id=str(inv.id),
-        metadata_json={"filename": file.filename, "vendor": vendor},
-    ))
+    log_event(
+        db, current_user.tenant_id, "INVOICE_UPLOADED", entity_type="invoice", entity_id=str(inv.id),
+        actor_user_id=current_user.id, metadata={"filename": file.filename, "vendor": vendor},
+    )
     db.commit()
     db.refresh(inv)
     return _inv_to_response(inv)
@@ -145,8 +159,8 @@ def list_invoices(
     to_date: str | None = None,
     page: int = 1,
     page_size: int = 25,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
     q = db.query(Invoice).filter(Invoice.tenant_id == current_user.tenant_id)
     if status_filter:
@@ -174,26 +188,144 @@ def list_invoices(
     )
 
 
+def _like_escape(value: str) -> str:
+    # Backslash is the default LIKE escape character in Postgres
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@router.get("/fuzzy-search", response_model=list[InvoiceSearchHit])
+def fuzzy_search_invoices(
+    q: str = Query(..., min_length=3, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
+):
+    """Typo-tolerant search over vendor, invoice number, email subject and sender, best match first.
+
+    A row matches when any column contains `q` or is word-similar to it
+    (pg_trgm `<%`); both predicates are served by the trigram GIN indexes.
+    `score` is the best word_similarity across the columns (1.0 = exact word match).
+    """
+    term = q.strip()
+    if len(term) < 3:
+        raise HTTPException(status_code=400, detail="Search term must be at least 3 characters")
+    pattern = f"%{_like_escape(term)}%"
+    needle = literal(term, String)
+    columns = [getattr(Invoice, name) for name in TRIGRAM_COLUMNS]
+    matches = or_(*(or_(col.ilike(pattern), needle.op("<%")(col)) for col in columns))
+    score = func.greatest(*(func.word_similarity(needle, col) for col in columns)).label("score")
+
+    rows = (
+        db.query(Invoice, score)
+        .filter(Invoice.tenant_id == current_user.tenant_id, matches)
+        .order_by(score.desc(), Invoice.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        InvoiceSearchHit(**_inv_to_response(inv).model_dump(), score=round(float(rank or 0), 4))
+        for inv, rank in rows
+    ]
+
+
+@router.get("/search", response_model=list[InvoiceTextHit])
+def search_invoice_text(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
+):
+    """Full-text search over the text extracted from invoice files, best match first.
+
+    `q` takes web-search syntax ("exact phrase", or, -exclude). Each hit has its
+    ts_rank_cd `score` and a `headline` with matches wrapped in <mark> tags; the
+    rest of the headline is raw document text and is not HTML-escaped. Pages are
+    keyset-paginated on (score, id): pass X-Next-Cursor back as `cursor`.
+    """
+    tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(InvoiceText.search_vector, tsquery)
+    page_q = db.query(InvoiceText.invoice_id, rank.label("rank")).filter(
+        InvoiceText.tenant_id == current_user.tenant_id,
+        InvoiceText.search_vector.op("@@")(tsquery),
+    )
+    if cursor:
+        after_rank, after_id = decode_rank_cursor(cursor)
+        # ts_rank_cd is float4: compare in float4 or the boundary row repeats or goes missing
+        page_q = page_q.filter(tuple_(rank, InvoiceText.invoice_id) < tuple_(cast(after_rank, REAL), after_id))
+    page = page_q.order_by(rank.desc(), InvoiceText.invoice_id.desc()).limit(limit).all()
+    if not page:
+        return []
+
+    # ts_headline re-parses the document, so it only runs for the rows on this page
+    headline = func.ts_headline(TEXT_SEARCH_CONFIG, InvoiceText.content, tsquery, HEADLINE_OPTIONS)
+    details = {
+        inv.id: (inv, snippet)
+        for inv, snippet in db.query(Invoice, headline)
+        .join(InvoiceText, InvoiceText.invoice_id == Invoice.id)
+        .filter(Invoice.id.in_([row.invoice_id for row in page]))
+    }
+    if len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_rank_cursor(page[-1].rank, page[-1].invoice_id)
+    hits = []
+    for row in page:
+        inv, snippet = details[row.invoice_id]
+        hits.append(InvoiceTextHit(**_inv_to_response(inv).model_dump(), score=row.rank, headline=snippet))
+    return hits
+
+
+@router.get("/vendors/suggest", response_model=list[VendorSuggestion])
+def suggest_vendors(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
+):
+    """Distinct vendor names starting with `prefix` (case-insensitive), most invoiced first."""
+    invoice_count = func.count(Invoice.id)
+    rows = (
+        db.query(Invoice.vendor, invoice_count)
+        .filter(
+            Invoice.tenant_id == current_user.tenant_id,
+            Invoice.vendor.ilike(f"{_like_escape(prefix)}%"),
+        )
+        .group_by(Invoice.vendor)
+        .order_by(invoice_count.desc(), Invoice.vendor)
+        .limit(limit)
+        .all()
+    )
+    return [VendorSuggestion(vendor=vendor, invoice_count=count) for vendor, count in rows]
+
+
 @router.get("/review-queue", response_model=InvoiceListResponse)
 def review_queue(
     source: str | None = None,
+    exception_code: str | None = None,
     page: int = 1,
     page_size: int = 25,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_read_user),
 ):
-    """Return invoices needing review: status in (NEW, VALIDATED, APPROVAL_PENDING)."""
-    review_statuses = [
-        InvoiceStatus.NEW.value,
-        InvoiceStatus.VALIDATED.value,
-        InvoiceStatus.APPROVAL_PENDING.value,
-    ]
+    """Return invoices needing review: status in (NEW, VALIDATED, APPROVAL_PENDING).
+
+    `exception_code` (e.g. DUPLICATE_INVOICE) keeps only invoices with an open exception of that code.
+    """
     q = db.query(Invoice).filter(
         Invoice.tenant_id == current_user.tenant_id,
-        Invoice.status.in_(review_statuses),
+        Invoice.status.in_(REVIEW_STATUSES),
     )
     if source:
         q = q.filter(Invoice.source == source.upper())
+    if exception_code:
+        # Matches ix_invoice_exceptions_open (tenant_id, code, invoice_id) WHERE resolved_at IS NULL
+        q = q.filter(
+            Invoice.exceptions.any(
+                (InvoiceException.tenant_id == current_user.tenant_id)
+                & (InvoiceException.code == exception_code.upper())
+                & InvoiceException.resolved_at.is_(None)
+            )
+        )
 
     total = q.count()
     items = q.order_by(Invoice.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
@@ -205,6 +337,100 @@ def review_queue(
     )
 
 
+@router.post("/review-queue/claim", response_model=list[InvoiceResponse])
+def claim_review_items(
+    limit: int = Query(5, ge=1, le=50),
+    source: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(*APPROVER_ROLES)),
+):
+    """Claim the next `limit` unclaimed review-queue invoices (oldest first) for the caller.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED, so concurrent approvers each get
+    a different batch without waiting on one another. A claim lasts
+    REVIEW_CLAIM_TTL_MINUTES; the caller's own live claims are returned again.
+    """
+    now = datetime.now(UTC)
+    q = db.query(Invoice).filter(
+        Invoice.tenant_id == current_user.tenant_id,
+        Invoice.status.in_(REVIEW_STATUSES),
+        or_(
+            Invoice.claimed_until.is_(None),
+            Invoice.claimed_until < now,
+            Invoice.claimed_by_user_id == current_user.id,
+        ),
+    )
+    if source:
+        q = q.filter(Invoice.source == source.upper())
+    items = q.order_by(Invoice.created_at).limit(limit).with_for_update(skip_locked=True, of=Invoice).all()
+
+    claimed_until = now + timedelta(minutes=settings.REVIEW_CLAIM_TTL_MINUTES)
+    for inv in items:
+        inv.claimed_by_user_id = current_user.id
+        inv.claimed_until = claimed_until
+    db.commit()
+    return [_inv_to_response(inv) for inv in items]
+
+
+@router.post("/exceptions/resolve", response_model=ExceptionResolveResponse)
+def resolve_exceptions(
+    body: ExceptionResolveRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(*APPROVER_ROLES)),
+):
+    """Resolve open exceptions in one statement and move the affected invoices on.
+
+    Targets are the listed exception ids plus, for `invoice_ids`, every open
+    exception on those invoices (only `code` ones when given). The exception
+    counters follow via the invoice_exceptions triggers; invoices left with no
+    open exception go from VALIDATED to APPROVAL_PENDING.
+    """
+    targets = []
+    if body.exception_ids:
+        targets.append(InvoiceException.id.in_(body.exception_ids))
+    if body.invoice_ids:
+        by_invoice = InvoiceException.invoice_id.in_(body.invoice_ids)
+        if body.code:
+            by_invoice &= InvoiceException.code == body.code.upper()
+        targets.append(by_invoice)
+    invoice_ids = db.execute(
+        update(InvoiceException)
+        .where(
+            InvoiceException.tenant_id == current_user.tenant_id,
+            InvoiceException.resolved_at.is_(None),
+            or_(*targets),
+        )
+        .values(resolved_at=datetime.now(UTC), resolved_by_user_id=current_user.id)
+        .returning(InvoiceException.invoice_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    per_invoice = Counter(invoice_ids)
+    if per_invoice:
+        sync_review_statuses(db, list(per_invoice))
+    for invoice_id, count in per_invoice.items():
+        log_event(db, current_user.tenant_id, "EXCEPTIONS_RESOLVED", entity_type="invoice", entity_id=str(invoice_id),
+                  actor_user_id=current_user.id, metadata={"exceptions": count})
+    db.commit()
+    return ExceptionResolveResponse(resolved=len(invoice_ids), invoices=len(per_invoice))
+
+
+def _check_claim(inv: Invoice, user: User):
+    """Another approver's live claim blocks decisions on the invoice."""
+    if (
+        inv.claimed_by_user_id
+        and inv.claimed_by_user_id != user.id
+        and inv.claimed_until
+        and inv.claimed_until.replace(tzinfo=UTC) > datetime.now(UTC)
+    ):
+        raise HTTPException(status_code=409, detail="Invoice is claimed by another approver")
+
+
+def _clear_claim(inv: Invoice):
+    inv.claimed_by_user_id = None
+    inv.claimed_until = None
+
+
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
 def get_invoice(invoice_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.tenant_id == current_user.tenant_id).first()
@@ -221,6 +447,23 @@ def download_invoice(invoice_id: uuid.UUID, db: Session = Depends(get_db), curre
     return FileResponse(inv.file_path, filename=inv.original_filename or "invoice")
 
 
+@router.post("/{invoice_id}/release", response_model=InvoiceResponse)
+def release_claim(
+    invoice_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(*APPROVER_ROLES)),
+):
+    """Give a claimed invoice back to the queue."""
+    inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.tenant_id == current_user.tenant_id).first()
+    if not inv:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    _check_claim(inv, current_user)
+    _clear_claim(inv)
+    db.commit()
+    db.refresh(inv)
+    return _inv_to_response(inv)
+
+
 @router.post("/{invoice_id}/approve", response_model=InvoiceResponse)
 def approve_invoice(
     invoice_id: uuid.UUID,
@@ -233,16 +476,16 @@ def approve_invoice(
         raise HTTPException(status_code=404, detail="Invoice not found")
     if inv.status not in (InvoiceStatus.APPROVAL_PENDING.value, InvoiceStatus.VALIDATED.value):
         raise HTTPException(status_code=400, detail=f"Cannot approve invoice in status {inv.status}")
+    _check_claim(inv, current_user)
 
     inv.status = InvoiceStatus.APPROVED.value
+    _clear_claim(inv)
     db.add(Approval(
         tenant_id=current_user.tenant_id, invoice_id=inv.id,
         decided_by_user_id=current_user.id, decision="APPROVED", notes=notes,
     ))
-    db.add(AuditEvent(
-        tenant_id=current_user.tenant_id, actor_user_id=current_user.id,
-        action="INVOICE_APPROVED", entity_type="invoice", entity_id=str(inv.id),
-    ))
+    log_event(db, current_user.tenant_id, "INVOICE_APPROVED", entity_type="invoice", entity_id=str(inv.id),
+              actor_user_id=current_user.id)
     db.commit()
     db.refresh(inv)
     return _inv_to_response(inv)
@@ -258,16 +501,16 @@ def reject_invoice(
     inv = db.query(Invoice).filter(Invoice.id == invoice_id, Invoice.tenant_id == current_user.tenant_id).first()
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    _check_claim(inv, current_user)
 
     inv.status = InvoiceStatus.REJECTED.value
+    _clear_claim(inv)
     db.add(Approval(
         tenant_id=current_user.tenant_id, invoice_id=inv.id,
         decided_by_user_id=current_user.id, decision="REJECTED", notes=notes,
     ))
-    db.add(AuditEvent(
-        tenant_id=current_user.tenant_id, actor_user_id=current_user.id,
-        action="INVOICE_REJECTED", entity_type="invoice", entity_id=str(inv.id),
-    ))
+    log_event(db, current_user.tenant_id, "INVOICE_REJECTED", entity_type="invoice", entity_id=str(inv.id),
+              actor_user_id=current_user.id)
     db.commit()
     db.refresh(inv)
     return _inv_to_response(inv)
@@ -300,11 +543,10 @@ def mark_paid(
         created_by_user_id=current_user.id,
     )
     db.add(payment)
-    db.add(AuditEvent(
-        tenant_id=current_user.tenant_id, actor_user_id=current_user.id,
-        action="INVOICE_PAID", entity_type="invoice", entity_id=str(inv.id),
-        metadata_json={"amount": amount, "method": payment_method},
-    ))
+    log_event(
+        db, current_user.tenant_id, "INVOICE_PAID", entity_type="invoice", entity_id=str(inv.id),
+        actor_user_id=current_user.id, metadata={"amount": amount, "method": payment_method},
+    )
     db.commit()
     db.refresh(inv)
     return _inv_to_response(inv)
@@ -0,0 +1,59 @@
+"""Server-Sent Events: live audit events and invoice status changes for the caller's tenant."""
+import json
+from collections.abc import AsyncGenerator
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.routers.audit import AUDIT_ROLES
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.user import User
+from app.services.events import AUDIT_EVENT, INVOICE_EVENT, OVERFLOW_EVENT, Subscription, hub
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+
+def _sse(event: str, data: dict, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _event_stream(request: Request, sub: Subscription) -> AsyncGenerator[str, None]:
+    try:
+        yield f"retry: {settings.STREAM_RETRY_MS}\n\n"
+        while not await request.is_disconnected():
+            message = await sub.get(timeout=settings.STREAM_HEARTBEAT_SECONDS)
+            if sub.dropped:
+                # The client fell behind and lost deltas; it should re-fetch its current page.
+                yield _sse(OVERFLOW_EVENT, {"dropped": sub.dropped})
+                sub.dropped = 0
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, topic, data = message
+            yield _sse(topic, data, event_id)
+    finally:
+        hub.unsubscribe(sub)
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """text/event-stream of `invoice` status changes, plus `audit` events for audit roles."""
+    topics = [INVOICE_EVENT]
+    if current_user.role in AUDIT_ROLES:
+        topics.append(AUDIT_EVENT)
+    sub = hub.subscribe(current_user.tenant_id, topics)
+    # End the read transaction so the stream doesn't pin a pooled connection while it is open.
+    db.commit()
+    return StreamingResponse(
+        _event_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
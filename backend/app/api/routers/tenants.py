@@ -1,12 +1,17 @@
-"""Tenant settings endpoints."""
-from fastapi import APIRouter, Depends, HTTPException
+"""Tenant settings endpoints, and progress of the re-validation jobs a settings change queues."""
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, require_roles
 from app.db.session import get_db
+from app.models.revalidation_job import RevalidationJob, RevalidationStatus
 from app.models.tenant import Tenant
 from app.models.user import Role, User
+from app.workers.revalidator import queue_revalidation
 
 router = APIRouter(prefix="/tenants", tags=["tenants"])
 
@@ -16,7 +21,25 @@ class TenantSettingsResponse(BaseModel):
     name: str
     inbound_email_alias: str
     allowed_currencies: str
+    settings_version: int
     created_at: str
+    # Set when the update queued a re-validation of open invoices
+    revalidation_job_id: str | None = None
+
+
+class RevalidationJobResponse(BaseModel):
+    id: str
+    settings_version: int
+    status: str
+    total: int | None
+    processed: int
+    progress: float
+    exceptions_resolved: int
+    exceptions_created: int
+    error: str | None
+    created_at: str
+    started_at: str | None
+    finished_at: str | None
 
 
 class TenantSettingsUpdate(BaseModel):
@@ -31,7 +54,7 @@ def get_settings(db: Session = Depends(get_db), current_user: User = Depends(req
         raise HTTPException(status_code=404, detail="Tenant not found")
     return TenantSettingsResponse(
         id=str(t.id), name=t.name, inbound_email_alias=t.inbound_email_alias,
-        allowed_currencies=t.allowed_currencies or "",
+        allowed_currencies=t.allowed_currencies or "", settings_version=t.settings_version,
         created_at=t.created_at.isoformat() if t.created_at else "",
     )
 
@@ -47,12 +70,81 @@ def update_settings(
         raise HTTPException(status_code=404, detail="Tenant not found")
     if body.name is not None:
         t.name = body.name
-    if body.allowed_currencies is not None:
+    job = None
+    if body.allowed_currencies is not None and body.allowed_currencies != t.allowed_currencies:
         t.allowed_currencies = body.allowed_currencies
+        t.settings_version = Tenant.settings_version + 1
+        db.flush()
+        job = queue_revalidation(db, t, current_user.id)
     db.commit()
     db.refresh(t)
     return TenantSettingsResponse(
         id=str(t.id), name=t.name, inbound_email_alias=t.inbound_email_alias,
-        allowed_currencies=t.allowed_currencies or "",
+        allowed_currencies=t.allowed_currencies or "", settings_version=t.settings_version,
         created_at=t.created_at.isoformat() if t.created_at else "",
+        revalidation_job_id=str(job.id) if job else None,
     )
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _job_to_response(job: RevalidationJob) -> RevalidationJobResponse:
+    if job.status == RevalidationStatus.DONE.value:
+        progress = 1.0
+    else:
+        # Invoices that became affected after the job started can push processed past total
+        progress = min(1.0, job.processed / job.total) if job.total else 0.0
+    return RevalidationJobResponse(
+        id=str(job.id), settings_version=job.settings_version, status=job.status,
+        total=job.total, processed=job.processed, progress=round(progress, 4),
+        exceptions_resolved=job.exceptions_resolved, exceptions_created=job.exceptions_created, error=job.error,
+        created_at=job.created_at.isoformat() if job.created_at else "",
+        started_at=_iso(job.started_at), finished_at=_iso(job.finished_at),
+    )
+
+
+def _get_job(db: Session, job_id: uuid.UUID, tenant_id: uuid.UUID) -> RevalidationJob:
+    job = db.query(RevalidationJob).filter(RevalidationJob.id == job_id, RevalidationJob.tenant_id == tenant_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Re-validation job not found")
+    return job
+
+
+@router.get("/revalidation-jobs", response_model=list[RevalidationJobResponse])
+def list_revalidation_jobs(
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(Role.ADMIN.value)),
+):
+    jobs = (
+        db.query(RevalidationJob)
+        .filter(RevalidationJob.tenant_id == current_user.tenant_id)
+        .order_by(RevalidationJob.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [_job_to_response(j) for j in jobs]
+
+
+@router.get("/revalidation-jobs/{job_id}", response_model=RevalidationJobResponse)
+def get_revalidation_job(
+    job_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(require_roles(Role.ADMIN.value)),
+):
+    return _job_to_response(_get_job(db, job_id, current_user.tenant_id))
+
+
+@router.post("/revalidation-jobs/{job_id}/resume", response_model=RevalidationJobResponse)
+def resume_revalidation_job(
+    job_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(require_roles(Role.ADMIN.value)),
+):
+    """Put a FAILED job back in the queue; it continues after the last invoice it finished."""
+    job = _get_job(db, job_id, current_user.tenant_id)
+    if job.status != RevalidationStatus.FAILED.value:
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be resumed (job is {job.status})")
+    job.status = RevalidationStatus.RUNNING.value if job.started_at else RevalidationStatus.PENDING.value
+    job.error = None
+    db.commit()
+    db.refresh(job)
+    return _job_to_response(job)
@@ -7,9 +7,9 @@ from sqlalchemy.orm import Session
 from app.api.deps import get_current_user, require_roles
 from app.core.security import hash_password
 from app.db.session import get_db
-from app.models.audit_event import AuditEvent
 from app.models.user import Role, User
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.services.audit import log_event
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -43,14 +43,11 @@ def create_user(
         role=body.role,
     )
     db.add(user)
-    db.add(AuditEvent(
-        tenant_id=current_user.tenant_id,
-        actor_user_id=current_user.id,
-        action="USER_CREATED",
-        entity_type="user",
-        entity_id=str(user.id),
-        metadata_json={"email": body.email, "role": body.role},
-    ))
+    db.flush()
+    log_event(
+        db, current_user.tenant_id, "USER_CREATED", entity_type="user", entity_id=str(user.id),
+        actor_user_id=current_user.id, metadata={"email": body.email, "role": body.role},
+    )
     db.commit()
     db.refresh(user)
     return _to_response(user)
@@ -74,13 +71,8 @@ def update_user(
         user.role = body.role
     if body.is_active is not None:
         user.is_active = body.is_active
-    db.add(AuditEvent(
-        tenant_id=current_user.tenant_id,
-        actor_user_id=current_user.id,
-        action="USER_UPDATED",
-        entity_type="user",
-        entity_id=str(user.id),
-    ))
+    log_event(db, current_user.tenant_id, "USER_UPDATED", entity_type="user", entity_id=str(user.id),
+              actor_user_id=current_user.id)
     db.commit()
     db.refresh(user)
     return _to_response(user)
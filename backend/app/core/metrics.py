@@ -0,0 +1,259 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counter, Gauge and Histogram register themselves in REGISTRY when created;
+GET /metrics renders it. Each labelled child has its own lock held only for
+the few arithmetic operations of an update, so recording stays cheap on hot
+paths. Values are per process: scrape every worker.
+
+MetricsMiddleware records request count, latency and response size per method,
+route template and status, and the requests in flight. It binds a
+RequestContext for the request's duration. Code that runs deeper in the
+request (for example pool checkin) can then label samples with route_label(),
+the matched route template, which is bounded where raw paths are not, and add
+to the request's database totals with record_query() (app/db/query_stats.py
+calls it for every statement).
+"""
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
+from contextvars import ContextVar
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+# Anything else a client sends is labelled OTHER, so the label stays bounded
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key, strict=True)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> list[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _Buckets:
+    __slots__ = ("counts", "sum", "_bounds", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        # First bucket whose upper bound is >= value; len(bounds) is the +Inf bucket
+        i = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, key, child: _Buckets) -> list[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+            cumulative += count
+            le = 'le="+Inf"' if bound == math.inf else f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format (version 0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests handled.", ["method", "route", "status"])
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start until the response body is sent.",
+    ["method", "route", "status"],
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size.", ["method", "route"], SIZE_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled (includes open streams).")
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ["route"], QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL statements per request.", ["route"],
+)
+
+
+class RequestContext:
+    """The request being handled: its ASGI scope and the database work done for it so far."""
+
+    __slots__ = ("scope", "db_queries", "db_seconds")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # The router fills scope["route"] in place, so this is the template once routing is done
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+
+# None outside requests (scheduler jobs, scripts). Sync endpoints run on a copy of the context,
+# which still holds the same RequestContext, so their queries count towards the request.
+_current_request: ContextVar[RequestContext | None] = ContextVar("metrics_request", default=None)
+
+
+def route_label() -> str:
+    """The current request's route template (e.g. /api/invoices/{invoice_id}), "unmatched" or "background"."""
+    request = _current_request.get()
+    return request.route if request is not None else "background"
+
+
+def record_query(seconds: float):
+    """Add one executed statement to the current request's totals (no-op outside requests)."""
+    request = _current_request.get()
+    if request is not None:
+        request.db_queries += 1
+        request.db_seconds += seconds
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestContext(scope)
+        token = _current_request.set(request)
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+        # An exception before the response started reaches the client as a 500 from the server
+        status, size = 500, 0
+
+        async def send_and_measure(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            elapsed = perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _current_request.reset(token)
+            route = request.route
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            HTTP_LATENCY.labels(method, route, status).observe(elapsed)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+            REQUEST_DB_QUERIES.labels(route).observe(request.db_queries)
+            REQUEST_DB_SECONDS.labels(route).observe(request.db_seconds)
@@ -0,0 +1,76 @@
+"""Trigger DDL for the invoice exception counters (migration 015).
+
+Frozen: migration 015 runs these statements, and create_all runs the same
+ones through app/models/exception_stats.py, so tests and migrated databases
+get identical triggers. To change the counting, add a new module and a
+migration that replaces the functions, and point the model at the new module.
+Do not edit this one.
+"""
+
+# Adds per-invoice (total, open) deltas to the invoice counters and the tenant rollup.
+# An invoice counts towards invoices_with_* when its counter goes from 0 to positive, and stops when it returns to 0.
+APPLY_DELTAS_FUNCTION = """
+CREATE OR REPLACE FUNCTION apply_invoice_exception_deltas(ids uuid[], total_deltas int[], open_deltas int[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    WITH d AS (
+        SELECT * FROM unnest(ids, total_deltas, open_deltas) AS d(invoice_id, n_total, n_open)
+        WHERE n_total <> 0 OR n_open <> 0
+    ), changed AS (
+        UPDATE invoices i
+        SET exception_count = i.exception_count + d.n_total,
+            open_exception_count = i.open_exception_count + d.n_open
+        FROM d
+        WHERE i.id = d.invoice_id
+        RETURNING i.tenant_id, d.n_total, d.n_open,
+            (i.exception_count > 0)::int - (i.exception_count - d.n_total > 0)::int AS flagged,
+            (i.open_exception_count > 0)::int - (i.open_exception_count - d.n_open > 0)::int AS open_flagged
+    )
+    INSERT INTO tenant_exception_stats AS s
+        (tenant_id, total_exceptions, open_exceptions, invoices_with_exceptions, invoices_with_open_exceptions)
+    SELECT tenant_id, sum(n_total), sum(n_open), sum(flagged), sum(open_flagged) FROM changed GROUP BY tenant_id
+    ON CONFLICT (tenant_id) DO UPDATE SET
+        total_exceptions = s.total_exceptions + EXCLUDED.total_exceptions,
+        open_exceptions = s.open_exceptions + EXCLUDED.open_exceptions,
+        invoices_with_exceptions = s.invoices_with_exceptions + EXCLUDED.invoices_with_exceptions,
+        invoices_with_open_exceptions = s.invoices_with_open_exceptions + EXCLUDED.invoices_with_open_exceptions;
+END $$
+"""
+
+# One trigger function per operation: each can only see the transition tables its trigger declares
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION invoice_exceptions_count_{op}() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM apply_invoice_exception_deltas(
+        array_agg(invoice_id), array_agg(n_total::int), array_agg(n_open::int)
+    ) FROM (
+        SELECT invoice_id, sum(n_total) AS n_total, sum(n_open) AS n_open FROM ({rows}) r GROUP BY invoice_id
+    ) g;
+    RETURN NULL;
+END $$
+"""
+NEW_ROWS = "SELECT invoice_id, 1 AS n_total, (resolved_at IS NULL)::int AS n_open FROM new_rows"
+OLD_ROWS = "SELECT invoice_id, -1 AS n_total, -(resolved_at IS NULL)::int AS n_open FROM old_rows"
+OPERATIONS = ("insert", "update", "delete")
+TRIGGER_FUNCTIONS = [
+    TRIGGER_FUNCTION.format(op="insert", rows=NEW_ROWS),
+    TRIGGER_FUNCTION.format(op="update", rows=f"{NEW_ROWS} UNION ALL {OLD_ROWS}"),
+    TRIGGER_FUNCTION.format(op="delete", rows=OLD_ROWS),
+]
+TRIGGERS = [
+    "CREATE TRIGGER invoice_exceptions_count_insert AFTER INSERT ON invoice_exceptions "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION invoice_exceptions_count_insert()",
+    "CREATE TRIGGER invoice_exceptions_count_update AFTER UPDATE ON invoice_exceptions "
+    "REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION invoice_exceptions_count_update()",
+    "CREATE TRIGGER invoice_exceptions_count_delete AFTER DELETE ON invoice_exceptions "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION invoice_exceptions_count_delete()",
+]
+
+# In execution order: the shared function, the trigger functions, then the triggers
+STATEMENTS = [APPLY_DELTAS_FUNCTION, *TRIGGER_FUNCTIONS, *TRIGGERS]
+DROP_STATEMENTS = [
+    *(f"DROP TRIGGER IF EXISTS invoice_exceptions_count_{op} ON invoice_exceptions" for op in OPERATIONS),
+    *(f"DROP FUNCTION IF EXISTS invoice_exceptions_count_{op}()" for op in OPERATIONS),
+    "DROP FUNCTION IF EXISTS apply_invoice_exception_deltas(uuid[], int[], int[])",
+]
@@ -0,0 +1,130 @@
+"""Opt-in per-request SQL profile and N+1 detection.
+
+With SQL_PROFILING on, SqlProfilerMiddleware gives each request a SqlProfile,
+and the statement listeners in app/db/query_stats.py add every statement to it
+by shape: the SQL text with bind parameters, literals and expanded IN lists
+collapsed, so one query run with different values is one shape. A shape run
+SQL_REPEAT_THRESHOLD times or more in a request is reported as repeated, the
+usual sign of a lazy load or a query inside a loop.
+
+The response carries a Server-Timing header (statement count and database
+time, shown by browser dev tools), requests with repeated shapes are logged,
+and the last SQL_PROFILE_HISTORY profiles are served at GET /debug/sql-profiles.
+Shapes hold no parameter values, and profiles name the route template, not the
+path. Tests use SqlProfile directly through the query_budget fixture.
+"""
+import logging
+import re
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PARAM = re.compile(r"%\(\w+\)s|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """The statement with whitespace normalised and every value (and list of values) replaced by "?"."""
+    shape = _PARAM.sub("?", _SPACE.sub(" ", statement).strip())
+    return _PARAM_LIST.sub("?", shape)
+
+
+class SqlProfile:
+    """Statements run for one request (or one test block), grouped by shape."""
+
+    __slots__ = ("queries", "seconds", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        # shape -> [count, seconds]
+        self.shapes: dict[str, list] = {}
+
+    def add(self, statement: str, seconds: float):
+        self.queries += 1
+        self.seconds += seconds
+        entry = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def repeated(self, threshold: int) -> list[dict]:
+        """Shapes run at least `threshold` times, most frequent first."""
+        return [
+            {"statement": shape, "count": count, "db_ms": round(seconds * 1000, 2)}
+            for shape, (count, seconds) in sorted(self.shapes.items(), key=lambda item: -item[1][0])
+            if count >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.queries} queries"'
+
+
+_current_profile: ContextVar[SqlProfile | None] = ContextVar("sql_profile", default=None)
+_recent: deque[dict] = deque(maxlen=settings.SQL_PROFILE_HISTORY)
+
+
+def record_statement(statement: str, seconds: float):
+    """Add a statement to the current request's profile (no-op unless the request is profiled)."""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add(statement, seconds)
+
+
+def recent_profiles() -> list[dict]:
+    """Profiles of the most recent requests, newest first."""
+    return list(reversed(_recent))
+
+
+def _finish(scope: Scope, status: int, profile: SqlProfile):
+    route = getattr(scope.get("route"), "path", None) or "unmatched"
+    repeated = profile.repeated(settings.SQL_REPEAT_THRESHOLD)
+    _recent.append({
+        "method": scope["method"],
+        "route": route,
+        "status": status,
+        "queries": profile.queries,
+        "db_ms": round(profile.seconds * 1000, 2),
+        "repeated": repeated,
+    })
+    if repeated:
+        logger.warning(
+            "Possible N+1 in %s %s: %s", scope["method"], route,
+            "; ".join(f"{r['count']}x {r['statement'][:200]}" for r in repeated),
+        )
+
+
+class SqlProfilerMiddleware:
+    """Profile each request's SQL while SQL_PROFILING is on; adds the Server-Timing header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.SQL_PROFILING:
+            await self.app(scope, receive, send)
+            return
+        profile = SqlProfile()
+        token = _current_profile.set(profile)
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Statements run while a streaming body is sent come after this and are only in the profile
+                message["headers"] = [*message.get("headers", []), (b"server-timing", profile.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            _finish(scope, status, profile)
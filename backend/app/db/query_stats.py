@@ -0,0 +1,31 @@
+"""Per-request SQL statement counts and time.
+
+Listens on every Engine, so sessions on any pool (and the tests' engine) are
+covered. Each statement's execution time goes to the current request's
+RequestContext via record_query(); MetricsMiddleware turns the totals into the
+http_request_db_queries / http_request_db_seconds histograms. Profiled requests
+(SQL_PROFILING) also get the statement itself, via app/db/profiler.py.
+"""
+from time import perf_counter
+
+from sqlalchemy import Engine, event
+
+from app.core.metrics import record_query
+from app.db.profiler import record_statement
+
+# A connection runs one statement at a time; a failed statement's start is overwritten by the next one
+_STARTED_AT = "statement_started_at"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info[_STARTED_AT] = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop(_STARTED_AT, None)
+    if started is not None:
+        elapsed = perf_counter() - started
+        record_query(elapsed)
+        record_statement(statement, elapsed)
@@ -1,13 +1,31 @@
+"""Database engines and per-request sessions.
+
+`engine` is the primary. With DATABASE_READ_URL set, `read_engine` is a second
+pool on a read replica. get_read_db hands read-only endpoints a session on it.
+A replica lags the primary, so a successful mutating request sets the
+READ_PRIMARY_COOKIE for READ_YOUR_WRITES_SECONDS (ReadYourWritesMiddleware).
+While the cookie is present, get_read_db uses the primary and the client sees
+its own change.
+"""
 from collections.abc import Generator
 
-from sqlalchemy import create_engine
+from fastapi import Request
 from sqlalchemy.orm import Session, sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import settings
+from app.db import query_stats  # noqa: F401  (registers the per-request statement listeners)
+from app.db.pool import create_pooled_engine
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_size=10)
+engine = create_pooled_engine(settings.DATABASE_URL, "primary")
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+read_engine = create_pooled_engine(settings.DATABASE_READ_URL, "replica") if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autocommit=False, autoflush=False)
+
+READ_PRIMARY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -15,3 +33,39 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def reads_from_primary(request: Request) -> bool:
+    return not settings.DATABASE_READ_URL or READ_PRIMARY_COOKIE in request.cookies
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Session for read-only endpoints: the replica, or the primary right after this client wrote."""
+    db = SessionLocal() if reads_from_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Set READ_PRIMARY_COOKIE on successful mutating responses while a replica is configured."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not settings.DATABASE_READ_URL:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}=1; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; "
+                    "Path=/api; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -3,12 +3,20 @@ import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
+from app.api.deps import require_metrics_client, require_roles
+from app.api.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, render
+from app.db.profiler import SqlProfilerMiddleware, recent_profiles
+from app.db.session import ReadYourWritesMiddleware
+from app.models.user import Role, User
+from app.services.audit import start_audit_buffer, stop_audit_buffer
 from app.workers.scheduler import start_scheduler, stop_scheduler
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -18,9 +26,11 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Starting %s", settings.APP_NAME)
+    start_audit_buffer()
     start_scheduler()
     yield
     stop_scheduler()
+    stop_audit_buffer()
     logger.info("Shutting down %s", settings.APP_NAME)
 
 
@@ -32,7 +42,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(SqlProfilerMiddleware)
+# Outermost, so everything below (including CORS) runs inside the request's metrics scope
+app.add_middleware(MetricsMiddleware)
 
 # Rate limiting
 from slowapi import Limiter
@@ -43,7 +58,7 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # Register routers
-from app.api.routers import analytics, audit, auth, exports, invoices, payments, tenants, users
+from app.api.routers import analytics, audit, auth, exports, invoices, payments, stream, tenants, users
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
@@ -53,6 +68,24 @@ app.include_router(audit.router, prefix="/api")
 app.include_router(analytics.router, prefix="/api")
 app.include_router(exports.router, prefix="/api")
 app.include_router(tenants.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_client)])
+def metrics():
+    """Prometheus scrape endpoint (this process's samples only)."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/sql-profiles", include_in_schema=False)
+def sql_profiles(repeated_only: bool = False, current_user: User = Depends(require_roles(Role.ADMIN.value))):
+    """This process's most recent request SQL profiles, newest first (admins only, while SQL_PROFILING is on)."""
+    if not settings.SQL_PROFILING:
+        raise HTTPException(status_code=404, detail="SQL profiling is disabled")
+    profiles = recent_profiles()
+    if repeated_only:
+        profiles = [p for p in profiles if p["repeated"]]
+    return {"repeat_threshold": settings.SQL_REPEAT_THRESHOLD, "profiles": profiles}
 
 
 @app.get("/api/health")
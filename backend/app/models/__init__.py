@@ -6,3 +6,7 @@ from app.models.invoice_exception import InvoiceException
 from app.models.approval import Approval
 from app.models.audit_event import AuditEvent
 from app.models.ingestion_run import IngestionRun
+from app.models.invoice_text import InvoiceText
+from app.models.extraction_template import ExtractionTemplate
+from app.models.revalidation_job import RevalidationJob
+from app.models.exception_stats import TenantExceptionStats
@@ -1,21 +1,57 @@
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import DDL, ForeignKey, Index, String, event
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
+# Partition holding rows outside every monthly range; the maintenance job
+# (app/workers/audit_maintenance.py) moves them into proper partitions.
+DEFAULT_PARTITION = "audit_events_default"
+
 
 class AuditEvent(Base):
+    """Range-partitioned by month on timestamp, so the partition key is part of the primary key."""
+
     __tablename__ = "audit_events"
+    __table_args__ = (
+        # Keyset pagination order; the INCLUDE columns let action/entity_type filters be checked in the index
+        Index(
+            "ix_audit_events_tenant_ts_id", "tenant_id", "timestamp", "id",
+            postgresql_ops={"timestamp": "DESC", "id": "DESC"},
+            postgresql_include=["action", "entity_type"],
+        ),
+        # Selective action filters (e.g. USER_CREATED) page without walking the whole tenant range
+        Index(
+            "ix_audit_events_tenant_action_ts_id", "tenant_id", "action", "timestamp", "id",
+            postgresql_ops={"timestamp": "DESC", "id": "DESC"},
+        ),
+        # Per-entity history (GET /api/audit/entity/...)
+        Index("ix_audit_events_tenant_entity_ts", "tenant_id", "entity_type", "entity_id", "timestamp"),
+        # metadata @> '{...}' containment search; jsonb_path_ops is smaller and faster than the default opclass
+        Index(
+            "ix_audit_events_metadata", "metadata",
+            postgresql_using="gin", postgresql_ops={"metadata": "jsonb_path_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
-    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
-    timestamp: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC), index=True)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(primary_key=True, default=lambda: datetime.now(UTC))
     actor_user_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("users.id"), nullable=True)
     action: Mapped[str] = mapped_column(String(100), nullable=False)
     entity_type: Mapped[str] = mapped_column(String(50), default="")
     entity_id: Mapped[str] = mapped_column(String(100), default="")
     metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONB, nullable=True)
+
+
+# A partitioned table rejects inserts until some partition covers them; create_all
+# (tests, fresh dev databases) gets the catch-all partition, migrations add the monthly ones.
+event.listen(
+    AuditEvent.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF audit_events DEFAULT"),
+)
@@ -0,0 +1,33 @@
+"""Exception counters kept by Postgres triggers on invoice_exceptions.
+
+Per invoice: invoices.exception_count / open_exception_count. Per tenant:
+tenant_exception_stats. Statement-level AFTER triggers fold every INSERT,
+UPDATE and DELETE on invoice_exceptions into both, in the same transaction.
+This covers ORM flushes, bulk inserts (validate_many) and the set-based
+statements of the re-validation job and duplicate sweep alike. The trigger
+DDL is shared with migration 015 (app/db/ddl/exception_counters.py).
+"""
+import uuid
+
+from sqlalchemy import DDL, ForeignKey, Integer, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.ddl.exception_counters import STATEMENTS
+from app.models.invoice_exception import InvoiceException
+
+
+class TenantExceptionStats(Base):
+    __tablename__ = "tenant_exception_stats"
+
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    total_exceptions: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    open_exceptions: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Invoices with at least one exception (ever / still open)
+    invoices_with_exceptions: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    invoices_with_open_exceptions: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+
+# create_all (tests, fresh dev databases) gets the same triggers as migration 015
+for _statement in STATEMENTS:
+    event.listen(InvoiceException.__table__, "after_create", DDL(_statement))
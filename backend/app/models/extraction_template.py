@@ -0,0 +1,32 @@
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ExtractionTemplate(Base):
+    """A learned per-sender / per-vendor extraction layout (see app/services/template_store.py)."""
+
+    __tablename__ = "extraction_templates"
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "sender_domain", "vendor", name="uq_extraction_templates_key"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+    # Either part may be "" (no sender for uploads; vendor not known before extraction)
+    sender_domain: Mapped[str] = mapped_column(String(255), default="")
+    vendor: Mapped[str] = mapped_column(String(255), default="")
+    # field -> regex sources, field -> constant value, field -> label line index
+    patterns: Mapped[dict] = mapped_column(JSONB, default=dict)
+    constants: Mapped[dict] = mapped_column(JSONB, default=dict)
+    positions: Mapped[dict] = mapped_column(JSONB, default=dict)
+    # Invoices the template read completely vs. ones that still needed the generic rules
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    misses: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+    last_used_at: Mapped[datetime | None] = mapped_column(nullable=True)
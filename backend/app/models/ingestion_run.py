@@ -1,11 +1,23 @@
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
+# Upper bounds (ms) of the end-to-end latency histogram buckets stored per run.
+# Keys in latency_histogram are these bounds as strings, plus "+Inf".
+LATENCY_BUCKETS_MS = (1_000, 5_000, 15_000, 30_000, 60_000, 300_000, 900_000, 3_600_000, 86_400_000)
+
+
+def latency_bucket(latency_ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if latency_ms <= bound:
+            return str(bound)
+    return "+Inf"
+
 
 class IngestionRun(Base):
     __tablename__ = "ingestion_runs"
@@ -22,3 +34,15 @@ class IngestionRun(Base):
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
     retries_count: Mapped[int] = mapped_column(Integer, default=0)
     status: Mapped[str] = mapped_column(String(20), default="SUCCESS")
+
+    # Per-stage time in milliseconds. Parse and write are summed across parse workers.
+    fetch_ms: Mapped[int] = mapped_column(Integer, default=0)
+    parse_ms: Mapped[int] = mapped_column(Integer, default=0)
+    write_ms: Mapped[int] = mapped_column(Integer, default=0)
+    flush_ms: Mapped[int] = mapped_column(Integer, default=0)
+    ack_ms: Mapped[int] = mapped_column(Integer, default=0)
+    bytes_ingested: Mapped[int] = mapped_column(BigInteger, default=0)
+    # Email Date header → invoice creation, bucketed by LATENCY_BUCKETS_MS
+    latency_histogram: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    latency_samples: Mapped[int] = mapped_column(Integer, default=0)
+    latency_sum_ms: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -2,7 +2,7 @@ import uuid
 from datetime import UTC, datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, Integer, Numeric, String, Text, Date
+from sqlalchemy import DDL, Date, ForeignKey, Index, Integer, Numeric, String, Text, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -18,6 +18,17 @@ class InvoiceStatus(str, Enum):
     PAID = "PAID"
 
 
+# Statuses shown in the review queue; the partial index below is defined over exactly this set
+REVIEW_STATUSES = (InvoiceStatus.NEW.value, InvoiceStatus.VALIDATED.value, InvoiceStatus.APPROVAL_PENDING.value)
+
+
+# Free-text columns behind ILIKE filters and /invoices/fuzzy-search; each gets a pg_trgm GIN index
+TRIGRAM_COLUMNS = ("vendor", "invoice_number", "email_subject", "email_from")
+
+# Normalized field hash and file hash compared by the DUPLICATE_INVOICE rule
+DEDUPE_COLUMNS = ("dedupe_key", "content_sha256")
+
+
 class InvoiceSource(str, Enum):
     UPLOAD = "UPLOAD"
     EMAIL = "EMAIL"
@@ -25,9 +36,31 @@ class InvoiceSource(str, Enum):
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Invoice list / exports / analytics: tenant plus a date range, optionally one status
+        Index("ix_invoices_tenant_status_created", "tenant_id", "status", "created_at"),
+        Index("ix_invoices_tenant_created", "tenant_id", "created_at"),
+        # Most invoices are APPROVED/PAID; the review queue only ever reads the few that aren't
+        Index(
+            "ix_invoices_review_queue", "tenant_id", "created_at",
+            postgresql_ops={"created_at": "DESC"},
+            postgresql_include=["source"],
+            postgresql_where=text("status IN ({})".format(", ".join(f"'{s}'" for s in REVIEW_STATUSES))),
+        ),
+        # Trigram indexes serve ILIKE '%x%', prefix ILIKE and the similarity operators alike
+        *(
+            Index(f"ix_invoices_{col}_trgm", col, postgresql_using="gin", postgresql_ops={col: "gin_trgm_ops"})
+            for col in TRIGRAM_COLUMNS
+        ),
+        # Duplicate lookups (app/services/dedupe.py); "" means no key, so only real keys are indexed
+        *(
+            Index(f"ix_invoices_{col}", "tenant_id", col, postgresql_where=text(f"{col} <> ''"))
+            for col in DEDUPE_COLUMNS
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
-    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
     vendor: Mapped[str] = mapped_column(String(255), default="")
     invoice_number: Mapped[str] = mapped_column(String(255), default="")
     invoice_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)
@@ -41,6 +74,15 @@ class Invoice(Base):
     email_subject: Mapped[str | None] = mapped_column(String(1000), nullable=True)
     email_from: Mapped[str | None] = mapped_column(String(500), nullable=True)
     attachment_count: Mapped[int] = mapped_column(Integer, default=0)
+    # sha256 hex digests; maintained by app/services/dedupe.py, NULL until computed
+    dedupe_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Maintained by triggers on invoice_exceptions (app/models/exception_stats.py); never set these directly
+    exception_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    open_exception_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Review-queue claim (POST /invoices/review-queue/claim); expired claims are free to take
+    claimed_by_user_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    claimed_until: Mapped[datetime | None] = mapped_column(nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
     updated_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
@@ -48,3 +90,7 @@ class Invoice(Base):
     exceptions = relationship("InvoiceException", back_populates="invoice", lazy="selectin")
     approvals = relationship("Approval", back_populates="invoice", lazy="selectin")
     payments = relationship("Payment", back_populates="invoice", lazy="selectin")
+
+
+# gin_trgm_ops needs the extension before create_all (tests, fresh dev databases) builds the indexes
+event.listen(Invoice.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
@@ -1,7 +1,7 @@
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import ForeignKey, Index, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -9,9 +9,15 @@ from app.db.base import Base
 
 class InvoiceException(Base):
     __tablename__ = "invoice_exceptions"
+    __table_args__ = (
+        # Exception analytics: one tenant's exceptions by created_at range
+        Index("ix_invoice_exceptions_tenant_created", "tenant_id", "created_at"),
+        # Open exceptions are the few that queries ask about (review filters, re-validation, bulk resolve)
+        Index("ix_invoice_exceptions_open", "tenant_id", "code", "invoice_id", postgresql_where=text("resolved_at IS NULL")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
-    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
     invoice_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("invoices.id"), nullable=False, index=True)
     code: Mapped[str] = mapped_column(String(50), nullable=False)
     message: Mapped[str] = mapped_column(Text, nullable=False)
@@ -0,0 +1,33 @@
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import Computed, ForeignKey, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+# No stemming or stop words: invoice text is mostly names, codes and numbers (PO-4471, TRN 1003...)
+TEXT_SEARCH_CONFIG = "simple"
+
+
+class InvoiceText(Base):
+    """Text extracted from an invoice's stored file, for full-text search (app/workers/text_indexer.py)."""
+
+    __tablename__ = "invoice_texts"
+    __table_args__ = (
+        Index("ix_invoice_texts_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    invoice_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
+    # The file the text came from; an invoice whose file_path no longer matches is extracted again
+    file_path: Mapped[str] = mapped_column(Text, nullable=False)
+    content: Mapped[str] = mapped_column(Text, default="")
+    page_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Set when extraction failed (unreadable or unsupported file); the row still marks the file as done
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    extracted_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', content)", persisted=True),
+    )
@@ -0,0 +1,43 @@
+import uuid
+from datetime import UTC, datetime
+from enum import Enum
+
+from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RevalidationStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    # A later settings change queued a newer job that covers the same invoices
+    SUPERSEDED = "SUPERSEDED"
+
+
+ACTIVE_STATUSES = (RevalidationStatus.PENDING.value, RevalidationStatus.RUNNING.value)
+
+
+class RevalidationJob(Base):
+    """Re-checks a tenant's open invoices against settings_version (app/workers/revalidator.py)."""
+
+    __tablename__ = "revalidation_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
+    settings_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    requested_by_user_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    status: Mapped[str] = mapped_column(String(20), default=RevalidationStatus.PENDING.value)
+    # Affected invoices counted when the job starts; progress is processed / total
+    total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    exceptions_resolved: Mapped[int] = mapped_column(Integer, default=0)
+    exceptions_created: Mapped[int] = mapped_column(Integer, default=0)
+    # Keyset cursor: the last invoice id done; a restarted job resumes after it
+    last_invoice_id: Mapped[uuid.UUID | None] = mapped_column(nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+    started_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(nullable=True)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import String
+from sqlalchemy import Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -14,6 +14,8 @@ class Tenant(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     inbound_email_alias: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     allowed_currencies: Mapped[str] = mapped_column(String(255), default="AED,USD,EUR,GBP")
+    # Bumped whenever a setting the validation rules read changes; keys the compiled rule cache
+    settings_version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
 
     users = relationship("User", back_populates="tenant", lazy="selectin")
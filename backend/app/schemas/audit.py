@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AuditEventResponse(BaseModel):
@@ -13,3 +13,19 @@ class AuditEventResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AuditEntityRef(BaseModel):
+    entity_type: str
+    entity_id: str
+
+
+class AuditEntityBatchRequest(BaseModel):
+    entities: list[AuditEntityRef] = Field(min_length=1, max_length=100)
+    limit_per_entity: int = Field(100, ge=1, le=500)
+
+
+class AuditEntityHistory(BaseModel):
+    entity_type: str
+    entity_id: str
+    events: list[AuditEventResponse]
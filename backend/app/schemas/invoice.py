@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+import uuid
+
+from pydantic import BaseModel, Field, model_validator
 
 
 class InvoiceUploadMeta(BaseModel):
@@ -21,6 +23,25 @@ class ExceptionResponse(BaseModel):
         from_attributes = True
 
 
+class ExceptionResolveRequest(BaseModel):
+    """Open exceptions to resolve: by id, or every open one on the given invoices (optionally of one code)."""
+
+    exception_ids: list[uuid.UUID] = Field(default_factory=list, max_length=1000)
+    invoice_ids: list[uuid.UUID] = Field(default_factory=list, max_length=1000)
+    code: str | None = None
+
+    @model_validator(mode="after")
+    def _has_target(self):
+        if not self.exception_ids and not self.invoice_ids:
+            raise ValueError("exception_ids or invoice_ids is required")
+        return self
+
+
+class ExceptionResolveResponse(BaseModel):
+    resolved: int
+    invoices: int
+
+
 class ApprovalResponse(BaseModel):
     id: str
     decided_by_user_id: str
@@ -58,6 +79,8 @@ class InvoiceResponse(BaseModel):
     email_subject: str | None = None
     email_from: str | None = None
     attachment_count: int = 0
+    claimed_by_user_id: str | None = None
+    claimed_until: str | None = None
     created_at: str
     updated_at: str
     exceptions: list[ExceptionResponse] = []
@@ -73,3 +96,17 @@ class InvoiceListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+
+
+class InvoiceSearchHit(InvoiceResponse):
+    score: float
+
+
+class InvoiceTextHit(InvoiceResponse):
+    score: float
+    headline: str
+
+
+class VendorSuggestion(BaseModel):
+    vendor: str
+    invoice_count: int
@@ -1,9 +1,170 @@
-"""Audit logging helper service."""
+"""Audit logging service: the single entry point for writing AuditEvent rows.
+
+Events are transactional by default: they are added to the caller's session and
+commit or roll back with the change they describe. Callers may pass
+transactional=False for events that don't need that guarantee (e.g. LOGIN);
+when AUDIT_BUFFERED is enabled those go through a write-behind buffer that
+flushes with multi-row INSERTs every AUDIT_FLUSH_INTERVAL_MS or
+AUDIT_FLUSH_MAX_EVENTS, and spools to a local JSONL file if the database is
+unavailable so nothing is lost on shutdown.
+"""
+import json
+import logging
+import os
+import threading
 import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.models.audit_event import AuditEvent
+from app.services.events import publish_audit_rows
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    """In-process write-behind buffer for non-transactional audit events."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        flush_interval_ms: int | None = None,
+        max_events: int | None = None,
+        spool_path: str | None = None,
+    ):
+        self._session_factory = session_factory or SessionLocal
+        self.flush_interval = (flush_interval_ms or settings.AUDIT_FLUSH_INTERVAL_MS) / 1000
+        self.max_events = max_events or settings.AUDIT_FLUSH_MAX_EVENTS
+        self.spool_path = spool_path or settings.AUDIT_SPOOL_PATH
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        # Serialises flushes between the background thread and stop()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self.replay_spool()
+        self._thread = threading.Thread(target=self._run, name="audit-buffer", daemon=True)
+        self._thread.start()
+        logger.info("Audit buffer started (every %.0f ms or %d events)", self.flush_interval * 1000, self.max_events)
+
+    def stop(self):
+        """Stop the flusher and write out everything still buffered (to the spool if the DB is down)."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=max(5.0, self.flush_interval * 2))
+        self._thread = None
+        self.flush()
+
+    def enqueue(self, event: AuditEvent):
+        row = {
+            "id": event.id,
+            "tenant_id": event.tenant_id,
+            "timestamp": event.timestamp,
+            "actor_user_id": event.actor_user_id,
+            "action": event.action,
+            "entity_type": event.entity_type,
+            "entity_id": event.entity_id,
+            "metadata_json": event.metadata_json,
+        }
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_events
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Insert all buffered rows in one multi-row INSERT. Returns the number written or spooled."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self._insert(rows)
+            except Exception as e:
+                logger.error("Audit buffer flush of %d events failed, spooling to %s: %s", len(rows), self.spool_path, e)
+                self._spool(rows)
+            else:
+                publish_audit_rows(rows)
+            return len(rows)
+
+    def _insert(self, rows: list[dict]):
+        db = self._session_factory()
+        try:
+            db.execute(insert(AuditEvent), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _spool(self, rows: list[dict]):
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay_spool(self) -> int:
+        """Insert events left in the spool by a previous failed flush, then truncate it."""
+        if not os.path.exists(self.spool_path):
+            return 0
+        with open(self.spool_path, encoding="utf-8") as f:
+            rows = [_row_from_json(json.loads(line)) for line in f if line.strip()]
+        if rows:
+            try:
+                self._insert(rows)
+            except Exception as e:
+                logger.error("Could not replay %d spooled audit events: %s", len(rows), e)
+                return 0
+            logger.info("Replayed %d spooled audit events", len(rows))
+        os.remove(self.spool_path)
+        return len(rows)
+
+
+def _row_from_json(data: dict) -> dict:
+    data["id"] = uuid.UUID(data["id"])
+    data["tenant_id"] = uuid.UUID(data["tenant_id"])
+    data["actor_user_id"] = uuid.UUID(data["actor_user_id"]) if data.get("actor_user_id") else None
+    data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+    return data
+
+
+audit_buffer = AuditBuffer()
+
+
+def start_audit_buffer():
+    if settings.AUDIT_BUFFERED:
+        audit_buffer.start()
+
+
+def stop_audit_buffer():
+    audit_buffer.stop()
 
 
 def log_event(
@@ -14,14 +175,26 @@ def log_event(
     entity_id: str = "",
     actor_user_id: uuid.UUID | None = None,
     metadata: dict | None = None,
+    transactional: bool = True,
 ) -> AuditEvent:
+    """Record an audit event.
+
+    transactional=True (default) adds the event to `db`, so it commits with the caller's change.
+    transactional=False hands it to the write-behind buffer when AUDIT_BUFFERED is on;
+    otherwise it falls back to the session like a transactional event.
+    """
     event = AuditEvent(
+        id=uuid.uuid4(),
         tenant_id=tenant_id,
+        timestamp=datetime.now(UTC),
         actor_user_id=actor_user_id,
         action=action,
         entity_type=entity_type,
         entity_id=entity_id,
         metadata_json=metadata,
     )
+    if not transactional and audit_buffer.running:
+        audit_buffer.enqueue(event)
+        return event
     db.add(event)
     return event
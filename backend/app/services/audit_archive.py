@@ -0,0 +1,267 @@
+"""Cold storage for audit events older than AUDIT_HOT_DAYS.
+
+Layout: <AUDIT_ARCHIVE_DIR>/<tenant_id>/<first>_<last>_<token>.seg.gz plus a
+sidecar <same name>.idx.json. A segment holds one tenant's events sorted by
+(timestamp, id) as JSON lines, gzip-compressed as independent members of
+AUDIT_ARCHIVE_BLOCK_EVENTS events each. The sidecar is the sparse index (byte
+offset, length, first/last timestamp and count per block), so a date-range
+read only decompresses the blocks it overlaps. Segments are immutable and the
+sidecar is renamed into place last; a segment without one is ignored.
+"""
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.core.config import settings
+from app.models.audit_event import AuditEvent
+
+SEGMENT_SUFFIX = ".seg.gz"
+INDEX_SUFFIX = ".idx.json"
+_NAME_TS_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class _Block(NamedTuple):
+    path: str
+    offset: int
+    length: int
+    first_ts: datetime
+    last_ts: datetime
+    count: int
+
+
+def _tenant_dir(tenant_id: uuid.UUID, archive_dir: str | None = None) -> str:
+    return os.path.join(archive_dir or settings.AUDIT_ARCHIVE_DIR, str(tenant_id))
+
+
+def _event_row(e: AuditEvent) -> dict:
+    return {
+        "id": str(e.id),
+        "tenant_id": str(e.tenant_id),
+        "timestamp": e.timestamp.isoformat(),
+        "actor_user_id": str(e.actor_user_id) if e.actor_user_id else None,
+        "action": e.action,
+        "entity_type": e.entity_type,
+        "entity_id": e.entity_id,
+        "metadata": e.metadata_json,
+    }
+
+
+def _row_to_event(row: dict) -> AuditEvent:
+    """Transient (never added to a session) AuditEvent so callers can treat archive and DB rows alike."""
+    return AuditEvent(
+        id=uuid.UUID(row["id"]),
+        tenant_id=uuid.UUID(row["tenant_id"]),
+        timestamp=datetime.fromisoformat(row["timestamp"]),
+        actor_user_id=uuid.UUID(row["actor_user_id"]) if row["actor_user_id"] else None,
+        action=row["action"],
+        entity_type=row["entity_type"],
+        entity_id=row["entity_id"],
+        metadata_json=row["metadata"],
+    )
+
+
+def _write_atomically(path: str, data: bytes | list[bytes]):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for chunk in data if isinstance(data, list) else [data]:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def write_segment(
+    tenant_id: uuid.UUID,
+    events: list[AuditEvent],
+    archive_dir: str | None = None,
+    block_events: int | None = None,
+) -> str:
+    """Write `events` (sorted by timestamp, id) as a new segment and return its path."""
+    block_events = block_events or settings.AUDIT_ARCHIVE_BLOCK_EVENTS
+    directory = _tenant_dir(tenant_id, archive_dir)
+    os.makedirs(directory, exist_ok=True)
+    first, last = events[0].timestamp, events[-1].timestamp
+    name = f"{first:{_NAME_TS_FORMAT}}_{last:{_NAME_TS_FORMAT}}_{uuid.uuid4().hex[:8]}"
+    segment_path = os.path.join(directory, name + SEGMENT_SUFFIX)
+
+    members: list[bytes] = []
+    blocks: list[dict] = []
+    offset = 0
+    for start in range(0, len(events), block_events):
+        chunk = events[start:start + block_events]
+        payload = "".join(json.dumps(_event_row(e), separators=(",", ":")) + "\n" for e in chunk)
+        member = gzip.compress(payload.encode(), mtime=0)
+        blocks.append({
+            "offset": offset,
+            "length": len(member),
+            "first_ts": chunk[0].timestamp.isoformat(),
+            "last_ts": chunk[-1].timestamp.isoformat(),
+            "count": len(chunk),
+        })
+        members.append(member)
+        offset += len(member)
+
+    _write_atomically(segment_path, members)
+    index = {
+        "tenant_id": str(tenant_id),
+        "first_ts": first.isoformat(),
+        "last_ts": last.isoformat(),
+        "count": len(events),
+        "blocks": blocks,
+    }
+    _write_atomically(os.path.join(directory, name + INDEX_SUFFIX), json.dumps(index).encode())
+    return segment_path
+
+
+def remove_segment(segment_path: str):
+    """Delete a segment and its index (used when the DB side of an archive run fails)."""
+    for path in (segment_path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX, segment_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache(maxsize=4096)
+def _load_index(index_path: str) -> tuple[_Block, ...]:
+    # Segments never change once written, so caching by path is safe.
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    segment_path = index_path[: -len(INDEX_SUFFIX)] + SEGMENT_SUFFIX
+    return tuple(
+        _Block(
+            segment_path, b["offset"], b["length"],
+            datetime.fromisoformat(b["first_ts"]), datetime.fromisoformat(b["last_ts"]), b["count"],
+        )
+        for b in index["blocks"]
+    )
+
+
+def _overlaps(first: datetime, last: datetime, start: datetime | None, end: datetime | None) -> bool:
+    return (start is None or last >= start) and (end is None or first <= end)
+
+
+def _candidate_blocks(
+    tenant_id: uuid.UUID, start: datetime | None, end: datetime | None, archive_dir: str | None,
+) -> list[_Block]:
+    directory = _tenant_dir(tenant_id, archive_dir)
+    if not os.path.isdir(directory):
+        return []
+    blocks: list[_Block] = []
+    for name in os.listdir(directory):
+        if not name.endswith(INDEX_SUFFIX):
+            continue
+        # The file name carries the segment's time span, so most segments are pruned without opening them
+        first_s, last_s, _ = name[: -len(INDEX_SUFFIX)].split("_", 2)
+        first = datetime.strptime(first_s, _NAME_TS_FORMAT)
+        last = datetime.strptime(last_s, _NAME_TS_FORMAT).replace(microsecond=999999)
+        if not _overlaps(first, last, start, end):
+            continue
+        blocks.extend(
+            b for b in _load_index(os.path.join(directory, name)) if _overlaps(b.first_ts, b.last_ts, start, end)
+        )
+    return blocks
+
+
+def _read_block(block: _Block) -> list[dict]:
+    with open(block.path, "rb") as f:
+        f.seek(block.offset)
+        data = f.read(block.length)
+    return [json.loads(line) for line in gzip.decompress(data).splitlines()]
+
+
+def _matches(
+    row: dict, action: str | None, entity_type: str | None, metadata: dict | None, entity_id: str | None = None,
+) -> bool:
+    if action and row["action"] != action:
+        return False
+    if entity_type and row["entity_type"] != entity_type:
+        return False
+    if entity_id and row["entity_id"] != entity_id:
+        return False
+    if metadata:
+        stored = row["metadata"] or {}
+        return all(k in stored and stored[k] == v for k, v in metadata.items())
+    return True
+
+
+def search_archive(
+    tenant_id: uuid.UUID,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    before: tuple[datetime, uuid.UUID] | None = None,
+    action: str | None = None,
+    entity_type: str | None = None,
+    metadata: dict | None = None,
+    limit: int = 50,
+    archive_dir: str | None = None,
+    entity_id: str | None = None,
+) -> list[AuditEvent]:
+    """Archived events in [start, end] below the `before` keyset position, newest first.
+
+    Same ordering and filters as list_audit_events (plus entity_id, for entity
+    histories); timestamps are naive UTC.
+    Blocks are read newest first and reading stops once no remaining block can
+    beat the `limit`-th event found so far.
+    """
+    if before is not None:
+        end = before[0] if end is None else min(end, before[0])
+    blocks = sorted(_candidate_blocks(tenant_id, start, end, archive_dir), key=lambda b: b.last_ts, reverse=True)
+
+    found: list[tuple[tuple[datetime, uuid.UUID], dict]] = []
+    for block in blocks:
+        if len(found) >= limit and block.last_ts < found[-1][0][0]:
+            break
+        for row in _read_block(block):
+            key = (datetime.fromisoformat(row["timestamp"]), uuid.UUID(row["id"]))
+            if (start and key[0] < start) or (end and key[0] > end) or (before and key >= before):
+                continue
+            if _matches(row, action, entity_type, metadata, entity_id):
+                found.append((key, row))
+        found.sort(key=lambda item: item[0], reverse=True)
+        del found[limit:]
+    return [_row_to_event(row) for _, row in found]
+
+
+def search_archive_entities(
+    tenant_id: uuid.UUID,
+    entities: list[tuple[str, str]],
+    limit_per_entity: int,
+    archive_dir: str | None = None,
+) -> dict[tuple[str, str], list[AuditEvent]]:
+    """The newest `limit_per_entity` archived events of each (entity_type, entity_id), newest first.
+
+    Entities are not in the sparse index, so every block is a candidate; blocks
+    are read newest first, once for all entities, and reading stops when each
+    entity is full and no remaining block is newer than the oldest event kept.
+    """
+    found: dict[tuple[str, str], list[tuple[tuple[datetime, uuid.UUID], dict]]] = {key: [] for key in entities}
+    if not found:
+        return {}
+    blocks = sorted(_candidate_blocks(tenant_id, None, None, archive_dir), key=lambda b: b.last_ts, reverse=True)
+    for block in blocks:
+        kept = found.values()
+        if all(len(rows) >= limit_per_entity for rows in kept) and block.last_ts < min(rows[-1][0][0] for rows in kept):
+            break
+        for row in _read_block(block):
+            rows = found.get((row["entity_type"], row["entity_id"]))
+            if rows is not None:
+                rows.append(((datetime.fromisoformat(row["timestamp"]), uuid.UUID(row["id"])), row))
+        for rows in kept:
+            rows.sort(key=lambda item: item[0], reverse=True)
+            del rows[limit_per_entity:]
+    return {key: [_row_to_event(row) for _, row in rows] for key, rows in found.items()}
+
+
+def estimate_archived(
+    tenant_id: uuid.UUID,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    archive_dir: str | None = None,
+) -> int:
+    """Events in overlapping blocks, from the sparse indexes alone (an upper bound, like a plan estimate)."""
+    return sum(b.count for b in _candidate_blocks(tenant_id, start, end, archive_dir))
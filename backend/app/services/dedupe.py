@@ -0,0 +1,221 @@
+"""Duplicate invoice detection.
+
+Two invoices are duplicates when they share a dedupe key or the same file
+contents. The dedupe key is the sha256 of the normalized vendor, invoice number,
+amount and date. Both live on the invoice (dedupe_key, content_sha256) with
+partial (tenant_id, ...) btree indexes. A lookup is then one index probe per
+key, so find_duplicates serves the DUPLICATE_INVOICE validation rule at
+O(log n) per invoice. dedupe_key is kept current by mapper events on every
+insert and update. "" means "no key" (vendor or number missing), and NULL means
+"not computed yet" (rows from before the column existed; sweep_duplicates backfills them).
+
+sweep_duplicates flags existing data in one set-based INSERT ... SELECT. The
+oldest invoice of each group is the original; the others get an open
+DUPLICATE_INVOICE exception. Rejected invoices never count.
+"""
+import hashlib
+import re
+import uuid
+from collections.abc import Sequence
+from datetime import UTC, date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import String, bindparam, cast, event, func, literal, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.invoice_exception import InvoiceException
+from app.services.template_store import normalize_vendor
+
+DUPLICATE_CODE = "DUPLICATE_INVOICE"
+# Trailing words that vary between documents of the same company
+LEGAL_SUFFIXES = {"llc", "l l c", "ltd", "limited", "inc", "co", "corp", "company", "plc", "gmbh", "fze", "fzco", "fz", "est"}
+BACKFILL_BATCH_SIZE = 1000
+
+
+def duplicate_message(original_id) -> str:
+    return f"Possible duplicate of invoice {original_id}"
+
+
+def vendor_key(vendor: str | None) -> str:
+    words = normalize_vendor(vendor).split()
+    while words and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def number_key(invoice_number: str | None) -> str:
+    """Uppercase alphanumerics with leading zeros dropped from each digit run ("inv-0042" -> "INV42")."""
+    compact = re.sub(r"[^A-Z0-9]", "", (invoice_number or "").upper())
+    return re.sub(r"(?<![0-9])0+(?=[0-9])", "", compact)
+
+
+def dedupe_key(vendor: str | None, invoice_number: str | None, amount, invoice_date: date | None) -> str:
+    """Hex sha256 of the normalized fields, or "" when vendor or number is missing."""
+    vendor_part, number_part = vendor_key(vendor), number_key(invoice_number)
+    if not vendor_part or not number_part:
+        return ""
+    try:
+        amount_part = str(Decimal(str(amount)).quantize(Decimal("0.01"))) if amount is not None else ""
+    except InvalidOperation:
+        amount_part = ""
+    date_part = invoice_date.isoformat() if invoice_date else ""
+    return hashlib.sha256("|".join((vendor_part, number_part, amount_part, date_part)).encode()).hexdigest()
+
+
+def invoice_dedupe_key(inv: Invoice) -> str:
+    return dedupe_key(inv.vendor, inv.invoice_number, inv.amount, inv.invoice_date)
+
+
+@event.listens_for(Invoice, "before_insert")
+@event.listens_for(Invoice, "before_update")
+def _set_dedupe_key(mapper, connection, target: Invoice):
+    target.dedupe_key = invoice_dedupe_key(target)
+
+
+def file_sha256(path: str) -> str:
+    """Hex sha256 of a file's contents, or "" when it can't be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return ""
+    return digest.hexdigest()
+
+
+def _sort_time(created_at: datetime | None) -> datetime:
+    # Not flushed yet means newest; stored values come back naive, fresh defaults are aware
+    return created_at.replace(tzinfo=None) if created_at else datetime.max
+
+
+def find_duplicates(db: Session, invoices: Sequence[Invoice]) -> list[uuid.UUID | None]:
+    """For each invoice, the id of an older, non-rejected invoice of its tenant with the same key or file.
+
+    One indexed query for the whole batch; duplicates within the batch are
+    matched against the batch's earlier entries.
+    """
+    keys = [invoice_dedupe_key(inv) for inv in invoices]
+    hashes = [inv.content_sha256 or "" for inv in invoices]
+    tenant_ids = {inv.tenant_id for inv in invoices}
+    batch_ids = [inv.id for inv in invoices if inv.id is not None]
+    wanted_keys, wanted_hashes = {k for k in keys if k}, {h for h in hashes if h}
+    if not wanted_keys and not wanted_hashes:
+        return [None] * len(invoices)
+
+    matches = []
+    if wanted_keys:
+        matches.append(Invoice.dedupe_key.in_(wanted_keys) & (Invoice.dedupe_key != ""))
+    if wanted_hashes:
+        matches.append(Invoice.content_sha256.in_(wanted_hashes) & (Invoice.content_sha256 != ""))
+    q = db.query(Invoice.id, Invoice.tenant_id, Invoice.dedupe_key, Invoice.content_sha256, Invoice.created_at).filter(
+        Invoice.tenant_id.in_(tenant_ids),
+        Invoice.status != InvoiceStatus.REJECTED.value,
+        or_(*matches),
+    )
+    if batch_ids:
+        q = q.filter(Invoice.id.notin_(batch_ids))
+    existing = q.order_by(Invoice.created_at, Invoice.id).all()
+
+    # (tenant, "k"/"h", value) -> the oldest (created_at, id) seen so far
+    originals: dict[tuple, tuple[datetime, uuid.UUID]] = {}
+    for row in existing:
+        for kind, value in (("k", row.dedupe_key), ("h", row.content_sha256)):
+            if value:
+                originals.setdefault((row.tenant_id, kind, value), (_sort_time(row.created_at), row.id))
+
+    result: list[uuid.UUID | None] = []
+    for inv, key, content in zip(invoices, keys, hashes, strict=True):
+        created = _sort_time(inv.created_at)
+        found = None
+        for lookup in ((inv.tenant_id, "k", key), (inv.tenant_id, "h", content)):
+            original = originals.get(lookup) if lookup[2] else None
+            if original is not None and original[0] <= created and (found is None or original < found):
+                found = original
+        result.append(found[1] if found else None)
+        if inv.status != InvoiceStatus.REJECTED.value:
+            for lookup in ((inv.tenant_id, "k", key), (inv.tenant_id, "h", content)):
+                if lookup[2]:
+                    originals.setdefault(lookup, (created, inv.id))
+    return result
+
+
+def backfill_keys(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Compute dedupe_key / content_sha256 for rows that predate them; returns rows updated (caller commits)."""
+    table = Invoice.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(dedupe_key=bindparam("key"), content_sha256=bindparam("content"))
+    )
+    total = 0
+    while True:
+        rows = (
+            db.query(Invoice.id, Invoice.vendor, Invoice.invoice_number, Invoice.amount, Invoice.invoice_date,
+                     Invoice.file_path, Invoice.content_sha256)
+            .filter(or_(Invoice.dedupe_key.is_(None), Invoice.content_sha256.is_(None)))
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return total
+        db.execute(stmt, [
+            {
+                "row_id": row.id,
+                "key": dedupe_key(row.vendor, row.invoice_number, row.amount, row.invoice_date),
+                "content": row.content_sha256 if row.content_sha256 is not None
+                else (file_sha256(row.file_path) if row.file_path else ""),
+            }
+            for row in rows
+        ])
+        total += len(rows)
+
+
+def _ranked(column):
+    """(id, tenant_id, original_id) for every invoice sharing a non-empty `column` value with an older one."""
+    original = func.first_value(Invoice.id).over(
+        partition_by=(Invoice.tenant_id, column), order_by=(Invoice.created_at, Invoice.id),
+    )
+    return select(Invoice.id, Invoice.tenant_id, original.label("original_id")).where(
+        column != "", Invoice.status != InvoiceStatus.REJECTED.value,
+    )
+
+
+def sweep_duplicates(db: Session) -> int:
+    """Flag every existing duplicate that has no open DUPLICATE_INVOICE exception; returns how many (caller commits).
+
+    Flagged APPROVAL_PENDING invoices go back to VALIDATED, like any invoice with exceptions.
+    """
+    backfill_keys(db)
+    grouped = union_all(_ranked(Invoice.dedupe_key), _ranked(Invoice.content_sha256)).subquery()
+    open_duplicate = (
+        select(InvoiceException.id)
+        .where(
+            InvoiceException.invoice_id == grouped.c.id,
+            InvoiceException.code == DUPLICATE_CODE,
+            InvoiceException.resolved_at.is_(None),
+        )
+        .exists()
+    )
+    flagged = (
+        select(
+            func.gen_random_uuid(), grouped.c.tenant_id, grouped.c.id, literal(DUPLICATE_CODE),
+            literal(duplicate_message("")) + cast(grouped.c.original_id, String),
+            literal("ERROR"), literal(datetime.now(UTC)),
+        )
+        .where(grouped.c.id != grouped.c.original_id, ~open_duplicate)
+        .distinct(grouped.c.id)
+        .order_by(grouped.c.id, grouped.c.original_id)
+    )
+    invoice_ids = db.execute(
+        insert(InvoiceException)
+        .from_select(["id", "tenant_id", "invoice_id", "code", "message", "severity", "created_at"], flagged)
+        .returning(InvoiceException.invoice_id)
+    ).scalars().all()
+    if invoice_ids:
+        db.query(Invoice).filter(
+            Invoice.id.in_(invoice_ids), Invoice.status == InvoiceStatus.APPROVAL_PENDING.value,
+        ).update({Invoice.status: InvoiceStatus.VALIDATED.value}, synchronize_session=False)
+    return len(invoice_ids)
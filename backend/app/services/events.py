@@ -0,0 +1,173 @@
+"""In-process broadcast of committed changes to Server-Sent Event subscribers.
+
+Session listeners collect new audit events and invoice status changes while a
+session flushes and publish them only after it commits, so subscribers never
+see rolled-back work. Each subscriber has a bounded queue; when a slow client
+falls behind, the oldest messages are dropped and an `overflow` event tells it
+to re-fetch. The hub is per process: with several API workers each one only
+streams the changes made by that worker (and its scheduler).
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.audit_event import AuditEvent
+from app.models.invoice import Invoice
+
+logger = logging.getLogger(__name__)
+
+AUDIT_EVENT = "audit"
+INVOICE_EVENT = "invoice"
+OVERFLOW_EVENT = "overflow"
+
+_PENDING_KEY = "pending_stream_events"
+
+
+class Subscription:
+    """One SSE client. Owned by the event loop that created it; filled via call_soon_threadsafe."""
+
+    def __init__(self, tenant_id: uuid.UUID, topics: frozenset[str], maxsize: int):
+        self.tenant_id = tenant_id
+        self.topics = topics
+        self.queue: asyncio.Queue[tuple[int, str, dict]] = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def _push(self, message: tuple[int, str, dict]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> tuple[int, str, dict] | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class EventHub:
+    def __init__(self, buffer_size: int | None = None):
+        self.buffer_size = buffer_size or settings.STREAM_BUFFER_SIZE
+        self._subscribers: dict[uuid.UUID, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def subscribe(self, tenant_id: uuid.UUID, topics: Iterable[str]) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        sub = Subscription(tenant_id, frozenset(topics), self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(tenant_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.tenant_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.tenant_id]
+
+    def subscriber_count(self, tenant_id: uuid.UUID | None = None) -> int:
+        with self._lock:
+            if tenant_id is not None:
+                return len(self._subscribers.get(tenant_id, ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, tenant_id: uuid.UUID, topic: str, data: dict):
+        """Thread-safe; a no-op when nobody from the tenant is listening."""
+        with self._lock:
+            subs = [s for s in self._subscribers.get(tenant_id, ()) if topic in s.topics]
+        if not subs:
+            return
+        message = (next(self._seq), topic, data)
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._push, message)
+            except RuntimeError:
+                # Loop already closed (shutdown); the stream generator will unsubscribe.
+                pass
+
+
+hub = EventHub()
+
+
+def audit_payload(e: AuditEvent) -> dict:
+    return {
+        "id": str(e.id),
+        "tenant_id": str(e.tenant_id),
+        "timestamp": e.timestamp.isoformat() if e.timestamp else "",
+        "actor_user_id": str(e.actor_user_id) if e.actor_user_id else None,
+        "action": e.action,
+        "entity_type": e.entity_type or "",
+        "entity_id": e.entity_id or "",
+        "metadata_json": e.metadata_json,
+    }
+
+
+def invoice_payload(inv: Invoice, previous_status: str | None) -> dict:
+    return {
+        "id": str(inv.id),
+        "status": inv.status,
+        "previous_status": previous_status,
+        "vendor": inv.vendor,
+        "invoice_number": inv.invoice_number,
+        "source": inv.source,
+    }
+
+
+def publish_audit_rows(rows: Iterable[dict]):
+    """For events written outside the ORM (the audit write-behind buffer)."""
+    for row in rows:
+        hub.publish(row["tenant_id"], AUDIT_EVENT, audit_payload(AuditEvent(**row)))
+
+
+def queue_invoice_changes(session: Session, rows: Iterable):
+    """For status changes made by set-based UPDATEs: published with the session's next commit.
+
+    Each row needs id, tenant_id, status, previous_status, vendor, invoice_number and source.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for row in rows:
+        pending.append((row.tenant_id, INVOICE_EVENT, {
+            "id": str(row.id),
+            "status": row.status,
+            "previous_status": row.previous_status,
+            "vendor": row.vendor,
+            "invoice_number": row.invoice_number,
+            "source": row.source,
+        }))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in session.new:
+        if isinstance(obj, AuditEvent):
+            pending.append((obj.tenant_id, AUDIT_EVENT, audit_payload(obj)))
+        elif isinstance(obj, Invoice):
+            pending.append((obj.tenant_id, INVOICE_EVENT, invoice_payload(obj, None)))
+    for obj in session.dirty:
+        if isinstance(obj, Invoice):
+            history = inspect(obj).attrs.status.history
+            if history.has_changes():
+                previous = history.deleted[0] if history.deleted else None
+                pending.append((obj.tenant_id, INVOICE_EVENT, invoice_payload(obj, previous)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session):
+    for tenant_id, topic, data in session.info.pop(_PENDING_KEY, []):
+        hub.publish(tenant_id, topic, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
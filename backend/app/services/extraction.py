@@ -0,0 +1,267 @@
+"""Rule-based field extraction from an invoice's text layer.
+
+A Template maps each field to regexes with a `value` group, tried in order.
+GENERIC_TEMPLATE knows the usual labels ("Invoice No.", "Date", "Grand Total",
+...). When it reads a document well, learn_template records the exact labels
+that document used and the line each was on, so later invoices from the same
+sender are read with narrow, label-specific patterns searched near those lines
+first (app/services/template_store.py caches them). The generic rules only run
+for the fields a template leaves empty.
+
+Everything here is pure and picklable: extract_invoice runs in the
+"field-extract" process pool (app/workers/field_extractor.py).
+"""
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from email.utils import parseaddr
+from functools import lru_cache
+
+from dateutil import parser as date_parser
+
+from app.services.pdf_text import ExtractedText, extract_text
+
+FIELDS = ("vendor", "invoice_number", "invoice_date", "amount", "currency")
+# A template that fills all of these is a full hit and the generic rules are skipped
+REQUIRED_FIELDS = ("vendor", "invoice_number", "invoice_date", "amount")
+# Lines either side of a template's recorded label position searched before the whole text
+POSITION_WINDOW = 2
+GENERIC_KEY = "generic"
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+VALUE_PATTERNS = {
+    # At least one digit, so "Invoice number and date" doesn't read "and" as the number
+    "invoice_number": r"(?=[A-Z0-9\-/.]*\d)[A-Z0-9][A-Z0-9\-/.]{0,39}",
+    "invoice_date": (
+        rf"\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}[/.\-]\d{{1,2}}[/.\-]\d{{2,4}}"
+        rf"|\d{{1,2}}[\s\-]{_MONTH}[\s\-,]+\d{{4}}|{_MONTH}\s+\d{{1,2}},?\s+\d{{4}}"
+    ),
+    "amount": r"(?:[A-Z]{3}|[$€£])?\s?\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|(?:[A-Z]{3}|[$€£])?\s?\d+(?:\.\d{1,2})?",
+    "vendor": r"[^\n]{2,80}",
+}
+# Ordered most to least specific; "total" alone last so "Grand Total" wins over a line-item total
+GENERIC_LABELS = {
+    # Only as "Vendor: ..." labels; a bare "Vendor" is as likely to be part of the name itself
+    "vendor": [r"(?:vendor|supplier|seller|bill(?:ed)?\s+from)(?=\s*:)"],
+    "invoice_number": [r"(?:tax\s+)?invoice\s*(?:no\.?|number|num\.?|#)", r"inv\.?\s*(?:no\.?|#)", r"bill\s*(?:no\.?|number)"],
+    "invoice_date": [r"(?:tax\s+)?invoice\s+date", r"date\s+of\s+issue", r"issue(?:d)?\s+(?:date|on)", r"(?<!due\s)date"],
+    "amount": [
+        r"grand\s+total", r"total\s+amount\s+(?:due|payable)", r"(?:amount|balance|total)\s+due",
+        r"total\s+(?:payable|amount)", r"total",
+    ],
+}
+# Fields whose last occurrence is the right one (totals come after line items)
+_LAST_MATCH_FIELDS = {"amount"}
+
+CURRENCY_CODES = ("AED", "USD", "EUR", "GBP", "SAR", "QAR", "OMR", "KWD", "BHD", "INR")
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "DHS": "AED", "DH": "AED"}
+_CURRENCY_RE = re.compile(
+    r"(?<![A-Z])(" + "|".join(CURRENCY_CODES + ("DHS", "DH")) + r")(?![A-Z])|([$€£])", re.IGNORECASE,
+)
+# Mailbox names that say nothing about who the vendor is
+_GENERIC_MAILBOXES = {"billing", "accounts", "invoice", "invoices", "noreply", "no-reply", "finance", "ar", "info"}
+_HEADER_WORDS = {"invoice", "tax invoice", "bill", "receipt", "statement", "page"}
+
+
+def _labelled(label: str, field_name: str) -> str:
+    return rf"(?<![A-Za-z])(?P<label>{label})\s*[:#\-]?\s*(?P<value>{VALUE_PATTERNS[field_name]})"
+
+
+@lru_cache(maxsize=4096)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern, re.IGNORECASE)
+
+
+@dataclass
+class Template:
+    """Extraction rules for one layout.
+
+    `constants` are fixed values (e.g. the vendor for a sender); `positions` is
+    the line index where each field's label was seen when the template was learned.
+    """
+
+    key: str
+    patterns: dict[str, list[str]]
+    constants: dict[str, str] = field(default_factory=dict)
+    positions: dict[str, int] = field(default_factory=dict)
+    id: uuid.UUID | None = None
+
+
+GENERIC_TEMPLATE = Template(
+    key=GENERIC_KEY,
+    patterns={name: [_labelled(label, name) for label in labels] for name, labels in GENERIC_LABELS.items()},
+)
+
+
+@dataclass
+class ExtractionResult:
+    fields: dict
+    text: ExtractedText
+    # Key of the template that supplied the fields ("generic" when only the generic rules matched)
+    template_key: str = GENERIC_KEY
+    # Labels seen by the generic rules that identified the fields, and their line index, for learn_template
+    labels: dict[str, str] = field(default_factory=dict)
+    positions: dict[str, int] = field(default_factory=dict)
+    # True when the generic rules had to fill a required field (a template miss, if one was given)
+    used_generic: bool = False
+
+
+def sender_domain(email_from: str | None) -> str | None:
+    address = parseaddr(email_from or "")[1]
+    _, at, domain = address.rpartition("@")
+    return domain.lower() if at and domain else None
+
+
+def parse_amount(raw: str) -> tuple[float | None, str | None]:
+    match = _CURRENCY_RE.search(raw)
+    currency = _currency(match) if match else None
+    digits = re.sub(r"[^\d.]", "", raw)
+    try:
+        return float(digits), currency
+    except ValueError:
+        return None, currency
+
+
+def parse_date(raw: str) -> date | None:
+    try:
+        # Day-first: most of our senders write 03/04/2026 for 3 April
+        return date_parser.parse(raw, dayfirst=True, yearfirst=bool(re.match(r"\d{4}-", raw))).date()
+    except (ValueError, OverflowError):
+        return None
+
+
+def _currency(match: re.Match) -> str:
+    token = (match.group(1) or match.group(2)).upper()
+    return CURRENCY_SYMBOLS.get(token, token)
+
+
+def _search(patterns: list[str], text: str, last: bool) -> re.Match | None:
+    for pattern in patterns:
+        compiled = _compile(pattern)
+        match = None
+        if last:
+            for match in compiled.finditer(text):
+                pass
+        else:
+            match = compiled.search(text)
+        if match:
+            return match
+    return None
+
+
+def _parse_field(name: str, raw: str) -> tuple[object, str | None]:
+    """(value, currency found alongside it) or (None, None) when the raw text doesn't parse."""
+    raw = raw.strip()
+    if name == "amount":
+        return parse_amount(raw)
+    if name == "invoice_date":
+        return parse_date(raw), None
+    if name == "invoice_number":
+        return raw.rstrip("."), None
+    return raw.strip(" :-"), None
+
+
+def _vendor_fallback(text: str, email_from: str | None) -> str | None:
+    display_name, address = parseaddr(email_from or "")
+    mailbox = address.partition("@")[0].lower()
+    if display_name and display_name.lower() not in _GENERIC_MAILBOXES and mailbox not in display_name.lower():
+        return display_name.strip()
+    for line in text.splitlines()[:5]:
+        if re.search(r"[A-Za-z]{2}", line) and line.strip().lower() not in _HEADER_WORDS and not re.search(r"\d{3}", line):
+            return line.strip()
+    return None
+
+
+def _search_near(patterns: list[str], text: str, line: int) -> re.Match | None:
+    """Search the lines around `line` only; match offsets are relative to that window."""
+    lines = text.splitlines()
+    window = "\n".join(lines[max(0, line - POSITION_WINDOW):line + POSITION_WINDOW + 1])
+    return _search(patterns, window, last=False)
+
+
+def apply_template(
+    template: Template,
+    text: str,
+    fields: dict,
+    labels: dict[str, str] | None = None,
+    positions: dict[str, int] | None = None,
+) -> set[str]:
+    """Fill the fields still None in `fields` from `template`; returns the names it filled.
+
+    When `labels` / `positions` are given they receive each matched label and its line index.
+    """
+    filled = set()
+    for name, value in template.constants.items():
+        if fields.get(name) is None:
+            fields[name] = value
+            filled.add(name)
+    for name, patterns in template.patterns.items():
+        if fields.get(name) is not None:
+            continue
+        last = name in _LAST_MATCH_FIELDS
+        match = None
+        if not last and name in template.positions:
+            match = _search_near(patterns, text, template.positions[name])
+        if match is None:
+            match = _search(patterns, text, last=last)
+        if not match:
+            continue
+        value, currency = _parse_field(name, match.group("value"))
+        if value in (None, ""):
+            continue
+        fields[name] = value
+        filled.add(name)
+        if currency and fields.get("currency") is None:
+            fields["currency"] = currency
+        if labels is not None:
+            labels[name] = match.group("label")
+        if positions is not None:
+            positions[name] = text.count("\n", 0, match.start())
+    return filled
+
+
+def extract_fields(text: str, email_from: str | None = None, template: Template | None = None) -> ExtractionResult:
+    """Read vendor, number, date, amount and currency from `text`.
+
+    The template (if any) goes first; the generic rules only run when it leaves a
+    required field empty, so a known layout never pays for the generic patterns.
+    """
+    fields: dict = dict.fromkeys(FIELDS)
+    result = ExtractionResult(fields=fields, text=ExtractedText(content=text))
+    if template is not None and apply_template(template, text, fields):
+        result.template_key = template.key
+    if any(fields[name] is None for name in REQUIRED_FIELDS):
+        generic = apply_template(GENERIC_TEMPLATE, text, fields, result.labels, result.positions)
+        result.used_generic = bool(generic & set(REQUIRED_FIELDS))
+
+    if fields["vendor"] is None:
+        fields["vendor"] = _vendor_fallback(text, email_from)
+    if fields["currency"] is None:
+        match = _CURRENCY_RE.search(text)
+        fields["currency"] = _currency(match) if match else None
+    return result
+
+
+def learn_template(key: str, result: ExtractionResult) -> Template | None:
+    """A sender-specific template from the labels the generic rules matched, or None if too little was found.
+
+    The learned patterns use the exact label text seen (e.g. "Bill Ref") and
+    remember its line; the vendor name becomes a constant for the sender.
+    """
+    if len(result.labels) < 2:
+        return None
+    patterns = {name: [_labelled(re.escape(label), name)] for name, label in result.labels.items() if name != "vendor"}
+    constants = {"vendor": result.fields["vendor"]} if result.fields.get("vendor") else {}
+    positions = {name: line for name, line in result.positions.items() if name in patterns}
+    return Template(key=key, patterns=patterns, constants=constants, positions=positions)
+
+
+def extract_invoice(file_path: str, email_from: str | None, template: Template | None, max_chars: int) -> ExtractionResult:
+    """Pool entry point: extract the file's text, then its fields."""
+    text = extract_text(file_path, max_chars)
+    if text.error:
+        return ExtractionResult(fields=dict.fromkeys(FIELDS), text=text)
+    result = extract_fields(text.content, email_from, template)
+    result.text = text
+    return result
@@ -0,0 +1,57 @@
+"""Plain-text extraction from stored invoice files, for the full-text index.
+
+Runs in the "text-index" and "field-extract" process pools, so everything here
+is a module-level function taking and returning picklable values.
+"""
+import os
+from dataclasses import dataclass
+
+from pypdf import PdfReader
+
+PLAIN_TEXT_EXTENSIONS = {".txt", ".csv"}
+
+
+@dataclass
+class ExtractedText:
+    content: str
+    page_count: int = 0
+    error: str | None = None
+
+
+def _clean(text: str) -> str:
+    # Postgres text columns reject NUL; PDFs produce them for unmapped glyphs. Line breaks are
+    # kept because field extraction (app/services/extraction.py) anchors on them.
+    lines = (" ".join(line.split()) for line in text.replace("\x00", " ").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _pdf_text(path: str, max_chars: int) -> ExtractedText:
+    reader = PdfReader(path)
+    parts: list[str] = []
+    size = 0
+    for page in reader.pages:
+        text = _clean(page.extract_text() or "")
+        parts.append(text)
+        size += len(text) + 1
+        if size >= max_chars:
+            break
+    return ExtractedText(content="\n".join(parts)[:max_chars], page_count=len(reader.pages))
+
+
+def extract_text(path: str, max_chars: int) -> ExtractedText:
+    """Text of a PDF (page by page, stopping at `max_chars`) or a plain-text file.
+
+    Never raises: missing, unreadable or unsupported files come back with empty
+    content and `error` set, so the indexer records them and moves on.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".pdf":
+            return _pdf_text(path, max_chars)
+        if ext in PLAIN_TEXT_EXTENSIONS:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return ExtractedText(content=_clean(f.read(max_chars)))
+        return ExtractedText(content="", error=f"Unsupported file type: {ext or 'none'}")
+    except Exception as e:
+        # pypdf raises a wide range of errors on malformed files; any of them just means "no text"
+        return ExtractedText(content="", error=f"{type(e).__name__}: {e}")
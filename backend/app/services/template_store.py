@@ -0,0 +1,195 @@
+"""Learned extraction templates: an in-memory LRU cache in front of extraction_templates.
+
+Templates are keyed by (tenant_id, sender_domain, vendor), either part "" when
+unknown. An invoice tries its most specific key first: sender and vendor, then
+sender only, then vendor only. Recurring senders are then read by their own
+template (the fast path) and only unknown layouts go through the generic rules.
+
+Lookups for a whole batch are loaded in one query (prefetch), and misses are
+cached too, so a known sender costs no database round trip. Hit/miss counts
+build up in memory and are written back by flush_counters with one UPDATE per
+template. A template that keeps missing (layout changed) is re-learned.
+Each process has its own cache. A template learned elsewhere is seen once the
+local entry is evicted. Until then this process may learn its own copy, and
+the upsert on the unique key merges the two.
+"""
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import bindparam, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.extraction_template import ExtractionTemplate
+from app.services.extraction import Template
+
+TemplateKey = tuple[uuid.UUID, str, str]
+# A template is re-learned once it has missed at least this often and more often than it hit
+RELEARN_MIN_MISSES = 5
+
+
+def normalize_vendor(vendor: str | None) -> str:
+    """Lowercase, punctuation-free, single-spaced vendor name used in template keys."""
+    return " ".join(re.sub(r"[^\w\s]", " ", (vendor or "").lower()).split())[:255]
+
+
+@dataclass
+class _Entry:
+    template: Template
+    hits: int
+    misses: int
+
+
+def _to_template(row: ExtractionTemplate) -> Template:
+    return Template(
+        key=f"{row.sender_domain or '-'}/{row.vendor or '-'}",
+        patterns=row.patterns or {},
+        constants=row.constants or {},
+        positions=row.positions or {},
+        id=row.id,
+    )
+
+
+class TemplateStore:
+    def __init__(self, capacity: int | None = None):
+        self.capacity = capacity or settings.EXTRACTION_TEMPLATE_CACHE_SIZE
+        self._cache: OrderedDict[TemplateKey, _Entry | None] = OrderedDict()
+        self._by_id: dict[uuid.UUID, _Entry] = {}
+        self._pending: dict[uuid.UUID, list[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def candidates(tenant_id: uuid.UUID, sender_domain: str | None, vendor: str | None) -> list[TemplateKey]:
+        """Keys to try for an invoice, most specific first."""
+        vendor_key = normalize_vendor(vendor)
+        keys = []
+        if sender_domain and vendor_key:
+            keys.append((tenant_id, sender_domain, vendor_key))
+        if sender_domain:
+            keys.append((tenant_id, sender_domain, ""))
+        if vendor_key:
+            keys.append((tenant_id, "", vendor_key))
+        return keys
+
+    def _put(self, key: TemplateKey, entry: _Entry | None):
+        # Caller holds the lock
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        if entry is not None:
+            self._by_id[entry.template.id] = entry
+        while len(self._cache) > self.capacity:
+            _, evicted = self._cache.popitem(last=False)
+            if evicted is not None:
+                self._by_id.pop(evicted.template.id, None)
+
+    def prefetch(self, db: Session, keys: Iterable[TemplateKey]):
+        """Load every key not cached yet in one query; keys without a row are cached as absent."""
+        with self._lock:
+            missing = {key for key in keys if key not in self._cache}
+        if not missing:
+            return
+        rows = (
+            db.query(ExtractionTemplate)
+            .filter(
+                tuple_(ExtractionTemplate.tenant_id, ExtractionTemplate.sender_domain, ExtractionTemplate.vendor)
+                .in_(list(missing))
+            )
+            .all()
+        )
+        found = {(r.tenant_id, r.sender_domain, r.vendor): _Entry(_to_template(r), r.hits, r.misses) for r in rows}
+        with self._lock:
+            for key in missing:
+                self._put(key, found.get(key))
+
+    def get(self, db: Session, tenant_id: uuid.UUID, sender_domain: str | None, vendor: str | None) -> Template | None:
+        keys = self.candidates(tenant_id, sender_domain, vendor)
+        self.prefetch(db, keys)
+        with self._lock:
+            for key in keys:
+                if key not in self._cache:
+                    continue
+                self._cache.move_to_end(key)
+                entry = self._cache[key]
+                if entry is not None:
+                    return entry.template
+        return None
+
+    def record(self, template: Template, hit: bool):
+        """Count one use of a stored template; written back by flush_counters."""
+        if template.id is None:
+            return
+        with self._lock:
+            pending = self._pending.setdefault(template.id, [0, 0])
+            pending[0 if hit else 1] += 1
+            entry = self._by_id.get(template.id)
+            if entry is not None:
+                if hit:
+                    entry.hits += 1
+                else:
+                    entry.misses += 1
+
+    def needs_relearn(self, template: Template) -> bool:
+        with self._lock:
+            entry = self._by_id.get(template.id)
+        return entry is not None and entry.misses >= RELEARN_MIN_MISSES and entry.misses > entry.hits
+
+    def save(self, db: Session, tenant_id: uuid.UUID, sender_domain: str, vendor: str, template: Template) -> Template:
+        """Upsert a learned template (resetting its counters) and cache it."""
+        vendor = normalize_vendor(vendor)
+        values = {
+            "tenant_id": tenant_id, "sender_domain": sender_domain, "vendor": vendor,
+            "patterns": template.patterns, "constants": template.constants, "positions": template.positions,
+            "hits": 0, "misses": 0,
+        }
+        stmt = insert(ExtractionTemplate).values(id=uuid.uuid4(), **values)
+        template_id = db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_extraction_templates_key",
+                set_={col: stmt.excluded[col] for col in ("patterns", "constants", "positions", "hits", "misses")},
+            ).returning(ExtractionTemplate.id)
+        ).scalar_one()
+        template.id = template_id
+        template.key = f"{sender_domain or '-'}/{vendor or '-'}"
+        with self._lock:
+            self._pending.pop(template_id, None)
+            self._put((tenant_id, sender_domain, vendor), _Entry(template, 0, 0))
+        return template
+
+    def flush_counters(self, db: Session):
+        """Add the hit/miss counts gathered since the last flush to the stored rows."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        table = ExtractionTemplate.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("template_id"))
+            .values(
+                hits=table.c.hits + bindparam("new_hits"),
+                misses=table.c.misses + bindparam("new_misses"),
+                last_used_at=datetime.now(UTC),
+            ),
+            [
+                {"template_id": template_id, "new_hits": hits, "new_misses": misses}
+                for template_id, (hits, misses) in pending.items()
+            ],
+        )
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._by_id.clear()
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+template_store = TemplateStore()
@@ -1,58 +1,225 @@
-"""Invoice validation service: runs rules and creates InvoiceException records."""
-from app.models.invoice import Invoice
+"""Invoice validation service: a registry of rules, compiled per tenant and run column-wise.
+
+Each rule registered with @rule gets the batch as columns (one list per field,
+plus "duplicate_of" from app/services/dedupe.find_duplicates) and the tenant's
+parsed settings, and yields (row index, message) for the invoices it flags.
+compiled_rules parses the tenant settings once and caches the result per
+(tenant_id, settings_version). Updating a tenant's settings bumps its version,
+so the next call recompiles. Rules that read settings also have a SQL form,
+which app/workers/revalidator.py uses to re-check open invoices in place.
+validate_many returns plain rows for a bulk insert into invoice_exceptions
+(insert_exceptions). validate_invoice keeps the single-invoice API and returns
+ORM objects.
+"""
+import uuid
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import ColumnElement, case, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.invoice import Invoice, InvoiceStatus
 from app.models.invoice_exception import InvoiceException
 from app.models.tenant import Tenant
+from app.services.dedupe import DUPLICATE_CODE, duplicate_message, find_duplicates
+from app.services.events import queue_invoice_changes
+
+DEFAULT_CURRENCIES = ("AED", "USD", "EUR", "GBP")
+# Statuses validation decides between; later statuses (APPROVED, ...) are never changed by it
+REVIEWED_STATUSES = (InvoiceStatus.VALIDATED.value, InvoiceStatus.APPROVAL_PENDING.value)
+COLUMNS = ("vendor", "invoice_number", "invoice_date", "amount", "currency", "file_path")
+
+
+@dataclass(frozen=True)
+class TenantRuleConfig:
+    """Tenant settings as the rules need them, parsed once per settings version."""
+
+    allowed_currencies: tuple[str, ...] = DEFAULT_CURRENCIES
+
+    @classmethod
+    def from_tenant(cls, tenant: Tenant | None) -> "TenantRuleConfig":
+        if tenant is None or not tenant.allowed_currencies:
+            return cls()
+        return cls(allowed_currencies=tuple(c.strip() for c in tenant.allowed_currencies.split(",")))
+
+
+Check = Callable[[dict[str, list], TenantRuleConfig], Iterable[tuple[int, str]]]
+# Set-based form of a rule: (config) -> (predicate over invoices that fail, message expression)
+SqlCheck = Callable[[TenantRuleConfig], tuple[ColumnElement[bool], ColumnElement[str]]]
+
+
+@dataclass(frozen=True)
+class Rule:
+    code: str
+    severity: str
+    check: Check
+    # Rules whose outcome depends on tenant settings also give a SQL form, used by the re-validation job
+    sql: SqlCheck | None = None
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    version: int | None
+    config: TenantRuleConfig
+    rules: tuple[Rule, ...]
+
+
+RULES: list[Rule] = []
+
+
+def rule(code: str, severity: str = "ERROR", sql: SqlCheck | None = None):
+    """Register a check under an exception code; rules run in registration order."""
+    def register(check: Check) -> Check:
+        RULES.append(Rule(code=code, severity=severity, check=check, sql=sql))
+        return check
+    return register
+
+
+def _blank(values: list, message: str) -> Iterable[tuple[int, str]]:
+    return ((i, message) for i, value in enumerate(values) if not value or not value.strip())
+
+
+@rule("MISSING_VENDOR")
+def _missing_vendor(cols, config):
+    return _blank(cols["vendor"], "Vendor name is required")
+
+
+@rule("MISSING_NUMBER")
+def _missing_number(cols, config):
+    return _blank(cols["invoice_number"], "Invoice number is required")
+
+
+@rule("MISSING_DATE")
+def _missing_date(cols, config):
+    return ((i, "Invoice date is required") for i, value in enumerate(cols["invoice_date"]) if value is None)
+
+
+@rule("MISSING_AMOUNT")
+def _missing_amount(cols, config):
+    return ((i, "Invoice amount is required") for i, value in enumerate(cols["amount"]) if value is None)
+
+
+@rule("INVALID_AMOUNT")
+def _invalid_amount(cols, config):
+    return (
+        (i, "Invoice amount must be positive")
+        for i, value in enumerate(cols["amount"]) if value is not None and float(value) <= 0
+    )
+
+
+def _invalid_currency_sql(config):
+    listed = list(config.allowed_currencies)
+    return (
+        (Invoice.currency != "") & Invoice.currency.notin_(config.allowed_currencies),
+        literal("Currency '") + Invoice.currency + literal(f"' not in allowed list: {listed}"),
+    )
+
+
+@rule("INVALID_CURRENCY", sql=_invalid_currency_sql)
+def _invalid_currency(cols, config):
+    allowed = set(config.allowed_currencies)
+    listed = list(config.allowed_currencies)
+    return (
+        (i, f"Currency '{value}' not in allowed list: {listed}")
+        for i, value in enumerate(cols["currency"]) if value and value not in allowed
+    )
+
+
+@rule(DUPLICATE_CODE)
+def _duplicate(cols, config):
+    return ((i, duplicate_message(original)) for i, original in enumerate(cols["duplicate_of"]) if original)
+
+
+@rule("MISSING_FILE", severity="WARNING")
+def _missing_file(cols, config):
+    return ((i, "No file attached to invoice") for i, value in enumerate(cols["file_path"]) if not value)
+
+
+# Compiled rule sets by tenant id (None for "no tenant"); replaced when the settings version moves
+_rule_sets: dict[uuid.UUID | None, RuleSet] = {}
+
+
+def compiled_rules(tenant: Tenant | None) -> RuleSet:
+    """The tenant's rule set, compiled on first use and again after its settings change."""
+    tenant_id = tenant.id if tenant is not None else None
+    version = tenant.settings_version if tenant is not None else None
+    cached = _rule_sets.get(tenant_id)
+    if cached is not None and cached.version == version:
+        return cached
+    compiled = RuleSet(version=version, config=TenantRuleConfig.from_tenant(tenant), rules=tuple(RULES))
+    _rule_sets[tenant_id] = compiled
+    return compiled
+
+
+def validate_many(invoices: Sequence[Invoice], tenant: Tenant | None = None, db: Session | None = None) -> list[dict]:
+    """Run every rule over a batch of one tenant's invoices.
+
+    Duplicate detection needs `db` (one indexed query per batch); without it that rule finds nothing.
+    Returns invoice_exceptions rows (dicts with id, tenant_id, invoice_id, code,
+    message, severity, created_at), grouped by invoice in input order.
+    """
+    if not invoices:
+        return []
+    rule_set = compiled_rules(tenant)
+    cols = {name: [getattr(inv, name) for inv in invoices] for name in COLUMNS}
+    cols["duplicate_of"] = find_duplicates(db, invoices) if db is not None else [None] * len(invoices)
+    hits = [(i, r, message) for r in rule_set.rules for i, message in r.check(cols, rule_set.config)]
+    # Stable, so each invoice's exceptions keep rule order
+    hits.sort(key=lambda hit: hit[0])
+    now = datetime.now(UTC)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "tenant_id": invoices[i].tenant_id,
+            "invoice_id": invoices[i].id,
+            "code": r.code,
+            "message": message,
+            "severity": r.severity,
+            "created_at": now,
+        }
+        for i, r, message in hits
+    ]
+
+
+def insert_exceptions(db: Session, rows: list[dict]):
+    """Bulk insert rows from validate_many (one executemany, no ORM objects)."""
+    if rows:
+        db.execute(insert(InvoiceException), rows)
+
+
+def sync_review_statuses(db: Session, invoice_ids: list):
+    """Set VALIDATED / APPROVAL_PENDING from each open invoice's open_exception_count after set-based changes.
+
+    Invoices in other statuses are left alone. Changes are queued for the SSE stream.
+    """
+    table = Invoice.__table__
+    before = (
+        select(table.c.id, table.c.status.label("previous_status"))
+        .where(table.c.id.in_(invoice_ids), table.c.status.in_(REVIEWED_STATUSES))
+        .subquery()
+    )
+    new_status = case(
+        (table.c.open_exception_count > 0, InvoiceStatus.VALIDATED.value),
+        else_=InvoiceStatus.APPROVAL_PENDING.value,
+    )
+    changed = db.execute(
+        update(table)
+        .where(table.c.id == before.c.id, table.c.status != new_status)
+        .values(status=new_status, updated_at=datetime.now(UTC))
+        .returning(
+            table.c.id, table.c.tenant_id, table.c.status, before.c.previous_status,
+            table.c.vendor, table.c.invoice_number, table.c.source,
+        )
+    ).all()
+    queue_invoice_changes(db, changed)
 
 
-def validate_invoice(invoice: Invoice, tenant: Tenant | None = None) -> list[InvoiceException]:
+def validate_invoice(
+    invoice: Invoice, tenant: Tenant | None = None, db: Session | None = None,
+) -> list[InvoiceException]:
     """Run all validation rules against an invoice. Returns list of exceptions (not yet committed)."""
-    exceptions: list[InvoiceException] = []
-
-    # Required fields
-    if not invoice.vendor or not invoice.vendor.strip():
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="MISSING_VENDOR",
-            message="Vendor name is required", severity="ERROR",
-        ))
-
-    if not invoice.invoice_number or not invoice.invoice_number.strip():
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="MISSING_NUMBER",
-            message="Invoice number is required", severity="ERROR",
-        ))
-
-    if invoice.invoice_date is None:
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="MISSING_DATE",
-            message="Invoice date is required", severity="ERROR",
-        ))
-
-    if invoice.amount is None:
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="MISSING_AMOUNT",
-            message="Invoice amount is required", severity="ERROR",
-        ))
-    elif float(invoice.amount) <= 0:
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="INVALID_AMOUNT",
-            message="Invoice amount must be positive", severity="ERROR",
-        ))
-
-    # Currency check
-    allowed = ["AED", "USD", "EUR", "GBP"]
-    if tenant and tenant.allowed_currencies:
-        allowed = [c.strip() for c in tenant.allowed_currencies.split(",")]
-    if invoice.currency and invoice.currency not in allowed:
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="INVALID_CURRENCY",
-            message=f"Currency '{invoice.currency}' not in allowed list: {allowed}", severity="ERROR",
-        ))
-
-    # File check
-    if not invoice.file_path:
-        exceptions.append(InvoiceException(
-            invoice_id=invoice.id, code="MISSING_FILE",
-            message="No file attached to invoice", severity="WARNING",
-        ))
-
-    return exceptions
+    return [
+        InvoiceException(invoice_id=row["invoice_id"], code=row["code"], message=row["message"], severity=row["severity"])
+        for row in validate_many([invoice], tenant, db)
+    ]
@@ -0,0 +1,231 @@
+"""Audit log partition maintenance.
+
+audit_events is range-partitioned by month (see alembic 004). This job keeps
+AUDIT_PARTITION_MONTHS_AHEAD months of empty partitions ready, moves any rows
+that landed in the DEFAULT partition into proper monthly partitions, and
+detaches partitions older than AUDIT_PARTITION_RETENTION_MONTHS. Detached
+partitions stay in the database as plain tables (same name) so they can be
+archived and dropped independently of the live table.
+
+archive_audit_log moves events older than AUDIT_HOT_DAYS into compressed
+segment files (app/services/audit_archive.py) and drops monthly partitions the
+archive has emptied, so the live table only holds the hot window.
+"""
+import logging
+import re
+import uuid
+from datetime import UTC, date, datetime, timedelta
+
+from sqlalchemy import any_, bindparam, delete, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.audit_event import DEFAULT_PARTITION, AuditEvent
+from app.models.tenant import Tenant
+from app.services.audit_archive import remove_segment, write_segment
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "audit_events_p"
+_PARTITION_RE = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+# Arbitrary constant keys so concurrent schedulers (one per API worker) don't race
+_ADVISORY_LOCK_KEY = 0x41554454
+_ARCHIVE_LOCK_KEY = 0x41554441
+
+
+def _try_xact_lock(db: Session, key: int) -> bool:
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}).scalar()
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def attached_partitions(db: Session) -> dict[str, date | None]:
+    """Partitions currently attached to audit_events, mapped to their month (None for DEFAULT)."""
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'audit_events'"
+    )).scalars().all()
+    partitions: dict[str, date | None] = {}
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        partitions[name] = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+    return partitions
+
+
+def create_partition(db: Session, month: date, has_default: bool) -> str:
+    """Create the partition for `month`, moving matching rows out of the DEFAULT partition first.
+
+    Postgres refuses to create a range partition while the DEFAULT partition
+    holds rows in that range, so those rows are moved across with the DEFAULT
+    partition briefly detached.
+    """
+    name = partition_name(month)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    create_sql = (
+        f"CREATE TABLE {name} PARTITION OF audit_events "
+        f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+    )
+    in_range = "timestamp >= :lower AND timestamp < :upper"
+
+    stray = has_default and db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"), bounds
+    ).scalar()
+    if not stray:
+        db.execute(text(create_sql))
+        return name
+
+    db.execute(text(f"ALTER TABLE audit_events DETACH PARTITION {DEFAULT_PARTITION}"))
+    db.execute(text(create_sql))
+    moved = db.execute(
+        text(f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+             "INSERT INTO audit_events SELECT * FROM moved"),
+        bounds,
+    ).rowcount
+    db.execute(text(f"ALTER TABLE audit_events ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.info("Moved %d audit events from %s into %s", moved, DEFAULT_PARTITION, name)
+    return name
+
+
+def ensure_audit_partitions(db: Session, today: date, months_ahead: int) -> list[str]:
+    """Create monthly partitions through `months_ahead` and for any month stranded in DEFAULT."""
+    partitions = attached_partitions(db)
+    has_default = DEFAULT_PARTITION in partitions
+    existing = {m for m in partitions.values() if m is not None}
+
+    wanted = {add_months(month_start(today), i) for i in range(months_ahead + 1)}
+    if has_default:
+        stranded = db.execute(
+            text(f"SELECT DISTINCT date_trunc('month', timestamp)::date FROM {DEFAULT_PARTITION}")
+        ).scalars().all()
+        wanted.update(stranded)
+
+    return [create_partition(db, month, has_default) for month in sorted(wanted - existing)]
+
+
+def detach_expired_partitions(db: Session, today: date, retention_months: int) -> list[str]:
+    """Detach monthly partitions that end on or before the retention cutoff. 0 keeps everything."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    detached = []
+    for name, month in sorted(attached_partitions(db).items(), key=lambda item: item[1] or date.max):
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        db.execute(text(f"ALTER TABLE audit_events DETACH PARTITION {name}"))
+        detached.append(name)
+    return detached
+
+
+def maintain_audit_partitions():
+    """Scheduled entry point: one transaction, skipped if another process holds the lock."""
+    db = SessionLocal()
+    try:
+        if not _try_xact_lock(db, _ADVISORY_LOCK_KEY):
+            logger.info("Audit partition maintenance already running elsewhere, skipping")
+            return
+        today = datetime.now(UTC).date()
+        created = ensure_audit_partitions(db, today, settings.AUDIT_PARTITION_MONTHS_AHEAD)
+        detached = detach_expired_partitions(db, today, settings.AUDIT_PARTITION_RETENTION_MONTHS)
+        db.commit()
+        if created or detached:
+            logger.info("Audit partitions: created %s, detached %s", created or "none", detached or "none")
+    except Exception as e:
+        db.rollback()
+        logger.error("Audit partition maintenance failed: %s", e)
+    finally:
+        db.close()
+
+
+def archive_tenant_events(db: Session, tenant_id: uuid.UUID, cutoff: datetime, segment_events: int) -> int:
+    """Move one tenant's events older than `cutoff` into segments of up to `segment_events` each.
+
+    Each segment is its own transaction: the segment is written and fsynced before
+    its rows are deleted and committed, and removed again if the delete fails. A
+    crash between the two leaves rows in both places, which readers tolerate by
+    de-duplicating on id. Stops early if another process is archiving.
+    """
+    archived = 0
+    while True:
+        if not _try_xact_lock(db, _ARCHIVE_LOCK_KEY):
+            return archived
+        events = (
+            db.query(AuditEvent)
+            .filter(AuditEvent.tenant_id == tenant_id, AuditEvent.timestamp < cutoff)
+            .order_by(AuditEvent.timestamp, AuditEvent.id)
+            .limit(segment_events)
+            .all()
+        )
+        if not events:
+            db.commit()
+            return archived
+        segment = write_segment(tenant_id, events)
+        ids = bindparam("ids", [e.id for e in events], type_=ARRAY(UUID(as_uuid=True)))
+        try:
+            db.execute(
+                delete(AuditEvent)
+                .where(
+                    AuditEvent.tenant_id == tenant_id,
+                    AuditEvent.timestamp.between(events[0].timestamp, events[-1].timestamp),
+                    AuditEvent.id == any_(ids),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            remove_segment(segment)
+            raise
+        db.expunge_all()
+        archived += len(events)
+        if len(events) < segment_events:
+            return archived
+
+
+def drop_archived_partitions(db: Session, cutoff: datetime) -> list[str]:
+    """Drop monthly partitions that end before `cutoff` and that archiving has left empty."""
+    dropped = []
+    for name, month in attached_partitions(db).items():
+        if month is None or add_months(month, 1) > cutoff.date():
+            continue
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def archive_audit_log():
+    """Scheduled entry point; a no-op unless AUDIT_HOT_DAYS is set."""
+    if settings.AUDIT_HOT_DAYS <= 0:
+        return
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=settings.AUDIT_HOT_DAYS)
+        total = 0
+        for (tenant_id,) in db.query(Tenant.id).all():
+            total += archive_tenant_events(db, tenant_id, cutoff, settings.AUDIT_ARCHIVE_SEGMENT_EVENTS)
+        dropped = drop_archived_partitions(db, cutoff) if _try_xact_lock(db, _ARCHIVE_LOCK_KEY) else []
+        db.commit()
+        if total or dropped:
+            logger.info("Archived %d audit events older than %s; dropped partitions %s",
+                        total, cutoff.date(), dropped or "none")
+    except Exception as e:
+        db.rollback()
+        logger.error("Audit archival failed: %s", e)
+    finally:
+        db.close()
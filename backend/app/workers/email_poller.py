@@ -1,48 +1,61 @@
-"""Email ingestion worker: polls MailHog API and creates invoices from attachments."""
-import base64
-import email as email_lib
+"""Email ingestion worker: polls the inbound provider and creates invoices from attachments."""
+import binascii
+import hashlib
+import io
 import logging
 import os
+import time
 import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures.process import BrokenProcessPool
 from datetime import UTC, datetime
-from email.policy import default as default_policy
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import HeaderParser
+from email.policy import compat32
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple, TextIO
 
-import httpx
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.metrics import Counter
 from app.db.session import SessionLocal
-from app.models.audit_event import AuditEvent
-from app.models.ingestion_run import IngestionRun
+from app.models.ingestion_run import IngestionRun, latency_bucket
 from app.models.invoice import Invoice, InvoiceSource, InvoiceStatus
-from app.models.invoice_exception import InvoiceException
 from app.models.tenant import Tenant
-from app.services.validation import validate_invoice
+from app.services.audit import log_event
+from app.services.validation import insert_exceptions, sync_review_statuses, validate_many
+from app.workers.pool import discard_process_pool, get_process_pool
+from app.workers.providers import ImapProvider, InboundProvider, MaildirProvider, MailHogProvider
 
 logger = logging.getLogger(__name__)
 
-
-class MailHogProvider:
-    """Polls MailHog API v2 for new messages."""
-
-    def __init__(self, api_url: str = ""):
-        self.api_url = api_url or settings.MAILHOG_API_URL
-
-    def fetch_messages(self) -> list[dict]:
-        try:
-            resp = httpx.get(f"{self.api_url}/messages", timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("items", [])
-        except Exception as e:
-            logger.error("MailHog fetch error: %s", e)
-            return []
-
-    def delete_message(self, message_id: str):
-        try:
-            httpx.delete(f"{self.api_url.replace('/v2', '/v1')}/messages/{message_id}", timeout=10)
-        except Exception as e:
-            logger.warning("Failed to delete message %s: %s", message_id, e)
+# Base64 text is decoded in slices of this many characters (a multiple of 4),
+# so at most a few chunks of any attachment are held in memory at once.
+DECODE_CHUNK_CHARS = 64 * 1024
+
+INGESTION_RUNS = Counter("ingestion_runs_total", "Poll cycles by outcome (SUCCESS / PARTIAL / FAIL).", ["status"])
+INGESTION_EMAILS = Counter(
+    "ingestion_emails_total", "Fetched messages by outcome (processed / retried / rejected).", ["outcome"],
+)
+INGESTION_INVOICES = Counter("ingestion_invoices_created_total", "Invoices created from inbound attachments.")
+INGESTION_BYTES = Counter("ingestion_bytes_total", "Attachment bytes written for created invoices.")
+INGESTION_POST_COMMIT_ERRORS = Counter(
+    "ingestion_post_commit_errors_total",
+    "Steps that failed after a run was committed (ack / nack / reject / timings).",
+    ["step"],
+)
+
+
+def get_inbound_provider() -> InboundProvider:
+    """Build the provider selected by INBOUND_PROVIDER (defaults to MailHog)."""
+    kind = settings.INBOUND_PROVIDER.upper()
+    if kind == "MAILDIR":
+        return MaildirProvider()
+    if kind == "IMAP":
+        return ImapProvider()
+    return MailHogProvider()
 
 
 def _extract_to_address(msg: dict) -> str:
@@ -83,8 +96,8 @@ def _find_tenant_by_inbound(db: Session, address: str) -> Tenant | None:
     return db.query(Tenant).filter(Tenant.inbound_email_alias == alias).first()
 
 
-def _save_attachment(content_bytes: bytes, filename: str, tenant_id: str = "", message_id: str = "") -> str:
-    """Save attachment to tenant-scoped upload directory, return file path.
+def _attachment_path(filename: str, tenant_id: str = "", message_id: str = "") -> str:
+    """Build a unique tenant-scoped path for an attachment, creating its directory.
 
     Layout: <UPLOAD_DIR>/<tenant_id>/<message_id>/<uuid>_<filename>
     Falls back to flat UPLOAD_DIR when tenant_id or message_id are empty.
@@ -98,10 +111,7 @@ def _save_attachment(content_bytes: bytes, filename: str, tenant_id: str = "", m
     os.makedirs(target_dir, exist_ok=True)
     file_id = str(uuid.uuid4())
     safe_filename = os.path.basename(filename or "attachment")
-    path = os.path.join(target_dir, f"{file_id}_{safe_filename}")
-    with open(path, "wb") as f:
-        f.write(content_bytes)
-    return path
+    return os.path.join(target_dir, f"{file_id}_{safe_filename}")
 
 
 def _extract_email_metadata(msg: dict) -> dict:
@@ -127,198 +137,554 @@ def _extract_email_metadata(msg: dict) -> dict:
     subject_list = headers.get("Subject", [])
     subject = subject_list[0].strip() if subject_list else ""
 
-    return {"email_from": from_addr, "email_subject": subject}
+    # Date header, used for end-to-end ingestion latency
+    date_list = headers.get("Date", [])
+    sent_at = None
+    if date_list:
+        try:
+            sent_at = parsedate_to_datetime(date_list[0])
+            if sent_at.tzinfo is None:
+                sent_at = sent_at.replace(tzinfo=UTC)
+        except (TypeError, ValueError):
+            sent_at = None
+
+    return {"email_from": from_addr, "email_subject": subject, "email_date": sent_at}
+
+
+# ── Attachment extraction: single parse, decode straight to disk ──────────────
+
+
+class SavedAttachment(NamedTuple):
+    """An attachment that has been decoded and written to the upload directory."""
+
+    filename: str
+    file_path: str
+    size_bytes: int
+    sha256: str
+    write_seconds: float = 0.0
+
+
+class _AttachmentSink:
+    """Decodes one attachment body incrementally into a file, hashing the decoded bytes."""
+
+    def __init__(self, filename: str, encoding: str, tenant_id: str, message_id: str):
+        self.filename = filename
+        self.encoding = encoding.lower().strip()
+        self.path = _attachment_path(filename, tenant_id=tenant_id, message_id=message_id)
+        self._fh = open(self.path, "wb")
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._b64_carry = ""
+        self._qp_carry = ""
+        self._pending_eol = ""
+        self._write_seconds = 0.0
+
+    def _emit(self, data: bytes):
+        if data:
+            start = time.perf_counter()
+            self._fh.write(data)
+            self._write_seconds += time.perf_counter() - start
+            self._hash.update(data)
+            self._size += len(data)
+
+    def write(self, text: str):
+        """Feed a slice of the encoded body (any length, any line boundaries)."""
+        if self.encoding == "base64":
+            buf = self._b64_carry + "".join(text.split())
+            cut = len(buf) - len(buf) % 4
+            self._b64_carry = buf[cut:]
+            if cut:
+                self._emit(binascii.a2b_base64(buf[:cut]))
+        elif self.encoding == "quoted-printable":
+            # An =XX escape or soft line break never spans lines: decode up to the last line break and keep
+            # the rest for the next slice. Over-long lines only hold back a trailing "=" or "=X".
+            buf = self._qp_carry + text
+            cut = buf.rfind("\n") + 1
+            if not cut:
+                cut = len(buf) - (1 if buf.endswith("=") else 2 if buf[-2:-1] == "=" else 0)
+            self._qp_carry = buf[cut:]
+            if cut:
+                self._emit(binascii.a2b_qp(buf[:cut].encode("utf-8", "surrogateescape")))
+        else:
+            # Hold back the trailing line break: the one before a MIME boundary belongs to the boundary
+            body = text.rstrip("\r\n")
+            eol = text[len(body):]
+            self._emit((self._pending_eol + body).encode("utf-8", "surrogateescape"))
+            self._pending_eol = eol
+
+    def close(self) -> SavedAttachment:
+        if self._qp_carry:
+            self._emit(binascii.a2b_qp(self._qp_carry.encode("utf-8", "surrogateescape")))
+        if self._b64_carry:
+            padded = self._b64_carry + "=" * (-len(self._b64_carry) % 4)
+            try:
+                self._emit(binascii.a2b_base64(padded))
+            except binascii.Error:
+                logger.warning("Discarding %d trailing base64 chars in %s", len(self._b64_carry), self.filename)
+        start = time.perf_counter()
+        self._fh.close()
+        self._write_seconds += time.perf_counter() - start
+        return SavedAttachment(self.filename, self.path, self._size, self._hash.hexdigest(), self._write_seconds)
+
+    def abort(self):
+        self._fh.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 
-def _extract_attachments_from_mime(msg: dict) -> list[tuple[str, bytes]]:
-    """Extract (filename, content_bytes) from MailHog MIME parts. Returns [] on None/missing."""
+def _iter_chunks(text: str, size: int = DECODE_CHUNK_CHARS) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def _is_attachment(content_disp: str, content_type: str) -> bool:
+    return "attachment" in content_disp.lower() or "application/pdf" in content_type.lower()
+
+
+def _stream_mime_parts(msg: dict, open_sink: Callable[[str, str], _AttachmentSink]) -> int:
+    """Stream attachments out of MailHog MIME parts. Returns how many attachment parts were found."""
     mime = msg.get("MIME")
-    if mime is None:
-        return []
     parts = mime.get("Parts") if isinstance(mime, dict) else None
     if not parts:
-        return []
+        return 0
 
-    attachments: list[tuple[str, bytes]] = []
+    found = 0
     for part in parts:
         headers = part.get("Headers") or {}
         content_disp = (headers.get("Content-Disposition") or [""])[0]
         content_type = (headers.get("Content-Type") or [""])[0]
-
-        if "attachment" not in content_disp.lower() and "application/pdf" not in content_type.lower():
+        if not _is_attachment(content_disp, content_type):
             continue
 
         filename = "attachment.pdf"
         if 'filename="' in content_disp:
             filename = content_disp.split('filename="')[1].split('"')[0]
+        encoding = (headers.get("Content-Transfer-Encoding") or [""])[0]
 
-        body = part.get("Body", "")
-        content_encoding = (headers.get("Content-Transfer-Encoding") or [""])[0]
+        sink = open_sink(filename, encoding)
+        found += 1
+        for chunk in _iter_chunks(part.get("Body") or ""):
+            sink.write(chunk)
+    return found
 
-        if content_encoding.lower() == "base64":
-            file_bytes = base64.b64decode(body)
-        else:
-            file_bytes = body.encode("utf-8") if isinstance(body, str) else body
-
-        attachments.append((filename, file_bytes))
-    return attachments
-
-
-def _extract_attachments_from_raw(msg: dict) -> list[tuple[str, bytes]]:
-    """Parse attachments from Raw.Data RFC822 message using Python's email parser."""
-    raw = msg.get("Raw")
-    if not raw or not isinstance(raw, dict):
-        return []
-    data = raw.get("Data")
-    if not data:
-        return []
-
-    parsed = email_lib.message_from_string(data, policy=default_policy)
-    attachments: list[tuple[str, bytes]] = []
-    for part in parsed.walk():
-        content_disp = part.get("Content-Disposition", "")
-        content_type = part.get_content_type() or ""
-        if "attachment" in content_disp.lower() or "application/pdf" in content_type.lower():
-            payload = part.get_payload(decode=True)
-            if payload:
-                filename = part.get_filename() or "attachment.pdf"
-                attachments.append((filename, payload))
-    return attachments
-
-
-def _extract_attachments(msg: dict) -> list[tuple[str, bytes]]:
-    """Try MIME parts first, fall back to Raw.Data RFC822 parsing, then Content fallback."""
-    attachments = _extract_attachments_from_mime(msg)
-    if attachments:
-        return attachments
-
-    # Prefer Raw.Data for full RFC822 parsing when MIME is null/empty
-    attachments = _extract_attachments_from_raw(msg)
-    if attachments:
-        return attachments
-
-    # Last resort: Content.Body (plain body, no structured MIME)
-    content = msg.get("Content") or {}
-    body = content.get("Body", "")
-    if body:
-        logger.debug("Message has Content.Body but no extractable attachments")
 
-    return []
+def _boundary_hit(line: str, boundaries: list[str]) -> str | None:
+    """Return the delimiter line if `line` is a delimiter for any enclosing multipart."""
+    if not line.startswith("--"):
+        return None
+    stripped = line.rstrip()
+    for boundary in reversed(boundaries):
+        if stripped in (f"--{boundary}", f"--{boundary}--"):
+            return stripped
+    return None
+
+
+def _read_part_headers(lines: TextIO) -> Message:
+    # compat32 header parsing is an order of magnitude cheaper than the default policy;
+    # only the handful of structural headers are read from it.
+    header_lines: list[str] = []
+    for line in lines:
+        if not line.strip():
+            break
+        header_lines.append(line)
+    return HeaderParser(policy=compat32).parsestr("".join(header_lines))
+
+
+def _part_filename(headers: Message) -> str:
+    filename = headers.get_filename()
+    if not filename:
+        return "attachment.pdf"
+    return str(make_header(decode_header(filename)))
+
+
+def _consume_body(lines: TextIO, boundaries: list[str], sink: _AttachmentSink | None) -> str | None:
+    """Feed body lines to `sink` until an enclosing boundary (returned) or EOF (None).
+
+    Lines are handed over in batches of about DECODE_CHUNK_CHARS to keep per-line overhead low.
+    """
+    pending: list[str] = []
+    pending_chars = 0
+    hit = None
+    for line in lines:
+        hit = _boundary_hit(line, boundaries)
+        if hit:
+            break
+        if sink is not None:
+            pending.append(line)
+            pending_chars += len(line)
+            if pending_chars >= DECODE_CHUNK_CHARS:
+                sink.write("".join(pending))
+                pending.clear()
+                pending_chars = 0
+    if sink is not None and pending:
+        sink.write("".join(pending))
+    return hit
+
+
+def _walk_raw_entity(
+    lines: TextIO, boundaries: list[str], open_sink: Callable[[str, str], _AttachmentSink]
+) -> str | None:
+    """Consume one MIME entity from `lines`, streaming attachment bodies into sinks.
+
+    Returns the boundary delimiter line that ended the entity, or None at EOF.
+    """
+    headers = _read_part_headers(lines)
+    boundary = headers.get_param("boundary") if headers.get_content_maintype() == "multipart" else None
+    if boundary:
+        inner = [*boundaries, str(boundary)]
+        delimiter = _consume_body(lines, inner, None)  # preamble
+        while delimiter == f"--{boundary}":
+            delimiter = _walk_raw_entity(lines, inner, open_sink)
+        if delimiter == f"--{boundary}--":
+            return _consume_body(lines, boundaries, None)  # epilogue
+        return delimiter
+
+    sink = None
+    if _is_attachment(headers.get("Content-Disposition", ""), headers.get_content_type() or ""):
+        sink = open_sink(_part_filename(headers), headers.get("Content-Transfer-Encoding", ""))
+    return _consume_body(lines, boundaries, sink)
+
+
+def _stream_attachments_to_disk(msg: dict, tenant_id: str, message_id: str) -> list[SavedAttachment]:
+    """Single-pass attachment extraction that decodes payloads straight into the upload directory.
+
+    Uses MailHog MIME parts when they hold an attachment, otherwise walks Raw.Data line by
+    line without building a parsed message tree. Peak memory is a few DECODE_CHUNK_CHARS regardless
+    of attachment size. Partially written files are removed if decoding fails.
+    """
+    sinks: list[_AttachmentSink] = []
+
+    def open_sink(filename: str, encoding: str) -> _AttachmentSink:
+        sink = _AttachmentSink(filename, encoding, tenant_id, message_id)
+        sinks.append(sink)
+        return sink
+
+    try:
+        if not _stream_mime_parts(msg, open_sink):
+            raw = msg.get("Raw")
+            data = raw.get("Data") if isinstance(raw, dict) else None
+            if data:
+                _walk_raw_entity(io.StringIO(data), [], open_sink)
+        saved = [sink.close() for sink in sinks]
+    except Exception:
+        for sink in sinks:
+            sink.abort()
+        raise
+
+    # An empty payload is not an invoice
+    for attachment in saved:
+        if attachment.size_bytes == 0:
+            os.remove(attachment.file_path)
+    return [a for a in saved if a.size_bytes > 0]
+
+
+def _remove_files(attachments: list[SavedAttachment]):
+    """Delete the files of a message whose invoices were rolled back; redelivery writes them again."""
+    for attachment in attachments:
+        try:
+            os.remove(attachment.file_path)
+        except FileNotFoundError:
+            pass
+
+
+class ParsedMessage(NamedTuple):
+    """What a parse worker hands back: metadata and on-disk attachments, never payload bytes."""
+
+    email_meta: dict
+    attachments: list[SavedAttachment]
+    parse_seconds: float = 0.0
+
+
+def parse_message(msg: dict, tenant_id: str) -> ParsedMessage:
+    """CPU-bound half of ingestion. Top-level so it can run in a worker process."""
+    start = time.perf_counter()
+    message_id = msg.get("ID", "")
+    email_meta = _extract_email_metadata(msg)
+    attachments = _stream_attachments_to_disk(msg, tenant_id=tenant_id, message_id=message_id)
+    write_seconds = sum(a.write_seconds for a in attachments)
+    parse_seconds = time.perf_counter() - start - write_seconds
+    return ParsedMessage(email_meta=email_meta, attachments=attachments, parse_seconds=max(0.0, parse_seconds))
+
+
+def _parse_messages(jobs: list[tuple[dict, str]]) -> list[ParsedMessage | Exception]:
+    """Parse messages inline or fan out to the email-parse pool, preserving order.
+
+    A failure is returned in place of its result so one bad message never sinks the batch.
+    """
+    pool = get_process_pool("email-parse", settings.EMAIL_PARSE_WORKERS)
+    results: list[ParsedMessage | Exception] = []
+    if pool is None:
+        for msg, tenant_id in jobs:
+            try:
+                results.append(parse_message(msg, tenant_id))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    futures = [pool.submit(parse_message, msg, tenant_id) for msg, tenant_id in jobs]
+    for future in futures:
+        try:
+            results.append(future.result())
+        except BrokenProcessPool as e:
+            discard_process_pool("email-parse")
+            results.append(e)
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _validate_batch(db: Session, batch: list[tuple[Invoice, Tenant]]):
+    """Validate a poll cycle's flushed invoices: one rule pass and bulk insert per tenant, one status update.
+
+    The invoices start APPROVAL_PENDING; sync_review_statuses moves those that got exceptions to VALIDATED.
+    """
+    groups: dict[uuid.UUID, tuple[Tenant, list[Invoice]]] = {}
+    for inv, tenant in batch:
+        groups.setdefault(tenant.id, (tenant, []))[1].append(inv)
+    insert_exceptions(db, [row for tenant, invoices in groups.values() for row in validate_many(invoices, tenant, db)])
+    sync_review_statuses(db, [inv.id for inv, _ in batch])
+
+
+def _set_stage_timings(run: IngestionRun, stage_seconds: dict[str, float]):
+    run.fetch_ms = int(stage_seconds["fetch"] * 1000)
+    run.parse_ms = int(stage_seconds["parse"] * 1000)
+    run.write_ms = int(stage_seconds["write"] * 1000)
+    run.flush_ms = int(stage_seconds["flush"] * 1000)
+    run.ack_ms = int(stage_seconds["ack"] * 1000)
+
+
+def _record_post_commit_timings(db: Session, run: IngestionRun, stage_seconds: dict[str, float]):
+    """Commit and ack time are only known after the run row is written; store them in a cheap follow-up update."""
+    try:
+        _set_stage_timings(run, stage_seconds)
+        run.run_finished_at = datetime.now(UTC)
+        db.commit()
+    except Exception as e:
+        logger.warning("Failed to record ingestion stage timings: %s", e)
+        INGESTION_POST_COMMIT_ERRORS.labels("timings").inc()
+        db.rollback()
+
+
+# Failed processing attempts per message id in this process. A restart forgets them, which at worst
+# gives a poison message INGESTION_MAX_ATTEMPTS more tries.
+_failed_attempts: dict[str, int] = {}
+
+
+def _retry_or_reject(message_id: str, nacked: list[str], rejected: list[str]):
+    """Nack a message that failed, or reject it once it has failed INGESTION_MAX_ATTEMPTS times."""
+    attempts = _failed_attempts.get(message_id, 0) + 1
+    if attempts >= settings.INGESTION_MAX_ATTEMPTS:
+        _failed_attempts.pop(message_id, None)
+        logger.error("Message %s failed %d times; rejecting it", message_id, attempts)
+        rejected.append(message_id)
+    else:
+        _failed_attempts[message_id] = attempts
+        nacked.append(message_id)
+
+
+def _acknowledge(provider: InboundProvider, acked: list[str], nacked: list[str], rejected: list[str]):
+    """Settle the fetched messages after the commit. Failures are logged and counted, never raised.
+
+    The invoices are durable by now: nacking everything or failing the run would make redelivery create them
+    twice. Messages left unacked are fetched again later, and the DUPLICATE_INVOICE rule flags their invoices.
+    """
+    for op, message_ids in (("ack", acked), ("nack", nacked), ("reject", rejected)):
+        try:
+            getattr(provider, op)(message_ids)
+        except Exception as e:
+            logger.error("Provider %s failed for %d message(s) after commit: %s", op, len(message_ids), e)
+            INGESTION_POST_COMMIT_ERRORS.labels(op).inc()
+
+
+def _count_run(run: IngestionRun, processed: int, retried: int, rejected: int):
+    """Add a finished run to the ingestion counters served at /metrics (once per run)."""
+    INGESTION_RUNS.labels(run.status).inc()
+    INGESTION_EMAILS.labels("processed").inc(processed)
+    INGESTION_EMAILS.labels("retried").inc(retried)
+    INGESTION_EMAILS.labels("rejected").inc(rejected)
+    INGESTION_INVOICES.inc(run.invoices_created)
+    INGESTION_BYTES.inc(run.bytes_ingested)
 
 
 def poll_and_ingest():
-    """Main poll cycle: fetch messages from MailHog, create invoices."""
-    provider = MailHogProvider()
+    """Main poll cycle: fetch a batch from the inbound provider, create invoices, ack/nack."""
+    provider = get_inbound_provider()
     db = SessionLocal()
-    run = IngestionRun(provider="MAILHOG", run_started_at=datetime.now(UTC))
+    run = IngestionRun(provider=provider.name, run_started_at=datetime.now(UTC))
     # Initialise counters eagerly so += never hits None
     run.emails_seen = 0
     run.emails_processed = 0
     run.invoices_created = 0
     run.failures_count = 0
     run.retries_count = 0
+    messages: list[dict] = []
+    stage_seconds = {"fetch": 0.0, "parse": 0.0, "write": 0.0, "flush": 0.0, "ack": 0.0}
+    latency_histogram: dict[str, int] = {}
+    latency_sum_ms = 0
+    bytes_ingested = 0
 
     try:
-        messages = provider.fetch_messages()
+        start = time.perf_counter()
+        messages = provider.fetch_batch(settings.EMAIL_FETCH_BATCH_SIZE)
+        stage_seconds["fetch"] = time.perf_counter() - start
         run.emails_seen = len(messages)
+        acked: list[str] = []
+        nacked: list[str] = []
+        rejected: list[str] = []
         invoices_created = 0
         failures = 0
 
+        # Stage 1: route each message to its tenant (needs the DB, stays in-process)
+        routed: list[tuple[dict, Tenant]] = []
         for msg in messages:
-            msg_id = msg.get("ID", "")
             try:
                 to_addr = _extract_to_address(msg)
                 tenant = _find_tenant_by_inbound(db, to_addr)
+            except Exception as e:
+                logger.error("Error routing message %s: %s", msg.get("ID", ""), e)
+                failures += 1
+                _retry_or_reject(msg.get("ID", ""), nacked, rejected)
+                continue
+            if not tenant:
+                # Retrying cannot help, and nacked messages would come back every poll and crowd out new mail
+                logger.warning("No tenant for inbound address %s; rejecting message %s", to_addr, msg.get("ID", ""))
+                failures += 1
+                rejected.append(msg.get("ID", ""))
+                continue
+            routed.append((msg, tenant))
+
+        # Stage 2: parse + decode attachments to disk (process pool when configured)
+        parsed = _parse_messages([(msg, str(tenant.id)) for msg, tenant in routed])
+
+        # Stage 3: stage each message's invoices and audit events, then flush and validate them as one batch
+        extracting = settings.FIELD_EXTRACTION_ENABLED
+        initial_status = InvoiceStatus.NEW.value if extracting else InvoiceStatus.APPROVAL_PENDING.value
+        batch: list[tuple[Invoice, Tenant]] = []
+        for (msg, tenant), result in zip(routed, parsed):
+            msg_id = msg.get("ID", "")
+            pending: list = []
+            try:
+                if isinstance(result, Exception):
+                    raise result
 
-                if not tenant:
-                    logger.warning("No tenant for inbound address: %s", to_addr)
-                    failures += 1
-                    continue
-
+                stage_seconds["parse"] += result.parse_seconds
+                stage_seconds["write"] += sum(a.write_seconds for a in result.attachments)
                 run.tenant_id = tenant.id
-
-                # Extract email metadata (subject, from)
-                email_meta = _extract_email_metadata(msg)
-
-                # Extract attachments: MIME parts → Raw.Data RFC822 → empty
-                attachments = _extract_attachments(msg)
+                email_meta = result.email_meta
+                attachments = result.attachments
                 if not attachments:
                     # No attachments — still count as processed
                     run.emails_processed += 1
-                    provider.delete_message(msg_id)
+                    acked.append(msg_id)
                     continue
 
-                for filename, file_bytes in attachments:
-                    file_path = _save_attachment(
-                        file_bytes, filename,
-                        tenant_id=str(tenant.id), message_id=msg_id,
-                    )
-
+                invoices: list[Invoice] = []
+                for attachment in attachments:
+                    filename = attachment.filename
+                    # Client-side id, so the audit event can name the invoice before the batch is flushed
                     inv = Invoice(
+                        id=uuid.uuid4(),
                         tenant_id=tenant.id,
                         vendor="",
-                        file_path=file_path,
+                        file_path=attachment.file_path,
                         original_filename=filename,
                         source=InvoiceSource.EMAIL.value,
                         source_message_id=msg_id,
                         email_subject=email_meta["email_subject"],
                         email_from=email_meta["email_from"],
                         attachment_count=len(attachments),
-                        status=InvoiceStatus.NEW.value,
+                        content_sha256=attachment.sha256,
+                        status=initial_status,
                     )
                     db.add(inv)
-                    db.flush()
-
-                    exceptions = validate_invoice(inv, tenant)
-                    for exc in exceptions:
-                        exc.tenant_id = tenant.id
-                        db.add(exc)
-
-                    if exceptions:
-                        inv.status = InvoiceStatus.VALIDATED.value
-                    else:
-                        inv.status = InvoiceStatus.APPROVAL_PENDING.value
-
-                    db.add(AuditEvent(
-                        tenant_id=tenant.id,
-                        action="EMAIL_RECEIVED",
-                        entity_type="invoice",
-                        entity_id=str(inv.id),
-                        metadata_json={
+                    pending.append(inv)
+                    invoices.append(inv)
+                    pending.append(log_event(
+                        db, tenant.id, "EMAIL_RECEIVED", entity_type="invoice", entity_id=str(inv.id),
+                        metadata={
                             "filename": filename,
                             "from_email": email_meta["email_from"],
                             "subject": email_meta["email_subject"],
                             "message_id": msg_id,
+                            "size_bytes": attachment.size_bytes,
+                            "sha256": attachment.sha256,
                         },
                     ))
-                    invoices_created += 1
+
+                batch.extend((inv, tenant) for inv in invoices)
+                invoices_created += len(attachments)
+                bytes_ingested += sum(a.size_bytes for a in attachments)
+                sent_at = email_meta.get("email_date")
+                if sent_at is not None:
+                    latency_ms = max(0, int((datetime.now(UTC) - sent_at).total_seconds() * 1000))
+                    bucket = latency_bucket(latency_ms)
+                    latency_histogram[bucket] = latency_histogram.get(bucket, 0) + len(attachments)
+                    latency_sum_ms += latency_ms * len(attachments)
 
                 run.emails_processed += 1
-                provider.delete_message(msg_id)
+                acked.append(msg_id)
 
             except Exception as e:
                 logger.error("Error processing message %s: %s", msg_id, e)
+                # Nothing is flushed per message, so expunging what it staged drops its invoices; the
+                # redelivered message does not create them twice
+                for obj in pending:
+                    db.expunge(obj)
+                if not isinstance(result, Exception):
+                    _remove_files(result.attachments)
                 failures += 1
-                run.retries_count += 1
+                _retry_or_reject(msg_id, nacked, rejected)
+
+        if batch:
+            start = time.perf_counter()
+            db.flush()
+            stage_seconds["flush"] += time.perf_counter() - start
+            # With extraction on, the invoices stay NEW until field_extractor fills and validates them
+            if not extracting:
+                _validate_batch(db, batch)
 
         run.invoices_created = invoices_created
         run.failures_count = failures
+        run.retries_count = len(nacked)
         run.status = "SUCCESS" if failures == 0 else ("PARTIAL" if invoices_created > 0 else "FAIL")
         run.run_finished_at = datetime.now(UTC)
         if failures > 0:
             run.last_error = f"{failures} message(s) failed to process"
+        run.bytes_ingested = bytes_ingested
+        run.latency_histogram = latency_histogram or None
+        run.latency_samples = sum(latency_histogram.values())
+        run.latency_sum_ms = latency_sum_ms
+        _set_stage_timings(run, stage_seconds)
 
         db.add(run)
+        start = time.perf_counter()
         db.commit()
+        stage_seconds["flush"] += time.perf_counter() - start
+
+        # Only acknowledge once the invoices are durable; failures go back to the provider or to quarantine
+        start = time.perf_counter()
+        _acknowledge(provider, acked, nacked, rejected)
+        for msg_id in acked:
+            _failed_attempts.pop(msg_id, None)
+        stage_seconds["ack"] = time.perf_counter() - start
+        if messages:
+            _record_post_commit_timings(db, run, stage_seconds)
         logger.info("Ingestion run complete: %d seen, %d processed, %d invoices, %d failures",
                      run.emails_seen, run.emails_processed, invoices_created, failures)
+        _count_run(run, len(acked), len(nacked), len(rejected))
 
     except Exception as e:
+        # Only failures before the commit get here (post-commit steps log and count their own): nothing was stored
         logger.error("Ingestion run failed: %s", e)
+        db.rollback()
+        provider.nack([m.get("ID", "") for m in messages])
         run.status = "FAIL"
         run.last_error = str(e)
         run.run_finished_at = datetime.now(UTC)
         db.add(run)
         db.commit()
+        INGESTION_RUNS.labels(run.status).inc()
+        INGESTION_EMAILS.labels("retried").inc(len(messages))
     finally:
+        provider.close()
         db.close()
@@ -0,0 +1,190 @@
+"""Field extraction stage: NEW -> EXTRACTED -> VALIDATED / APPROVAL_PENDING.
+
+Email-ingested invoices arrive NEW with only a file. Each run claims a batch of
+NEW invoices with FOR UPDATE SKIP LOCKED (so every API worker's scheduler can
+run this concurrently without double work), reads their files in the
+"field-extract" process pool (inline when EXTRACTION_WORKERS is 0), fills the
+fields that are still empty and commits them as EXTRACTED, storing the text
+for full-text search on the way. A second step then validates EXTRACTED
+invoices; if it fails they stay EXTRACTED and are picked up on the next run.
+
+Senders whose invoices the generic rules read well get a learned template
+(app/services/extraction.learn_template), stored per tenant in
+app/services/template_store.py and used first for their later invoices. A
+template that keeps missing is learned again from the next generic read.
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+from itertools import repeat
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.invoice_exception import InvoiceException
+from app.services.audit import log_event
+from app.services.extraction import ExtractionResult, Template, extract_invoice, learn_template, sender_domain
+from app.services.template_store import template_store
+from app.services.validation import insert_exceptions, validate_many
+from app.workers.pool import discard_process_pool, get_process_pool
+from app.workers.text_indexer import store_texts
+
+logger = logging.getLogger(__name__)
+
+POOL_NAME = "field-extract"
+
+
+def claim_new_invoices(db: Session, limit: int) -> list[Invoice]:
+    return (
+        db.query(Invoice)
+        .filter(Invoice.status == InvoiceStatus.NEW.value, Invoice.file_path != "")
+        .order_by(Invoice.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=Invoice)
+        .all()
+    )
+
+
+def _extract_all(jobs: list[tuple[str, str | None, Template | None]]) -> list[ExtractionResult]:
+    """Run extract_invoice inline or across the pool, preserving order. A broken pool fails the batch."""
+    max_chars = settings.TEXT_INDEX_MAX_CHARS
+    pool = get_process_pool(POOL_NAME, settings.EXTRACTION_WORKERS)
+    if pool is None:
+        return [extract_invoice(path, email_from, template, max_chars) for path, email_from, template in jobs]
+
+    # Files are small, so ship them in chunks (a few per worker) rather than one IPC round trip each
+    chunksize = max(1, len(jobs) // (settings.EXTRACTION_WORKERS * 4))
+    paths, senders, templates = zip(*jobs, strict=True)
+    try:
+        return list(pool.map(extract_invoice, paths, senders, templates, repeat(max_chars), chunksize=chunksize))
+    except BrokenProcessPool:
+        discard_process_pool(POOL_NAME)
+        raise
+
+
+def apply_fields(inv: Invoice, fields: dict) -> list[str]:
+    """Copy extracted values into the invoice's empty fields; never overwrites what a user entered."""
+    filled = []
+    if not (inv.vendor or "").strip() and fields.get("vendor"):
+        inv.vendor = fields["vendor"][:255]
+        filled.append("vendor")
+    if not (inv.invoice_number or "").strip() and fields.get("invoice_number"):
+        inv.invoice_number = fields["invoice_number"][:255]
+        filled.append("invoice_number")
+    if inv.invoice_date is None and fields.get("invoice_date"):
+        inv.invoice_date = fields["invoice_date"]
+        filled.append("invoice_date")
+    if inv.amount is None and fields.get("amount") is not None:
+        inv.amount = fields["amount"]
+        filled.append("amount")
+        # The currency printed next to the total belongs with it
+        if fields.get("currency"):
+            inv.currency = fields["currency"]
+            filled.append("currency")
+    return filled
+
+
+def _learn(db: Session, inv: Invoice, domain: str | None, template: Template | None, result: ExtractionResult):
+    """Store a template for the invoice's sender (or vendor, without one) if it has none or it keeps missing."""
+    if template is not None:
+        template_store.record(template, hit=not result.used_generic)
+    vendor = "" if domain else (inv.vendor or "")
+    if not (domain or vendor.strip()):
+        return
+    # An earlier invoice in this batch may already have taught the same key
+    current = template or template_store.get(db, inv.tenant_id, domain, vendor)
+    if current is not None and not template_store.needs_relearn(current):
+        return
+    learned = learn_template(domain or vendor, result)
+    if learned is not None:
+        template_store.save(db, inv.tenant_id, domain or "", vendor, learned)
+
+
+def extract_batch(db: Session, batch_size: int) -> int:
+    """Extract fields for up to `batch_size` NEW invoices and mark them EXTRACTED (caller commits)."""
+    invoices = claim_new_invoices(db, batch_size)
+    if not invoices:
+        return 0
+    domains = [sender_domain(inv.email_from) for inv in invoices]
+    template_store.prefetch(db, [
+        key
+        for inv, domain in zip(invoices, domains, strict=True)
+        for key in template_store.candidates(inv.tenant_id, domain, inv.vendor)
+    ])
+    templates = [
+        template_store.get(db, inv.tenant_id, domain, inv.vendor) for inv, domain in zip(invoices, domains, strict=True)
+    ]
+    results = _extract_all([
+        (inv.file_path, inv.email_from, template) for inv, template in zip(invoices, templates, strict=True)
+    ])
+
+    store_texts(db, [
+        (inv.id, inv.tenant_id, inv.file_path, result.text) for inv, result in zip(invoices, results, strict=True)
+    ])
+    for inv, domain, template, result in zip(invoices, domains, templates, results, strict=True):
+        filled = apply_fields(inv, result.fields)
+        inv.status = InvoiceStatus.EXTRACTED.value
+        if not result.text.error:
+            _learn(db, inv, domain, template, result)
+        log_event(
+            db, inv.tenant_id, "INVOICE_AUTO_EXTRACTED", entity_type="invoice", entity_id=str(inv.id),
+            metadata={"fields": filled, "template": result.template_key, "error": result.text.error},
+        )
+    template_store.flush_counters(db)
+    return len(invoices)
+
+
+def validate_extracted(db: Session, batch_size: int) -> int:
+    """Re-validate EXTRACTED invoices, replacing their open exceptions (caller commits)."""
+    invoices = (
+        db.query(Invoice)
+        .filter(Invoice.status == InvoiceStatus.EXTRACTED.value)
+        .order_by(Invoice.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True, of=Invoice)
+        .all()
+    )
+    if not invoices:
+        return 0
+    db.query(InvoiceException).filter(
+        InvoiceException.invoice_id.in_([inv.id for inv in invoices]), InvoiceException.resolved_at.is_(None),
+    ).update({InvoiceException.resolved_at: datetime.now(UTC)}, synchronize_session=False)
+
+    by_tenant: dict = defaultdict(list)
+    for inv in invoices:
+        by_tenant[inv.tenant_id].append(inv)
+    rows = [row for group in by_tenant.values() for row in validate_many(group, group[0].tenant, db)]
+    insert_exceptions(db, rows)
+    flagged = {row["invoice_id"] for row in rows}
+    for inv in invoices:
+        inv.status = InvoiceStatus.VALIDATED.value if inv.id in flagged else InvoiceStatus.APPROVAL_PENDING.value
+    return len(invoices)
+
+
+def _drain(db: Session, step, batch_size: int) -> int:
+    total = 0
+    while True:
+        done = step(db, batch_size)
+        db.commit()
+        total += done
+        if done < batch_size:
+            return total
+
+
+def extract_new_invoices():
+    """Scheduled entry point: extract, then validate, batch by batch (one transaction each)."""
+    batch_size = settings.EXTRACTION_BATCH_SIZE
+    db = SessionLocal()
+    try:
+        extracted = _drain(db, extract_batch, batch_size)
+        validated = _drain(db, validate_extracted, batch_size)
+        if extracted or validated:
+            logger.info("Field extraction: %d invoices extracted, %d validated", extracted, validated)
+    except Exception as e:
+        db.rollback()
+        logger.error("Field extraction failed: %s", e)
+    finally:
+        db.close()
@@ -0,0 +1,45 @@
+"""Shared process pools for CPU-bound worker stages.
+
+Pools are created lazily by name and use the "spawn" start method so child
+processes never inherit the API server's threads, sockets or DB connections.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_pools: dict[str, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor | None:
+    """Return the named pool, creating it on first use. Returns None when max_workers <= 0 (run inline)."""
+    if max_workers <= 0:
+        return None
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[name] = pool
+            logger.info("Started process pool %s with %d workers", name, max_workers)
+        return pool
+
+
+def discard_process_pool(name: str):
+    """Drop a pool (e.g. after BrokenProcessPool) so the next call starts a fresh one."""
+    with _lock:
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pools():
+    """Shut down every pool; called when the scheduler stops."""
+    with _lock:
+        pools = list(_pools.items())
+        _pools.clear()
+    for name, pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("Stopped process pool %s", name)
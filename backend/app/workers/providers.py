@@ -0,0 +1,340 @@
+"""Inbound email providers: MailHog (dev), Maildir directory and IMAP.
+
+Every provider hands the pipeline messages in the MailHog API v2 shape
+(ID / To / From / Content.Headers / MIME / Raw.Data), so the extraction code
+in email_poller works unchanged regardless of where mail comes from.
+"""
+import imaplib
+import logging
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from email.header import decode_header, make_header
+from email.parser import HeaderParser
+from email.policy import compat32
+from email.utils import getaddresses
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InboundProvider(ABC):
+    """Batch interface used by poll_and_ingest.
+
+    fetch_batch claims up to `limit` messages; each claimed message must later be
+    passed to ack (processed, remove it), nack (leave it for the next poll) or
+    reject (it can never be processed: unroutable, or failed too often; take it
+    out of the inbox so it stops coming back). Providers that claim in the mailbox
+    itself put back claims older than INBOUND_CLAIM_TIMEOUT_SECONDS, whose poller
+    died before acking them.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def fetch_batch(self, limit: int) -> list[dict]: ...
+
+    @abstractmethod
+    def ack(self, message_ids: list[str]): ...
+
+    def nack(self, message_ids: list[str]):
+        """Default: nothing to release, unacked messages are simply fetched again."""
+
+    def reject(self, message_ids: list[str]):
+        """Default: delete, like ack. The poller has already logged why each one was rejected."""
+        self.ack(message_ids)
+
+    def close(self):
+        """Release connections; called once per poll cycle."""
+
+
+def _address_dict(addr: str) -> dict:
+    mailbox, _, domain = addr.partition("@")
+    return {"Mailbox": mailbox, "Domain": domain}
+
+
+def _decoded(value: str) -> str:
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def raw_to_message(message_id: str, raw: str) -> dict:
+    """Wrap an RFC822 message in the MailHog v2 shape, parsing headers only."""
+    headers = HeaderParser(policy=compat32).parsestr(raw, headersonly=True)
+    to_addrs = [addr for _, addr in getaddresses(headers.get_all("To", [])) if addr]
+    from_addrs = [addr for _, addr in getaddresses(headers.get_all("From", [])) if addr]
+    content_headers = {
+        key: [_decoded(v) for v in headers.get_all(key)]
+        for key in ("From", "To", "Subject", "Date", "Message-ID")
+        if headers.get(key) is not None
+    }
+    return {
+        "ID": message_id,
+        "From": _address_dict(from_addrs[0]) if from_addrs else None,
+        "To": [_address_dict(a) for a in to_addrs],
+        "Content": {"Headers": content_headers, "Body": "", "MIME": None},
+        "MIME": None,
+        "Raw": {"Data": raw},
+    }
+
+
+def _decode_raw(data: bytes) -> str:
+    """Raw message bytes as text for the parser.
+
+    Bytes that are not UTF-8 (8bit attachment parts) become surrogate escapes, which the
+    attachment sinks write back out unchanged; "replace" would corrupt them.
+    """
+    return data.decode("utf-8", errors="surrogateescape")
+
+
+class MailHogProvider(InboundProvider):
+    """Polls MailHog API v2 for new messages."""
+
+    name = "MAILHOG"
+
+    def __init__(self, api_url: str = ""):
+        self.api_url = api_url or settings.MAILHOG_API_URL
+
+    def fetch_batch(self, limit: int) -> list[dict]:
+        try:
+            resp = httpx.get(f"{self.api_url}/messages", params={"limit": limit}, timeout=10)
+            resp.raise_for_status()
+            data = resp.json()
+            return data.get("items", [])
+        except Exception as e:
+            logger.error("MailHog fetch error: %s", e)
+            return []
+
+    def ack(self, message_ids: list[str]):
+        # The MailHog API only deletes one message per call; reuse a single connection.
+        v1_url = self.api_url.replace("/v2", "/v1")
+        with httpx.Client(timeout=10) as client:
+            for message_id in message_ids:
+                try:
+                    client.delete(f"{v1_url}/messages/{message_id}")
+                except Exception as e:
+                    logger.warning("Failed to delete message %s: %s", message_id, e)
+
+
+class MaildirProvider(InboundProvider):
+    """Reads a Maildir (new/ cur/ tmp/). Fetching moves files new/ → cur/, which is the claim.
+
+    ack deletes the claimed files; nack moves them back to new/; reject moves
+    them to quarantine/ for inspection. A claim stamps the file's mtime, and files
+    left in cur/ longer than INBOUND_CLAIM_TIMEOUT_SECONDS go back to new/. Works
+    offline, which also makes it the benchmark source for the ingestion pipeline.
+    """
+
+    name = "MAILDIR"
+
+    def __init__(self, path: str = ""):
+        self.path = path or settings.MAILDIR_PATH
+        for sub in ("new", "cur", "tmp", "quarantine"):
+            os.makedirs(os.path.join(self.path, sub), exist_ok=True)
+        self._claimed: dict[str, str] = {}
+
+    def _requeue_stale_claims(self, cur_dir: str, new_dir: str):
+        cutoff = time.time() - settings.INBOUND_CLAIM_TIMEOUT_SECONDS
+        requeued = 0
+        with os.scandir(cur_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                    os.rename(entry.path, os.path.join(new_dir, entry.name.split(":", 1)[0]))
+                except FileNotFoundError:
+                    continue  # acked or requeued by a concurrent poller
+                requeued += 1
+        if requeued:
+            logger.warning("Requeued %d stale Maildir claim(s) from %s", requeued, cur_dir)
+
+    def fetch_batch(self, limit: int) -> list[dict]:
+        new_dir = os.path.join(self.path, "new")
+        cur_dir = os.path.join(self.path, "cur")
+        self._requeue_stale_claims(cur_dir, new_dir)
+        messages: list[dict] = []
+        with os.scandir(new_dir) as entries:
+            for entry in entries:
+                if len(messages) >= limit:
+                    break
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                message_id = entry.name.split(":", 1)[0]
+                claimed_path = os.path.join(cur_dir, f"{message_id}:2,S")
+                try:
+                    os.utime(entry.path)  # claim time, for stale-claim recovery
+                    os.rename(entry.path, claimed_path)
+                except FileNotFoundError:
+                    continue  # claimed by a concurrent poller
+                # Bytes, not text mode: no newline translation, and 8bit parts survive (see _decode_raw)
+                with open(claimed_path, "rb") as f:
+                    raw = _decode_raw(f.read())
+                self._claimed[message_id] = claimed_path
+                messages.append(raw_to_message(message_id, raw))
+        return messages
+
+    def ack(self, message_ids: list[str]):
+        for message_id in message_ids:
+            path = self._claimed.pop(message_id, None)
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _release(self, message_ids: list[str], folder: str):
+        for message_id in message_ids:
+            path = self._claimed.pop(message_id, None)
+            if path and os.path.exists(path):
+                os.rename(path, os.path.join(self.path, folder, message_id))
+
+    def nack(self, message_ids: list[str]):
+        self._release(message_ids, "new")
+
+    def reject(self, message_ids: list[str]):
+        self._release(message_ids, "quarantine")
+
+
+_UID_RE = re.compile(rb"UID (\d+)")
+
+# (mailbox, UID) -> when this process first found the message claimed at the start of a poll. IMAP keeps
+# no claim time, and a provider lives for one poll cycle, so the clock lives here (and restarts with the process).
+_imap_claims_seen: dict[tuple[str, bytes], float] = {}
+
+
+class ImapProvider(InboundProvider):
+    """IMAP mailbox. Batch fetch and batch ack are single UID commands over a UID set.
+
+    Claimed messages are flagged \\Seen; ack flags \\Deleted and expunges,
+    nack clears \\Seen so the next poll picks them up again. reject copies them
+    to IMAP_QUARANTINE_MAILBOX and removes them from the inbox; if the copy fails
+    they stay in the inbox \\Seen, which the UNSEEN search skips. The mailbox is
+    the poller's own: a message still \\Seen and undeleted
+    INBOUND_CLAIM_TIMEOUT_SECONDS after this process first noticed it is a lost
+    claim (or a failed quarantine copy) and is unflagged, so it is fetched again.
+    """
+
+    name = "IMAP"
+
+    def __init__(
+        self,
+        host: str = "",
+        port: int = 0,
+        username: str = "",
+        password: str = "",
+        mailbox: str = "",
+        use_ssl: bool | None = None,
+        quarantine_mailbox: str = "",
+    ):
+        self.host = host or settings.IMAP_HOST
+        self.port = port or settings.IMAP_PORT
+        self.username = username or settings.IMAP_USERNAME
+        self.password = password or settings.IMAP_PASSWORD
+        self.mailbox = mailbox or settings.IMAP_MAILBOX
+        self.use_ssl = settings.IMAP_USE_SSL if use_ssl is None else use_ssl
+        self.quarantine_mailbox = quarantine_mailbox or settings.IMAP_QUARANTINE_MAILBOX
+        self._conn: imaplib.IMAP4 | None = None
+
+    def _connection(self) -> imaplib.IMAP4:
+        if self._conn is None:
+            cls = imaplib.IMAP4_SSL if self.use_ssl else imaplib.IMAP4
+            conn = cls(self.host, self.port)
+            conn.login(self.username, self.password)
+            conn.select(self.mailbox)
+            self._conn = conn
+        return self._conn
+
+    def _requeue_stale_claims(self, conn: imaplib.IMAP4):
+        _, data = conn.uid("SEARCH", None, "SEEN UNDELETED")
+        claimed = {(self.mailbox, uid) for uid in (data[0] or b"").split()}
+        for key in [k for k in _imap_claims_seen if k[0] == self.mailbox and k not in claimed]:
+            del _imap_claims_seen[key]
+        now = time.monotonic()
+        stale = [
+            key[1] for key in sorted(claimed)
+            if now - _imap_claims_seen.setdefault(key, now) >= settings.INBOUND_CLAIM_TIMEOUT_SECONDS
+        ]
+        if stale:
+            conn.uid("STORE", b",".join(stale).decode(), "-FLAGS.SILENT", "(\\Seen)")
+            for uid in stale:
+                del _imap_claims_seen[(self.mailbox, uid)]
+            logger.warning("Requeued %d stale IMAP claim(s) in %s", len(stale), self.mailbox)
+
+    def fetch_batch(self, limit: int) -> list[dict]:
+        try:
+            conn = self._connection()
+            self._requeue_stale_claims(conn)
+            _, data = conn.uid("SEARCH", None, "UNSEEN UNDELETED")
+            uids = (data[0] or b"").split()[:limit]
+            if not uids:
+                return []
+            uid_set = b",".join(uids).decode()
+            _, fetched = conn.uid("FETCH", uid_set, "(UID BODY.PEEK[])")
+            conn.uid("STORE", uid_set, "+FLAGS.SILENT", "(\\Seen)")
+        except Exception as e:
+            logger.error("IMAP fetch error: %s", e)
+            self.close()
+            return []
+
+        messages: list[dict] = []
+        for item in fetched:
+            if not isinstance(item, tuple):
+                continue
+            match = _UID_RE.search(item[0])
+            if not match:
+                continue
+            raw = _decode_raw(item[1])
+            messages.append(raw_to_message(match.group(1).decode(), raw))
+        return messages
+
+    def _store(self, message_ids: list[str], op: str, flags: str) -> bool:
+        if not message_ids:
+            return False
+        try:
+            self._connection().uid("STORE", ",".join(message_ids), op, flags)
+            return True
+        except Exception as e:
+            logger.warning("IMAP STORE %s %s failed for %d message(s): %s", op, flags, len(message_ids), e)
+            return False
+
+    def ack(self, message_ids: list[str]):
+        if self._store(message_ids, "+FLAGS.SILENT", "(\\Deleted)"):
+            try:
+                self._connection().expunge()
+            except Exception as e:
+                logger.warning("IMAP EXPUNGE failed: %s", e)
+
+    def nack(self, message_ids: list[str]):
+        self._store(message_ids, "-FLAGS.SILENT", "(\\Seen)")
+
+    def reject(self, message_ids: list[str]):
+        if not message_ids:
+            return
+        try:
+            status, _ = self._connection().uid("COPY", ",".join(message_ids), self.quarantine_mailbox)
+        except Exception as e:
+            status = f"failed: {e}"
+        if status != "OK":
+            logger.warning(
+                "IMAP COPY to %s %s for %d message(s); leaving them \\Seen in %s",
+                self.quarantine_mailbox, status, len(message_ids), self.mailbox,
+            )
+            return
+        self.ack(message_ids)
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.logout()
+            except Exception:
+                pass
+            self._conn = None
+
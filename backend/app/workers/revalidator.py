@@ -0,0 +1,184 @@
+"""Re-validation of open invoices after a tenant settings change.
+
+PATCH /tenants/settings queues a RevalidationJob for the tenant's new
+settings_version. Each run takes the oldest active job with FOR UPDATE SKIP
+LOCKED, so only one process works a job at a time. It walks the tenant's open
+(VALIDATED / APPROVAL_PENDING) invoices that the change can affect, in id order
+and REVALIDATION_BATCH_SIZE at a time. "Affected" is a SQL predicate built from
+the rules' SQL forms (app/services/validation.py): the invoice fails a
+settings-dependent rule now, or has an open exception from one. No invoice is
+loaded into Python.
+
+Each chunk runs set-based statements per settings rule: resolve the open
+exceptions of invoices that no longer fail it, bring the message of those that
+still fail up to date where it changed, and open one where none is open; then
+one statement moves status between VALIDATED and APPROVAL_PENDING. An invoice
+that fails before and after the change keeps its exception, so the counters
+and its exception history only record real changes. The chunk commits together
+with the job's cursor and counters. An interrupted job resumes after its last
+invoice. A failed job keeps its cursor and can be resumed via
+POST /tenants/revalidation-jobs/{id}/resume.
+"""
+import logging
+from datetime import UTC, datetime
+
+from sqlalchemy import and_, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.invoice import Invoice
+from app.models.invoice_exception import InvoiceException
+from app.models.revalidation_job import ACTIVE_STATUSES, RevalidationJob, RevalidationStatus
+from app.models.tenant import Tenant
+from app.services.audit import log_event
+from app.services.validation import REVIEWED_STATUSES, Rule, RuleSet, compiled_rules, sync_review_statuses
+
+logger = logging.getLogger(__name__)
+
+# Invoices past review (APPROVED / REJECTED / PAID) keep the exceptions they were decided with;
+# NEW / EXTRACTED ones are validated later with the current rules anyway
+OPEN_STATUSES = REVIEWED_STATUSES
+
+
+def queue_revalidation(db: Session, tenant: Tenant, user_id=None) -> RevalidationJob:
+    """Queue a job for the tenant's current settings_version, superseding its older active jobs (caller commits)."""
+    db.query(RevalidationJob).filter(
+        RevalidationJob.tenant_id == tenant.id, RevalidationJob.status.in_(ACTIVE_STATUSES),
+    ).update({RevalidationJob.status: RevalidationStatus.SUPERSEDED.value}, synchronize_session=False)
+    job = RevalidationJob(tenant_id=tenant.id, settings_version=tenant.settings_version, requested_by_user_id=user_id)
+    db.add(job)
+    return job
+
+
+def settings_rules(rule_set: RuleSet) -> list[Rule]:
+    return [r for r in rule_set.rules if r.sql is not None]
+
+
+def affected_predicate(tenant_id, rule_set: RuleSet):
+    """Open invoices of the tenant that fail a settings rule now or carry an open exception from one."""
+    rules = settings_rules(rule_set)
+    open_exception = Invoice.exceptions.any(and_(
+        InvoiceException.code.in_([r.code for r in rules]), InvoiceException.resolved_at.is_(None),
+    ))
+    return and_(
+        Invoice.tenant_id == tenant_id,
+        Invoice.status.in_(OPEN_STATUSES),
+        or_(*(r.sql(rule_set.config)[0] for r in rules), open_exception),
+    )
+
+
+def run_chunk(db: Session, job: RevalidationJob, rule_set: RuleSet, batch_size: int) -> int:
+    """Re-check the next `batch_size` affected invoices after the job's cursor; returns how many (caller commits)."""
+    q = db.query(Invoice.id).filter(affected_predicate(job.tenant_id, rule_set))
+    if job.last_invoice_id is not None:
+        q = q.filter(Invoice.id > job.last_invoice_id)
+    ids = [row.id for row in q.order_by(Invoice.id).limit(batch_size)]
+    if not ids:
+        return 0
+
+    now = datetime.now(UTC)
+    resolved = created = 0
+    for r in settings_rules(rule_set):
+        failing, message = r.sql(rule_set.config)
+        open_exception = and_(InvoiceException.code == r.code, InvoiceException.resolved_at.is_(None))
+        resolved += db.execute(
+            update(InvoiceException)
+            .where(
+                InvoiceException.invoice_id.in_(ids), open_exception,
+                InvoiceException.invoice_id.notin_(select(Invoice.id).where(Invoice.id.in_(ids), failing)),
+            )
+            .values(resolved_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.execute(
+            update(InvoiceException)
+            .where(
+                InvoiceException.invoice_id == Invoice.id, Invoice.id.in_(ids), failing, open_exception,
+                InvoiceException.message.is_distinct_from(message),
+            )
+            .values(message=message)
+            .execution_options(synchronize_session=False)
+        )
+        created += db.execute(
+            insert(InvoiceException).from_select(
+                ["id", "tenant_id", "invoice_id", "code", "message", "severity", "created_at"],
+                select(
+                    func.gen_random_uuid(), Invoice.tenant_id, Invoice.id, literal(r.code), message,
+                    literal(r.severity), literal(now),
+                ).where(
+                    Invoice.id.in_(ids), failing,
+                    ~select(InvoiceException.id)
+                    .where(InvoiceException.invoice_id == Invoice.id, open_exception)
+                    .exists(),
+                ),
+            )
+        ).rowcount
+    sync_review_statuses(db, ids)
+
+    job.processed += len(ids)
+    job.exceptions_resolved += resolved
+    job.exceptions_created += created
+    job.last_invoice_id = ids[-1]
+    return len(ids)
+
+
+def next_job(db: Session) -> RevalidationJob | None:
+    """Lock the oldest active job; jobs locked by another process are skipped."""
+    return (
+        db.query(RevalidationJob)
+        .filter(RevalidationJob.status.in_(ACTIVE_STATUSES))
+        .order_by(RevalidationJob.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+
+
+def advance(db: Session, job: RevalidationJob, batch_size: int):
+    """Run one chunk of a locked job, finishing it when nothing is left (caller commits)."""
+    now = datetime.now(UTC)
+    tenant = db.get(Tenant, job.tenant_id)
+    if tenant is None or tenant.settings_version != job.settings_version:
+        job.status = RevalidationStatus.SUPERSEDED.value
+        job.finished_at = now
+        return
+
+    rule_set = compiled_rules(tenant)
+    if job.status == RevalidationStatus.PENDING.value:
+        job.status = RevalidationStatus.RUNNING.value
+        job.started_at = now
+        job.total = db.query(func.count(Invoice.id)).filter(affected_predicate(tenant.id, rule_set)).scalar()
+    if run_chunk(db, job, rule_set, batch_size) < batch_size:
+        job.status = RevalidationStatus.DONE.value
+        job.finished_at = now
+        log_event(
+            db, job.tenant_id, "INVOICES_REVALIDATED", entity_type="revalidation_job", entity_id=str(job.id),
+            actor_user_id=job.requested_by_user_id,
+            metadata={
+                "settings_version": job.settings_version, "invoices": job.processed,
+                "exceptions_resolved": job.exceptions_resolved, "exceptions_created": job.exceptions_created,
+            },
+        )
+
+
+def run_revalidation_jobs():
+    """Scheduled entry point: work active jobs chunk by chunk (one transaction each) until none is left."""
+    batch_size = settings.REVALIDATION_BATCH_SIZE
+    db = SessionLocal()
+    job_id = None
+    try:
+        while (job := next_job(db)) is not None:
+            job_id = job.id
+            advance(db, job, batch_size)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Re-validation job %s failed: %s", job_id, e)
+        if job_id is not None:
+            db.query(RevalidationJob).filter(RevalidationJob.id == job_id).update(
+                {RevalidationJob.status: RevalidationStatus.FAILED.value, RevalidationJob.error: str(e)[:2000]},
+                synchronize_session=False,
+            )
+            db.commit()
+    finally:
+        db.close()
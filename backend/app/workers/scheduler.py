@@ -1,10 +1,16 @@
-"""Background scheduler for email polling."""
+"""Background scheduler for email polling, field extraction, re-validation, text indexing and audit log maintenance."""
 import logging
+from datetime import datetime
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from app.core.config import settings
+from app.workers.audit_maintenance import archive_audit_log, maintain_audit_partitions
 from app.workers.email_poller import poll_and_ingest
+from app.workers.field_extractor import extract_new_invoices
+from app.workers.pool import shutdown_process_pools
+from app.workers.revalidator import run_revalidation_jobs
+from app.workers.text_indexer import index_invoice_texts
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +18,7 @@ scheduler = BackgroundScheduler()
 
 
 def start_scheduler():
-    """Start the email polling scheduler."""
+    """Start the email poller, field extractor, re-validator, text indexer and the daily audit jobs (also run once at startup)."""
     scheduler.add_job(
         poll_and_ingest,
         "interval",
@@ -20,6 +26,43 @@ def start_scheduler():
         id="email_poller",
         replace_existing=True,
     )
+    scheduler.add_job(
+        extract_new_invoices,
+        "interval",
+        seconds=settings.EXTRACTION_INTERVAL_SECONDS,
+        id="field_extractor",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        run_revalidation_jobs,
+        "interval",
+        seconds=settings.REVALIDATION_INTERVAL_SECONDS,
+        id="revalidator",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        index_invoice_texts,
+        "interval",
+        seconds=settings.TEXT_INDEX_INTERVAL_SECONDS,
+        id="text_indexer",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        maintain_audit_partitions,
+        "interval",
+        hours=24,
+        next_run_time=datetime.now(),
+        id="audit_partitions",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        archive_audit_log,
+        "interval",
+        hours=24,
+        next_run_time=datetime.now(),
+        id="audit_archive",
+        replace_existing=True,
+    )
     scheduler.start()
     logger.info("Email poller scheduled every %d seconds", settings.EMAIL_POLL_INTERVAL_SECONDS)
 
@@ -28,3 +71,4 @@ def stop_scheduler():
     """Shutdown the scheduler."""
     if scheduler.running:
         scheduler.shutdown(wait=False)
+    shutdown_process_pools()
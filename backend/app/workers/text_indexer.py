@@ -0,0 +1,121 @@
+"""Incremental full-text indexing of invoice files.
+
+Each run picks invoices whose file has no invoice_texts row yet (or whose
+file_path changed since it was indexed), extracts their text in the
+"text-index" process pool (inline when TEXT_INDEX_WORKERS is 0) and upserts
+the rows; Postgres derives the tsvector. Files that fail to extract get a row
+with `error` set so they are not retried every run. Batches are separate
+transactions, so a large backlog is indexed in steps and survives restarts.
+"""
+import logging
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.invoice import Invoice
+from app.models.invoice_text import InvoiceText
+from app.services.pdf_text import ExtractedText, extract_text
+from app.workers.pool import discard_process_pool, get_process_pool
+
+logger = logging.getLogger(__name__)
+
+POOL_NAME = "text-index"
+# Arbitrary constant key so concurrent schedulers (one per API worker) don't extract the same files
+_ADVISORY_LOCK_KEY = 0x54585449
+
+
+def pending_invoices(db: Session, limit: int) -> list:
+    """(id, tenant_id, file_path) of the oldest invoices whose current file is not indexed."""
+    return (
+        db.query(Invoice.id, Invoice.tenant_id, Invoice.file_path)
+        .outerjoin(InvoiceText, InvoiceText.invoice_id == Invoice.id)
+        .filter(
+            Invoice.file_path != "",
+            or_(InvoiceText.invoice_id.is_(None), InvoiceText.file_path != Invoice.file_path),
+        )
+        .order_by(Invoice.created_at)
+        .limit(limit)
+        .all()
+    )
+
+
+def _extract_all(paths: list[str]) -> list[ExtractedText]:
+    """Extract inline or fan out to the pool, preserving order. A broken pool fails the whole batch."""
+    max_chars = settings.TEXT_INDEX_MAX_CHARS
+    pool = get_process_pool(POOL_NAME, settings.TEXT_INDEX_WORKERS)
+    if pool is None:
+        return [extract_text(path, max_chars) for path in paths]
+
+    futures = [pool.submit(extract_text, path, max_chars) for path in paths]
+    try:
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        discard_process_pool(POOL_NAME)
+        raise
+
+
+def store_texts(db: Session, items: list[tuple[uuid.UUID, uuid.UUID, str, ExtractedText]]):
+    """Upsert (invoice_id, tenant_id, file_path, text) rows; also used by the field extractor."""
+    now = datetime.now(UTC)
+    rows = [
+        {
+            "invoice_id": invoice_id,
+            "tenant_id": tenant_id,
+            "file_path": file_path,
+            "content": result.content,
+            "page_count": result.page_count,
+            "error": result.error,
+            "extracted_at": now,
+        }
+        for invoice_id, tenant_id, file_path, result in items
+    ]
+    stmt = insert(InvoiceText).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[InvoiceText.invoice_id],
+        set_={col: stmt.excluded[col] for col in ("file_path", "content", "page_count", "error", "extracted_at")},
+    ))
+
+
+def index_batch(db: Session, batch_size: int) -> int:
+    """Extract and upsert text for up to `batch_size` pending invoices; returns how many were indexed."""
+    pending = pending_invoices(db, batch_size)
+    if not pending:
+        return 0
+    results = _extract_all([row.file_path for row in pending])
+    store_texts(db, [
+        (row.id, row.tenant_id, row.file_path, result) for row, result in zip(pending, results, strict=True)
+    ])
+    failed = sum(1 for result in results if result.error)
+    if failed:
+        logger.info("Text extraction failed for %d of %d files", failed, len(results))
+    return len(results)
+
+
+def index_invoice_texts():
+    """Scheduled entry point: index pending files batch by batch, skipped if another process holds the lock."""
+    batch_size = settings.TEXT_INDEX_BATCH_SIZE
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            # Transaction-scoped, so each batch's commit releases it
+            if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar():
+                break
+            indexed = index_batch(db, batch_size)
+            db.commit()
+            total += indexed
+            if indexed < batch_size:
+                break
+        if total:
+            logger.info("Indexed text for %d invoice files", total)
+    except Exception as e:
+        db.rollback()
+        logger.error("Invoice text indexing failed after %d files: %s", total, e)
+    finally:
+        db.close()
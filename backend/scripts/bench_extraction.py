@@ -0,0 +1,142 @@
+"""Field-extraction throughput benchmark over synthetic invoice PDFs.
+
+Usage:
+    python scripts/bench_extraction.py --count 5000 --vendors 200 --workers 0,2,4,8
+
+Generates `count` single-page PDFs from `vendors` senders, each sender with its
+own label wording, then runs the extraction stage (text layer + templates) once
+per worker count. No database needed. Reports files/s, field accuracy against
+the generated values and how often a learned sender template was used.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+
+NUMBER_LABELS = ["Invoice No", "Invoice #", "Inv No.", "Bill Number", "Tax Invoice Number"]
+DATE_LABELS = ["Invoice Date", "Date", "Date of Issue", "Issued On"]
+NAME_WORDS = ["Gulf", "Desert", "Pearl", "Falcon", "Marina", "Oasis", "Harbor", "Summit", "Crescent", "Palm",
+              "Atlas", "Cedar", "Coral", "Delta", "Emerald", "Horizon", "Meridian", "Nova", "Orbit", "Zenith"]
+TOTAL_LABELS = ["Grand Total", "Total Due", "Amount Due", "Total Amount Payable", "Balance Due"]
+
+
+def write_text_pdf(path: str, lines: list[str]):
+    """Minimal single-page PDF with one line of Helvetica text per entry."""
+    ops = " ".join(f"BT /F1 11 Tf 60 {760 - 15 * i} Td ({line}) Tj ET" for i, line in enumerate(lines))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(ops), ops.encode("latin-1")),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_invoices(root: str, count: int, vendors: int, line_items: int) -> list[tuple[str, str, dict]]:
+    """Write the PDFs; returns (path, email_from, expected fields) per invoice."""
+    rng = random.Random(42)
+    layouts = [
+        (
+            f"{NAME_WORDS[v % 20]} {NAME_WORDS[v // 20 % 20]} Trading LLC",
+            rng.choice(NUMBER_LABELS), rng.choice(DATE_LABELS), rng.choice(TOTAL_LABELS),
+        )
+        for v in range(vendors)
+    ]
+    invoices = []
+    for i in range(count):
+        v = i % vendors
+        name, number_label, date_label, total_label = layouts[v]
+        issued = date(2026, 1, 1) + timedelta(days=rng.randrange(280))
+        items = [round(rng.uniform(10, 5000), 2) for _ in range(line_items)]
+        total = round(sum(items) * 1.05, 2)
+        lines = [name, "TAX INVOICE", f"{number_label}: V{v:03d}-{i:07d}", f"{date_label}: {issued:%d/%m/%Y}"]
+        lines += [f"Item {n + 1} 1 x AED {amount:,.2f}" for n, amount in enumerate(items)]
+        lines += [f"Subtotal {sum(items):,.2f}", f"{total_label}: AED {total:,.2f}"]
+        path = os.path.join(root, f"inv-{i:07d}.pdf")
+        write_text_pdf(path, lines)
+        expected = {"vendor": name, "invoice_number": f"V{v:03d}-{i:07d}", "invoice_date": issued, "amount": total}
+        invoices.append((path, f"Billing <billing@vendor{v:03d}.example>", expected))
+    return invoices
+
+
+def run(invoices: list[tuple[str, str, dict]], batch_size: int) -> tuple[float, int, int]:
+    """One pass of the extraction stage; returns (seconds, correct fields, template hits).
+
+    Learned templates are kept in a plain dict here (no database); the worker
+    uses app/services/template_store.py for the same role.
+    """
+    from app.services.extraction import learn_template, sender_domain
+    from app.workers import field_extractor
+
+    templates = {}
+    correct = hits = 0
+    start = time.perf_counter()
+    for offset in range(0, len(invoices), batch_size):
+        batch = invoices[offset:offset + batch_size]
+        keys = [sender_domain(email_from) for _, email_from, _ in batch]
+        jobs = [(path, email_from, templates.get(key)) for (path, email_from, _), key in zip(batch, keys, strict=True)]
+        results = field_extractor._extract_all(jobs)
+        for (_, _, expected), (_, _, template), key, result in zip(batch, jobs, keys, results, strict=True):
+            if template is not None and not result.used_generic:
+                hits += 1
+            elif key not in templates:
+                learned = learn_template(key, result)
+                if learned is not None:
+                    templates[key] = learned
+            correct += sum(result.fields.get(name) == value for name, value in expected.items())
+    return time.perf_counter() - start, correct, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--line-items", type=int, default=8)
+    parser.add_argument("--workers", default="0,2,4", help="comma-separated worker counts (0 = inline)")
+    parser.add_argument("--batch-size", type=int, default=settings.EXTRACTION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-extract-")
+    try:
+        t0 = time.perf_counter()
+        invoices = generate_invoices(workdir, args.count, args.vendors, args.line_items)
+        print(f"Generated {args.count} PDFs from {args.vendors} vendors in {time.perf_counter() - t0:.1f}s")
+
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            settings.EXTRACTION_WORKERS = workers
+            run(invoices[:args.batch_size], args.batch_size)  # warm up: spawn workers, import pypdf
+            elapsed, correct, hits = run(invoices, args.batch_size)
+            rate = args.count / elapsed
+            baseline = baseline or rate
+            print(f"Workers {workers or 'inline':>6}: {rate:,.0f} files/s ({rate / baseline:.1f}x)  "
+                  f"fields correct {correct / (4 * args.count):.1%}  template hits {hits / args.count:.1%}")
+    finally:
+        from app.workers.pool import shutdown_process_pools
+
+        shutdown_process_pools()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Ingestion throughput benchmark against a local Maildir of synthetic messages.
+
+Usage:
+    python scripts/bench_ingestion.py --count 100000 --workers 4
+    python scripts/bench_ingestion.py --count 20000 --with-db --alias acme
+
+Without --with-db only the provider + parse/decode stages run (no Postgres needed).
+With --with-db the full poll_and_ingest cycle runs against DATABASE_URL, so a
+tenant with the given inbound alias must exist (make seed creates "acme").
+"""
+import argparse
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+
+
+def generate_maildir(root: str, count: int, alias: str, attachment_kb: int):
+    """Write `count` synthetic invoice emails into <root>/new."""
+    new_dir = os.path.join(root, "new")
+    os.makedirs(new_dir, exist_ok=True)
+    for sub in ("cur", "tmp"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    payload = base64.encodebytes(b"%PDF-1.4\n" + os.urandom(attachment_kb * 1024)).decode()
+    for i in range(count):
+        raw = (
+            f"From: billing{i % 200}@vendor{i % 200}.example\r\n"
+            f"To: {alias}@{settings.INBOUND_EMAIL_DOMAIN}\r\n"
+            f"Subject: Invoice INV-{i:07d}\r\n"
+            "Date: Mon, 19 Oct 2026 09:30:00 +0000\r\n"
+            "MIME-Version: 1.0\r\n"
+            'Content-Type: multipart/mixed; boundary="b1"\r\n'
+            "\r\n"
+            "--b1\r\n"
+            "Content-Type: text/plain\r\n"
+            "\r\n"
+            "Please find the invoice attached.\r\n"
+            "--b1\r\n"
+            f'Content-Type: application/pdf; name="INV-{i:07d}.pdf"\r\n'
+            f'Content-Disposition: attachment; filename="INV-{i:07d}.pdf"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+            f"{payload}"
+            "--b1--\r\n"
+        )
+        with open(os.path.join(new_dir, f"{uuid.uuid4().hex}.bench"), "w", newline="") as f:
+            f.write(raw)
+
+
+def bench_parse_only(maildir: str, batch_size: int) -> tuple[int, int, float, float]:
+    """Fetch → parse/decode → ack with no DB. Returns (messages, bytes, fetch_s, parse_s)."""
+    from app.workers.email_poller import _parse_messages
+    from app.workers.providers import MaildirProvider
+
+    provider = MaildirProvider(maildir)
+    messages = total_bytes = 0
+    fetch_s = parse_s = 0.0
+    while True:
+        t0 = time.perf_counter()
+        batch = provider.fetch_batch(batch_size)
+        t1 = time.perf_counter()
+        if not batch:
+            break
+        results = _parse_messages([(msg, "bench") for msg in batch])
+        t2 = time.perf_counter()
+        fetch_s += t1 - t0
+        parse_s += t2 - t1
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+            total_bytes += sum(a.size_bytes for a in result.attachments)
+        provider.ack([msg["ID"] for msg in batch])
+        messages += len(batch)
+    return messages, total_bytes, fetch_s, parse_s
+
+
+def bench_with_db(count: int) -> int:
+    from app.workers.email_poller import poll_and_ingest
+
+    runs = 0
+    remaining = count
+    while remaining > 0:
+        poll_and_ingest()
+        remaining -= settings.EMAIL_FETCH_BATCH_SIZE
+        runs += 1
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=settings.EMAIL_PARSE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_FETCH_BATCH_SIZE)
+    parser.add_argument("--attachment-kb", type=int, default=64)
+    parser.add_argument("--alias", default="acme")
+    parser.add_argument("--maildir", default="", help="existing Maildir to reuse (default: fresh temp dir)")
+    parser.add_argument("--with-db", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-ingest-")
+    maildir = args.maildir or os.path.join(workdir, "maildir")
+    upload_dir = os.path.join(workdir, "uploads")
+    # Set via the environment as well so spawned parse workers see the same values
+    os.environ["UPLOAD_DIR"] = settings.UPLOAD_DIR = upload_dir
+    os.environ["MAILDIR_PATH"] = settings.MAILDIR_PATH = maildir
+    settings.INBOUND_PROVIDER = "MAILDIR"
+    settings.EMAIL_PARSE_WORKERS = args.workers
+    settings.EMAIL_FETCH_BATCH_SIZE = args.batch_size
+
+    try:
+        if not args.maildir:
+            t0 = time.perf_counter()
+            generate_maildir(maildir, args.count, args.alias, args.attachment_kb)
+            print(f"Generated {args.count} messages in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        if args.with_db:
+            runs = bench_with_db(args.count)
+            elapsed = time.perf_counter() - t0
+            print(f"Full pipeline: {args.count} messages in {runs} runs, {elapsed:.1f}s, "
+                  f"{args.count / elapsed:,.0f} msg/s")
+        else:
+            messages, total_bytes, fetch_s, parse_s = bench_parse_only(maildir, args.batch_size)
+            elapsed = time.perf_counter() - t0
+            print(f"Workers:     {args.workers or 'inline'}  batch size {args.batch_size}")
+            print(f"Messages:    {messages:,} in {elapsed:.1f}s → {messages / elapsed:,.0f} msg/s")
+            print(f"Decoded:     {total_bytes / 1e6:,.1f} MB → {total_bytes / 1e6 / elapsed:,.1f} MB/s")
+            print(f"Stage time:  fetch {fetch_s:.1f}s, parse+write {parse_s:.1f}s, "
+                  f"ack {elapsed - fetch_s - parse_s:.1f}s")
+    finally:
+        from app.workers.pool import shutdown_process_pools
+
+        shutdown_process_pools()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Flag duplicate invoices in existing data.
+
+Usage:
+    python scripts/sweep_duplicates.py
+
+Backfills dedupe keys and file hashes for invoices that predate them, then
+opens a DUPLICATE_INVOICE exception on every later copy of an invoice (see
+app/services/dedupe.py). Safe to re-run: invoices already flagged are skipped.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db.session import SessionLocal
+from app.services.dedupe import backfill_keys, sweep_duplicates
+
+
+def run():
+    db = SessionLocal()
+    try:
+        backfilled = backfill_keys(db)
+        db.commit()
+        flagged = sweep_duplicates(db)
+        db.commit()
+        print(f"Backfilled {backfilled} invoices, flagged {flagged} duplicates.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -44,3 +44,30 @@ def test_audit_effectiveness(client, admin_user):
     assert resp.status_code == 200
     data = resp.json()
     assert "rejection_rate" in data
+
+
+def test_ingestion_performance(client, admin_user, db, tenant):
+    from datetime import UTC, datetime, timedelta
+
+    from app.models.ingestion_run import IngestionRun
+    now = datetime.now(UTC)
+    db.add(IngestionRun(
+        tenant_id=tenant.id, run_started_at=now - timedelta(seconds=2), run_finished_at=now,
+        emails_seen=4, emails_processed=4, invoices_created=4, bytes_ingested=4_000_000,
+        fetch_ms=40, parse_ms=600, write_ms=200, flush_ms=120, ack_ms=40,
+        latency_histogram={"5000": 3, "60000": 1}, latency_samples=4, latency_sum_ms=50_000,
+    ))
+    db.add(IngestionRun(tenant_id=None, run_started_at=now, run_finished_at=now, emails_seen=0))
+    db.flush()
+
+    resp = client.get("/api/analytics/ingestion/performance", headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["runs"] == 1
+    assert data["bytes_ingested"] == 4_000_000
+    assert data["stages"]["parse"]["total_ms"] == 600
+    assert sum(b["count"] for b in data["stages"]["parse"]["histogram"]) == 1
+    assert {b["lt"]: b["count"] for b in data["stages"]["parse"]["histogram"]}["1000"] == 1
+    latency = {b["le"]: b["count"] for b in data["latency"]["histogram"]}
+    assert latency["5000"] == 3 and latency["60000"] == 1
+    assert data["latency"]["mean_ms"] == 12500.0
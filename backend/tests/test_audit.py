@@ -0,0 +1,181 @@
+"""Tests for audit log endpoints."""
+from datetime import datetime, timedelta
+
+from app.models.audit_event import AuditEvent
+from tests.conftest import auth_headers
+
+
+def _seed_events(db, tenant, count: int, action: str = "LOGIN"):
+    base = datetime(2026, 10, 1, 12, 0, 0)
+    for i in range(count):
+        db.add(AuditEvent(tenant_id=tenant.id, timestamp=base + timedelta(minutes=i), action=action))
+    db.flush()
+
+
+def test_cursor_pages_cover_every_event_once(client, admin_user, db, tenant):
+    _seed_events(db, tenant, 7)
+    headers = auth_headers(admin_user)
+
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 3, "action": "LOGIN"}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/api/audit", params=params, headers=headers)
+        assert resp.status_code == 200
+        seen.extend(e["id"] for e in resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+def test_events_are_newest_first(client, admin_user, db, tenant):
+    _seed_events(db, tenant, 3, action="INVOICE_PAID")
+    resp = client.get("/api/audit", params={"action": "INVOICE_PAID"}, headers=auth_headers(admin_user))
+    timestamps = [e["timestamp"] for e in resp.json()]
+    assert timestamps == sorted(timestamps, reverse=True)
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_total_estimate_header(client, admin_user, db, tenant):
+    _seed_events(db, tenant, 2)
+    resp = client.get("/api/audit", params={"include_total": "true"}, headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    assert int(resp.headers["X-Total-Estimate"]) >= 0
+
+
+def test_invalid_cursor_rejected(client, admin_user):
+    resp = client.get("/api/audit", params={"cursor": "not-a-cursor"}, headers=auth_headers(admin_user))
+    assert resp.status_code == 400
+
+
+def _seed_entity(db, tenant, entity_type: str, entity_id: str, actions: list[str]):
+    base = datetime(2026, 10, 2, 9, 0, 0)
+    for i, action in enumerate(actions):
+        db.add(AuditEvent(
+            tenant_id=tenant.id, timestamp=base + timedelta(minutes=i),
+            action=action, entity_type=entity_type, entity_id=entity_id,
+        ))
+    db.flush()
+
+
+def test_entity_history_is_chronological(client, admin_user, db, tenant):
+    _seed_entity(db, tenant, "invoice", "inv-1", ["INVOICE_UPLOADED", "INVOICE_APPROVED", "INVOICE_PAID"])
+    _seed_entity(db, tenant, "invoice", "inv-2", ["INVOICE_UPLOADED"])
+
+    resp = client.get("/api/audit/entity/invoice/inv-1", headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    assert [e["action"] for e in resp.json()] == ["INVOICE_UPLOADED", "INVOICE_APPROVED", "INVOICE_PAID"]
+
+    resp = client.get("/api/audit/entity/invoice/inv-1", params={"limit": 2}, headers=auth_headers(admin_user))
+    assert [e["action"] for e in resp.json()] == ["INVOICE_APPROVED", "INVOICE_PAID"]
+
+
+def test_entity_history_batch(client, admin_user, db, tenant):
+    _seed_entity(db, tenant, "invoice", "inv-1", ["INVOICE_UPLOADED", "INVOICE_APPROVED"])
+    _seed_entity(db, tenant, "payment", "pay-1", ["PAYMENT_RECORDED"])
+
+    resp = client.post("/api/audit/entity/batch", headers=auth_headers(admin_user), json={
+        "entities": [
+            {"entity_type": "invoice", "entity_id": "inv-1"},
+            {"entity_type": "payment", "entity_id": "pay-1"},
+            {"entity_type": "invoice", "entity_id": "missing"},
+        ],
+        "limit_per_entity": 1,
+    })
+    assert resp.status_code == 200
+    histories = resp.json()
+    assert [(h["entity_id"], [e["action"] for e in h["events"]]) for h in histories] == [
+        ("inv-1", ["INVOICE_APPROVED"]),
+        ("pay-1", ["PAYMENT_RECORDED"]),
+        ("missing", []),
+    ]
+
+
+def test_entity_history_is_tenant_scoped(client, other_tenant_user, db, tenant):
+    _seed_entity(db, tenant, "invoice", "inv-1", ["INVOICE_UPLOADED"])
+    resp = client.get("/api/audit/entity/invoice/inv-1", headers=auth_headers(other_tenant_user))
+    assert resp.status_code == 200
+    assert resp.json() == []
+
+
+def test_metadata_containment_filter(client, admin_user, db, tenant):
+    db.add(AuditEvent(tenant_id=tenant.id, action="EMAIL_RECEIVED", metadata_json={"message_id": "m-1", "filename": "a.pdf"}))
+    db.add(AuditEvent(tenant_id=tenant.id, action="EMAIL_RECEIVED", metadata_json={"message_id": "m-2", "filename": "b.pdf"}))
+    db.flush()
+
+    resp = client.get("/api/audit", params={"metadata": '{"message_id": "m-2"}'}, headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    assert [e["metadata_json"]["filename"] for e in resp.json()] == ["b.pdf"]
+
+
+def test_metadata_filter_rejects_unindexable_predicates(client, admin_user):
+    headers = auth_headers(admin_user)
+    for bad in ["{}", "[1]", "not json", '{"unknown_key": "x"}', '{"filename": {"nested": 1}}', '{"filename": null}']:
+        resp = client.get("/api/audit", params={"metadata": bad}, headers=headers)
+        assert resp.status_code == 400, bad
+
+
+def test_archived_events_are_merged_when_range_reaches_past_hot_window(client, admin_user, db, tenant, tmp_path, monkeypatch):
+    import uuid
+
+    from app.core.config import settings
+    from app.services.audit_archive import write_segment
+
+    monkeypatch.setattr(settings, "AUDIT_HOT_DAYS", 90)
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", str(tmp_path))
+    old = [
+        AuditEvent(id=uuid.uuid4(), tenant_id=tenant.id, timestamp=datetime(2020, 1, 1) + timedelta(days=i),
+                   action="INVOICE_PAID", entity_type="invoice", entity_id=f"old-{i}")
+        for i in range(3)
+    ]
+    write_segment(tenant.id, old)
+    _seed_events(db, tenant, 2, action="INVOICE_PAID")
+    headers = auth_headers(admin_user)
+
+    resp = client.get("/api/audit", params={"action": "INVOICE_PAID", "page_size": 4}, headers=headers)
+    assert [e["entity_id"] for e in resp.json()][-2:] == ["old-2", "old-1"]
+
+    resp = client.get("/api/audit", params={
+        "action": "INVOICE_PAID", "page_size": 4, "cursor": resp.headers["X-Next-Cursor"],
+    }, headers=headers)
+    assert [e["entity_id"] for e in resp.json()] == ["old-0"]
+
+    recent_only = client.get("/api/audit", params={
+        "action": "INVOICE_PAID", "from_date": datetime.now().date().isoformat(),
+    }, headers=headers)
+    assert all(not e["entity_id"].startswith("old-") for e in recent_only.json())
+
+
+def test_entity_history_includes_archived_events(client, admin_user, db, tenant, tmp_path, monkeypatch):
+    import uuid
+
+    from app.core.config import settings
+    from app.services.audit_archive import write_segment
+
+    monkeypatch.setattr(settings, "AUDIT_HOT_DAYS", 90)
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", str(tmp_path))
+    write_segment(tenant.id, [
+        AuditEvent(id=uuid.uuid4(), tenant_id=tenant.id, timestamp=datetime(2020, 1, 1) + timedelta(days=i),
+                   action=action, entity_type="invoice", entity_id="inv-1")
+        for i, action in enumerate(["INVOICE_UPLOADED", "INVOICE_VALIDATED"])
+    ])
+    _seed_entity(db, tenant, "invoice", "inv-1", ["INVOICE_APPROVED", "INVOICE_PAID"])
+    headers = auth_headers(admin_user)
+
+    resp = client.get("/api/audit/entity/invoice/inv-1", headers=headers)
+    assert [e["action"] for e in resp.json()] == [
+        "INVOICE_UPLOADED", "INVOICE_VALIDATED", "INVOICE_APPROVED", "INVOICE_PAID",
+    ]
+    resp = client.get("/api/audit/entity/invoice/inv-1", params={"limit": 3}, headers=headers)
+    assert [e["action"] for e in resp.json()] == ["INVOICE_VALIDATED", "INVOICE_APPROVED", "INVOICE_PAID"]
+
+    resp = client.post("/api/audit/entity/batch", headers=headers, json={
+        "entities": [{"entity_type": "invoice", "entity_id": "inv-1"}], "limit_per_entity": 3,
+    })
+    assert [e["action"] for e in resp.json()[0]["events"]] == [
+        "INVOICE_VALIDATED", "INVOICE_APPROVED", "INVOICE_PAID",
+    ]
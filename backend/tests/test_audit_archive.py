@@ -0,0 +1,103 @@
+"""Unit tests for audit cold-storage segments (no database needed)."""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.audit_event import AuditEvent
+from app.services import audit_archive
+from app.services.audit_archive import estimate_archived, search_archive, search_archive_entities, write_segment
+
+TENANT = uuid.UUID("00000000-0000-0000-0000-000000000001")
+BASE = datetime(2019, 3, 1, 8, 0, 0)
+
+
+def _events(count: int, start: datetime = BASE, action: str = "LOGIN") -> list[AuditEvent]:
+    return [
+        AuditEvent(
+            id=uuid.uuid4(), tenant_id=TENANT, timestamp=start + timedelta(minutes=i), actor_user_id=None,
+            action=action if i % 2 == 0 else "INVOICE_PAID", entity_type="invoice", entity_id=f"inv-{i}",
+            metadata_json={"message_id": f"m-{i}"},
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture()
+def archive_dir(tmp_path):
+    audit_archive._load_index.cache_clear()
+    return str(tmp_path)
+
+
+def test_segment_has_sparse_index_per_block(archive_dir):
+    path = write_segment(TENANT, _events(25), archive_dir=archive_dir, block_events=10)
+
+    with open(path[: -len(".seg.gz")] + ".idx.json") as f:
+        index = json.load(f)
+    assert index["count"] == 25
+    assert [b["count"] for b in index["blocks"]] == [10, 10, 5]
+    assert index["blocks"][-1]["offset"] + index["blocks"][-1]["length"] == os.path.getsize(path)
+
+
+def test_search_is_newest_first_and_filtered(archive_dir):
+    events = _events(25)
+    write_segment(TENANT, events, archive_dir=archive_dir, block_events=10)
+
+    found = search_archive(TENANT, action="INVOICE_PAID", limit=3, archive_dir=archive_dir)
+    assert [e.entity_id for e in found] == ["inv-23", "inv-21", "inv-19"]
+
+    found = search_archive(TENANT, metadata={"message_id": "m-4"}, archive_dir=archive_dir)
+    assert [e.id for e in found] == [events[4].id]
+
+
+def test_search_respects_range_and_cursor(archive_dir):
+    events = _events(25)
+    write_segment(TENANT, events, archive_dir=archive_dir, block_events=10)
+
+    found = search_archive(
+        TENANT, start=events[5].timestamp, end=events[15].timestamp, limit=100, archive_dir=archive_dir,
+    )
+    assert len(found) == 11
+
+    cursor = (events[12].timestamp, events[12].id)
+    found = search_archive(TENANT, before=cursor, limit=2, archive_dir=archive_dir)
+    assert [e.entity_id for e in found] == ["inv-11", "inv-10"]
+
+
+def test_search_spans_segments_and_skips_other_tenants(archive_dir):
+    older, newer = _events(5), _events(5, start=BASE + timedelta(days=40))
+    write_segment(TENANT, older, archive_dir=archive_dir)
+    write_segment(TENANT, newer, archive_dir=archive_dir)
+
+    found = search_archive(TENANT, limit=7, archive_dir=archive_dir)
+    assert [e.id for e in found] == [e.id for e in reversed(newer)] + [older[4].id, older[3].id]
+    assert search_archive(uuid.uuid4(), archive_dir=archive_dir) == []
+
+
+def test_entity_search_keeps_the_newest_events_per_entity(archive_dir):
+    events = _events(25)
+    for i, e in enumerate(events):
+        e.entity_id = f"inv-{i % 3}"
+    write_segment(TENANT, events, archive_dir=archive_dir, block_events=10)
+
+    found = search_archive_entities(
+        TENANT, [("invoice", "inv-0"), ("invoice", "inv-2"), ("invoice", "nope")], 2, archive_dir=archive_dir,
+    )
+    assert {key: [e.id for e in rows] for key, rows in found.items()} == {
+        ("invoice", "inv-0"): [events[24].id, events[21].id],
+        ("invoice", "inv-2"): [events[23].id, events[20].id],
+        ("invoice", "nope"): [],
+    }
+    found = search_archive(TENANT, entity_type="invoice", entity_id="inv-1", limit=2, archive_dir=archive_dir)
+    assert [e.id for e in found] == [events[22].id, events[19].id]
+
+
+def test_estimate_counts_overlapping_blocks(archive_dir):
+    events = _events(25)
+    write_segment(TENANT, events, archive_dir=archive_dir, block_events=10)
+
+    assert estimate_archived(TENANT, archive_dir=archive_dir) == 25
+    assert estimate_archived(TENANT, start=events[21].timestamp, archive_dir=archive_dir) == 5
+    assert estimate_archived(TENANT, end=BASE - timedelta(days=1), archive_dir=archive_dir) == 0
@@ -0,0 +1,98 @@
+"""Unit tests for the write-behind audit buffer."""
+import time
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services import audit
+from app.services.audit import AuditBuffer, log_event
+
+
+class _RecordingSession:
+    def __init__(self, sink: list, fail: bool = False):
+        self.sink = sink
+        self.fail = fail
+
+    def execute(self, stmt, rows):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.sink.append(list(rows))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def inserted():
+    return []
+
+
+def _buffer(inserted, tmp_path, fail=False, **kwargs) -> AuditBuffer:
+    return AuditBuffer(
+        session_factory=lambda: _RecordingSession(inserted, fail=fail),
+        spool_path=str(tmp_path / "spool.jsonl"),
+        **kwargs,
+    )
+
+
+def test_transactional_events_go_to_session(monkeypatch, inserted, tmp_path):
+    buffer = _buffer(inserted, tmp_path)
+    buffer.start()
+    monkeypatch.setattr(audit, "audit_buffer", buffer)
+    try:
+        db = MagicMock()
+        event = log_event(db, uuid.uuid4(), "INVOICE_APPROVED", entity_type="invoice", entity_id="x")
+        db.add.assert_called_once_with(event)
+    finally:
+        buffer.stop()
+    assert inserted == []
+
+
+def test_non_transactional_events_are_batched(monkeypatch, inserted, tmp_path):
+    buffer = _buffer(inserted, tmp_path, flush_interval_ms=60_000, max_events=3)
+    buffer.start()
+    monkeypatch.setattr(audit, "audit_buffer", buffer)
+    try:
+        db = MagicMock()
+        tenant_id = uuid.uuid4()
+        for _ in range(3):
+            log_event(db, tenant_id, "LOGIN", transactional=False)
+        db.add.assert_not_called()
+
+        deadline = time.time() + 5
+        while not inserted and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(inserted) == 1 and len(inserted[0]) == 3
+        assert {row["action"] for row in inserted[0]} == {"LOGIN"}
+    finally:
+        buffer.stop()
+
+
+def test_stop_flushes_remaining(inserted, tmp_path):
+    buffer = _buffer(inserted, tmp_path, flush_interval_ms=60_000, max_events=100)
+    buffer.start()
+    buffer.enqueue(log_event(MagicMock(), uuid.uuid4(), "LOGIN"))
+    buffer.stop()
+    assert sum(len(batch) for batch in inserted) == 1
+
+
+def test_failed_flush_spools_and_replays(inserted, tmp_path):
+    failing = _buffer([], tmp_path, fail=True)
+    tenant_id = uuid.uuid4()
+    failing.enqueue(log_event(MagicMock(), tenant_id, "LOGIN", metadata={"ip": "10.0.0.1"}))
+    assert failing.flush() == 1
+    assert (tmp_path / "spool.jsonl").exists()
+
+    healthy = _buffer(inserted, tmp_path)
+    assert healthy.replay_spool() == 1
+    assert not (tmp_path / "spool.jsonl").exists()
+    (row,) = inserted[0]
+    assert row["tenant_id"] == tenant_id
+    assert row["metadata_json"] == {"ip": "10.0.0.1"}
@@ -0,0 +1,77 @@
+"""Unit tests for audit_events partition maintenance (month arithmetic and partition selection)."""
+from datetime import date
+from unittest.mock import MagicMock
+
+from app.models.audit_event import DEFAULT_PARTITION
+from app.workers import audit_maintenance
+from app.workers.audit_maintenance import (
+    add_months,
+    detach_expired_partitions,
+    ensure_audit_partitions,
+    partition_name,
+)
+
+
+def _executed_sql(db: MagicMock) -> list[str]:
+    return [str(c.args[0]) for c in db.execute.call_args_list]
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 10, 1), -84) == date(2019, 10, 1)
+
+
+def test_partition_name():
+    assert partition_name(date(2026, 3, 1)) == "audit_events_p202603"
+
+
+def test_ensure_creates_missing_future_months(monkeypatch):
+    monkeypatch.setattr(audit_maintenance, "attached_partitions", lambda db: {
+        "audit_events_p202610": date(2026, 10, 1),
+    })
+    db = MagicMock()
+
+    created = ensure_audit_partitions(db, date(2026, 10, 19), months_ahead=2)
+
+    assert created == ["audit_events_p202611", "audit_events_p202612"]
+    sql = _executed_sql(db)
+    assert "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')" in sql[-1]
+
+
+def test_ensure_moves_stranded_rows_out_of_default(monkeypatch):
+    monkeypatch.setattr(audit_maintenance, "attached_partitions", lambda db: {
+        DEFAULT_PARTITION: None,
+        "audit_events_p202610": date(2026, 10, 1),
+    })
+    db = MagicMock()
+    # DISTINCT months in DEFAULT, then "has rows in range" for the stranded month
+    db.execute.return_value.scalars.return_value.all.return_value = [date(2026, 8, 1)]
+    db.execute.return_value.scalar.return_value = True
+
+    created = ensure_audit_partitions(db, date(2026, 10, 19), months_ahead=0)
+
+    assert created == ["audit_events_p202608"]
+    sql = _executed_sql(db)
+    assert any(f"DETACH PARTITION {DEFAULT_PARTITION}" in s for s in sql)
+    assert any(f"ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT" in s for s in sql)
+
+
+def test_detach_only_partitions_past_retention(monkeypatch):
+    monkeypatch.setattr(audit_maintenance, "attached_partitions", lambda db: {
+        DEFAULT_PARTITION: None,
+        "audit_events_p202608": date(2026, 8, 1),
+        "audit_events_p202609": date(2026, 9, 1),
+        "audit_events_p202610": date(2026, 10, 1),
+    })
+    db = MagicMock()
+
+    detached = detach_expired_partitions(db, date(2026, 10, 19), retention_months=1)
+
+    assert detached == ["audit_events_p202608"]
+
+
+def test_zero_retention_keeps_everything():
+    db = MagicMock()
+    assert detach_expired_partitions(db, date(2026, 10, 19), retention_months=0) == []
+    db.execute.assert_not_called()
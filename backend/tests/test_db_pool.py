@@ -0,0 +1,82 @@
+"""Tests for the instrumented connection pool, per-request query stats and GET /metrics."""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import exc, text
+from starlette.requests import Request
+
+from app.api.deps import require_metrics_client
+from app.core.config import settings
+from app.core.metrics import REQUEST_DB_QUERIES, REQUEST_DB_SECONDS
+from app.db.pool import POOL_HOLD, POOL_IN_USE, POOL_TIMEOUTS, POOL_WAIT, create_pooled_engine
+from tests.conftest import TEST_DB_URL, auth_headers
+
+
+@pytest.fixture()
+def small_pool(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 1)
+    engine = create_pooled_engine(TEST_DB_URL, "test")
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_record_wait_hold_and_timeouts(small_pool):
+    waits_before = POOL_WAIT.labels("test").counts[:]
+    with small_pool.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert POOL_IN_USE.labels("test").value == 1
+        with pytest.raises(exc.TimeoutError):
+            small_pool.connect()
+    assert POOL_IN_USE.labels("test").value == 0
+    assert sum(POOL_WAIT.labels("test").counts) > sum(waits_before)
+    assert POOL_TIMEOUTS.labels("test").value >= 1
+    assert sum(POOL_HOLD.labels("test", "background").counts) >= 1
+
+    small_pool.dispose()
+    assert small_pool.pool.name == "test"
+
+
+@pytest.fixture()
+def any_scraper(monkeypatch):
+    # The test client's address is "testclient", which no network contains
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_NETWORKS", [])
+
+
+def test_metrics_endpoint_serves_pool_series(client, small_pool, any_scraper):
+    with small_pool.connect():
+        pass
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'db_pool_connections_in_use{pool="test"} 0' in resp.text
+    assert 'db_pool_connection_hold_seconds_count{pool="test",route="background"}' in resp.text
+
+
+def test_requests_record_their_statements_per_route(client, admin_user, any_scraper):
+    queries = REQUEST_DB_QUERIES.labels("/api/invoices")
+    seconds = REQUEST_DB_SECONDS.labels("/api/invoices")
+    count_before, sum_before = sum(queries.counts), queries.sum
+
+    assert client.get("/api/invoices", headers=auth_headers(admin_user)).status_code == 200
+    assert sum(queries.counts) == count_before + 1
+    # At least the user lookup and the page query
+    assert queries.sum - sum_before >= 2
+    assert seconds.sum > 0
+
+    text = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/invoices",status="200"}' in text
+    assert "ingestion_invoices_created_total" in text
+
+
+def test_metrics_only_for_allowed_client_networks(client, monkeypatch):
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_NETWORKS", ["10.0.0.0/8"])
+    for host, allowed in (("10.1.2.3", True), ("203.0.113.9", False), ("::1", False)):
+        request = Request({"type": "http", "client": (host, 40000)})
+        if allowed:
+            require_metrics_client(request)
+        else:
+            with pytest.raises(HTTPException):
+                require_metrics_client(request)
@@ -1,14 +1,24 @@
 """Unit tests for email_poller robustness against MailHog edge cases."""
 import base64
+import binascii
+import hashlib
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from app.workers.email_poller import (
-    _extract_attachments,
+    DECODE_CHUNK_CHARS,
+    INGESTION_BYTES,
+    INGESTION_EMAILS,
+    INGESTION_INVOICES,
+    INGESTION_POST_COMMIT_ERRORS,
+    INGESTION_RUNS,
+    SavedAttachment,
     _extract_email_metadata,
     _extract_to_address,
     _find_tenant_by_inbound,
+    _parse_messages,
+    _stream_attachments_to_disk,
     poll_and_ingest,
 )
 
@@ -138,31 +148,156 @@ class TestExtractToAddress:
         assert addr == "acme"
 
 
-# ── _extract_attachments tests ─────────────────────────────────────────────────
+# ── _stream_attachments_to_disk tests ─────────────────────────────────────────
 
-class TestExtractAttachments:
-    def test_mime_null_uses_raw_data(self):
-        """When MIME is None, should parse Raw.Data and find the PDF attachment."""
-        attachments = _extract_attachments(SAMPLE_MSG_MIME_NULL)
-        assert len(attachments) == 1
-        filename, content = attachments[0]
-        assert filename == "inv.pdf"
-        assert b"%PDF-1.4" in content
+SAMPLE_MSG_NESTED_MULTIPART = {
+    "ID": "msg-005",
+    "MIME": None,
+    "Raw": {
+        "Data": (
+            "From: sender@example.com\r\n"
+            "Subject: Two invoices\r\n"
+            'Content-Type: multipart/mixed; boundary="outer"\r\n'
+            "\r\n"
+            "preamble\r\n"
+            "--outer\r\n"
+            'Content-Type: multipart/alternative; boundary="inner"\r\n'
+            "\r\n"
+            "--inner\r\n"
+            "Content-Type: text/plain\r\n"
+            "\r\n"
+            "Please find attached.\r\n"
+            "--inner--\r\n"
+            "--outer\r\n"
+            'Content-Type: application/pdf; name="a.pdf"\r\n'
+            'Content-Disposition: attachment; filename="a.pdf"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+            + base64.encodebytes(b"%PDF-1.4 first").decode().replace("\n", "\r\n")
+            + "--outer\r\n"
+            'Content-Type: text/csv\r\n'
+            'Content-Disposition: attachment; filename="b.csv"\r\n'
+            "\r\n"
+            "a,b\r\n"
+            "1,2\r\n"
+            "--outer--\r\n"
+            "epilogue\r\n"
+        )
+    },
+}
 
-    def test_mime_null_no_attachments(self):
-        """Plain text email with MIME=None should return no attachments."""
-        attachments = _extract_attachments(SAMPLE_MSG_MIME_NULL_NO_ATTACH)
-        assert attachments == []
+
+class TestStreamAttachmentsToDisk:
+    @pytest.fixture(autouse=True)
+    def _upload_dir(self, tmp_path, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+
+    def test_single_part_raw_data(self):
+        saved = _stream_attachments_to_disk(SAMPLE_MSG_MIME_NULL, tenant_id="t1", message_id="msg-001")
+        assert len(saved) == 1
+        assert saved[0].filename == "inv.pdf"
+        with open(saved[0].file_path, "rb") as f:
+            content = f.read()
+        assert content == b"%PDF-1.4 fake pdf content"
+        assert saved[0].size_bytes == len(content)
+        assert saved[0].sha256 == hashlib.sha256(content).hexdigest()
+        assert "/t1/msg-001/" in saved[0].file_path
 
     def test_normal_mime_parts(self):
         """When MIME parts exist, should use them directly."""
-        attachments = _extract_attachments(SAMPLE_MSG_WITH_MIME_PARTS)
-        assert len(attachments) == 1
-        assert attachments[0][0] == "report.pdf"
+        saved = _stream_attachments_to_disk(SAMPLE_MSG_WITH_MIME_PARTS, tenant_id="t1", message_id="msg-004")
+        assert [s.filename for s in saved] == ["report.pdf"]
+        with open(saved[0].file_path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 real pdf"
+
+    def test_nested_multipart(self):
+        saved = _stream_attachments_to_disk(SAMPLE_MSG_NESTED_MULTIPART, tenant_id="t1", message_id="msg-005")
+        assert [s.filename for s in saved] == ["a.pdf", "b.csv"]
+        for attachment, payload in zip(saved, [b"%PDF-1.4 first", b"a,b\r\n1,2"]):
+            with open(attachment.file_path, "rb") as f:
+                assert f.read() == payload
+
+    def test_mime_parts_decoded_across_chunks(self):
+        payload = bytes(range(256)) * (DECODE_CHUNK_CHARS // 100)
+        msg = {
+            "ID": "msg-big",
+            "MIME": {
+                "Parts": [{
+                    "Headers": {
+                        "Content-Type": ["application/pdf"],
+                        "Content-Disposition": ['attachment; filename="big.pdf"'],
+                        "Content-Transfer-Encoding": ["base64"],
+                    },
+                    "Body": base64.encodebytes(payload).decode(),
+                }]
+            },
+        }
+        saved = _stream_attachments_to_disk(msg, tenant_id="t1", message_id="msg-big")
+        assert len(saved) == 1
+        with open(saved[0].file_path, "rb") as f:
+            assert f.read() == payload
+        assert saved[0].sha256 == hashlib.sha256(payload).hexdigest()
+
+    @pytest.mark.parametrize("offset", [1, 2, 3])
+    def test_quoted_printable_escape_across_chunks(self, offset):
+        # An =XX escape ("=3D") or soft line break ("=\r\n") cut by the DECODE_CHUNK_CHARS slicing
+        long_line = "a" * (DECODE_CHUNK_CHARS - offset) + "=3D" + "b" * 10
+        wrapped = "c" * (DECODE_CHUNK_CHARS - offset) + "=\r\n" + "d=3De\r\n"
+        for body in (long_line, wrapped):
+            msg = {
+                "ID": "msg-qp",
+                "MIME": {
+                    "Parts": [{
+                        "Headers": {
+                            "Content-Disposition": ['attachment; filename="qp.txt"'],
+                            "Content-Transfer-Encoding": ["quoted-printable"],
+                        },
+                        "Body": body,
+                    }]
+                },
+            }
+            saved = _stream_attachments_to_disk(msg, tenant_id="t1", message_id="msg-qp")
+            with open(saved[0].file_path, "rb") as f:
+                assert f.read() == binascii.a2b_qp(body.encode())
 
-    def test_completely_empty_message(self):
-        attachments = _extract_attachments({"MIME": None, "Raw": None})
-        assert attachments == []
+    def test_mime_parts_without_attachment_fall_back_to_raw_data(self):
+        msg = {
+            **SAMPLE_MSG_MIME_NULL,
+            "MIME": {"Parts": [{"Headers": {"Content-Type": ["text/plain"]}, "Body": "See attached."}]},
+        }
+        saved = _stream_attachments_to_disk(msg, tenant_id="t1", message_id="msg-001")
+        assert [s.filename for s in saved] == ["inv.pdf"]
+        with open(saved[0].file_path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 fake pdf content"
+
+    def test_no_attachments(self):
+        assert _stream_attachments_to_disk(SAMPLE_MSG_MIME_NULL_NO_ATTACH, tenant_id="t1", message_id="m") == []
+        assert _stream_attachments_to_disk({"MIME": None, "Raw": None}, tenant_id="t1", message_id="m") == []
+
+
+class TestParseMessages:
+    def test_process_pool_returns_paths_not_bytes(self, tmp_path, monkeypatch):
+        from app.core.config import settings
+        from app.workers.pool import shutdown_process_pools
+
+        # Spawned workers build their own Settings from the environment
+        monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "EMAIL_PARSE_WORKERS", 2)
+        try:
+            results = _parse_messages([(SAMPLE_MSG_MIME_NULL, "t1"), ({"ID": "bad", "MIME": {"Parts": ["not-a-part"]}}, "t1")])
+        finally:
+            shutdown_process_pools()
+
+        parsed, failed = results
+        assert parsed.email_meta["email_from"] == ""
+        assert len(parsed.attachments) == 1
+        assert parsed.attachments[0].file_path.startswith(str(tmp_path))
+        with open(parsed.attachments[0].file_path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 fake pdf content"
+        assert isinstance(failed, Exception)
 
 
 # ── _extract_email_metadata tests ─────────────────────────────────────────────
@@ -188,6 +323,12 @@ class TestExtractEmailMetadata:
         meta = _extract_email_metadata({})
         assert meta["email_from"] == ""
         assert meta["email_subject"] == ""
+        assert meta["email_date"] is None
+
+    def test_date_header_parsed(self):
+        msg = {"Content": {"Headers": {"Date": ["Mon, 19 Oct 2026 09:30:00 +0400"]}}}
+        meta = _extract_email_metadata(msg)
+        assert meta["email_date"].isoformat() == "2026-10-19T09:30:00+04:00"
 
     def test_from_with_empty_domain(self):
         msg = {"From": {"Mailbox": "local", "Domain": ""}, "Content": {"Headers": {}}}
@@ -200,16 +341,18 @@ class TestExtractEmailMetadata:
 class TestPollAndIngest:
     """Tests that poll_and_ingest handles MIME-null messages without crashing."""
 
-    @patch("app.workers.email_poller.validate_invoice", return_value=[])
-    @patch("app.workers.email_poller._save_attachment", return_value="/tmp/fake.pdf")
+    @patch("app.workers.email_poller.validate_many", return_value=[])
+    @patch(
+        "app.workers.email_poller._stream_attachments_to_disk",
+        return_value=[SavedAttachment("inv.pdf", "/tmp/fake.pdf", 25, "0" * 64)],
+    )
     @patch("app.workers.email_poller.SessionLocal")
-    @patch("app.workers.email_poller.MailHogProvider")
+    @patch("app.workers.email_poller.get_inbound_provider")
     def test_mime_null_no_crash(self, MockProvider, MockSession, mock_save, mock_validate):
         """Feed a MIME-null message and verify no crash + correct counters."""
         # Set up mocks
         provider_inst = MagicMock()
-        provider_inst.fetch_messages.return_value = [SAMPLE_MSG_MIME_NULL]
-        provider_inst.delete_message = MagicMock()
+        provider_inst.fetch_batch.return_value = [SAMPLE_MSG_MIME_NULL]
         MockProvider.return_value = provider_inst
 
         db = MagicMock()
@@ -229,10 +372,13 @@ class TestPollAndIngest:
                     obj.id = "inv-uuid-1"
         db.flush.side_effect = on_flush
 
+        invoices_before = INGESTION_INVOICES.labels().value
+        bytes_before = INGESTION_BYTES.labels().value
+
         poll_and_ingest()
 
-        # Should not crash, should commit
-        db.commit.assert_called_once()
+        # Should not crash: one commit for the run, one for post-commit stage timings
+        assert db.commit.call_count == 2
         db.close.assert_called_once()
 
         # Check that the IngestionRun was added with correct counters
@@ -243,6 +389,10 @@ class TestPollAndIngest:
         assert run_obj.emails_processed == 1
         assert run_obj.failures_count == 0
         assert run_obj.status == "SUCCESS"
+        assert run_obj.bytes_ingested == 25
+        assert run_obj.fetch_ms >= 0 and run_obj.flush_ms >= 0
+        assert INGESTION_INVOICES.labels().value == invoices_before + 1
+        assert INGESTION_BYTES.labels().value == bytes_before + 25
 
         # Verify the Invoice object has email metadata
         invoice_obj = None
@@ -255,18 +405,18 @@ class TestPollAndIngest:
         assert invoice_obj.attachment_count == 1
         assert invoice_obj.source_message_id == "msg-001"
 
-        # Verify _save_attachment was called with tenant-scoped args
+        # Verify attachments were streamed with tenant-scoped args
         mock_save.assert_called_once()
         save_kwargs = mock_save.call_args
         assert save_kwargs[1]["tenant_id"] == "tenant-uuid-1"
         assert save_kwargs[1]["message_id"] == "msg-001"
 
     @patch("app.workers.email_poller.SessionLocal")
-    @patch("app.workers.email_poller.MailHogProvider")
+    @patch("app.workers.email_poller.get_inbound_provider")
     def test_no_tenant_increments_failure(self, MockProvider, MockSession):
         """Message with unknown tenant should increment failure, not crash."""
         provider_inst = MagicMock()
-        provider_inst.fetch_messages.return_value = [SAMPLE_MSG_NO_TENANT]
+        provider_inst.fetch_batch.return_value = [SAMPLE_MSG_NO_TENANT]
         MockProvider.return_value = provider_inst
 
         db = MagicMock()
@@ -275,17 +425,70 @@ class TestPollAndIngest:
 
         poll_and_ingest()
 
-        db.commit.assert_called_once()
+        assert db.commit.call_count == 2
         run_obj = db.add.call_args_list[-1][0][0]
         assert run_obj.failures_count == 1
+        assert run_obj.retries_count == 0
         assert run_obj.status == "FAIL"
+        # Unroutable mail is quarantined, not put back to be fetched again every poll
+        provider_inst.ack.assert_called_once_with([])
+        provider_inst.nack.assert_called_once_with([])
+        provider_inst.reject.assert_called_once_with(["msg-003"])
 
     @patch("app.workers.email_poller.SessionLocal")
-    @patch("app.workers.email_poller.MailHogProvider")
+    @patch("app.workers.email_poller.get_inbound_provider")
+    def test_failed_ack_keeps_the_committed_run(self, MockProvider, MockSession):
+        provider_inst = MagicMock()
+        provider_inst.fetch_batch.return_value = [SAMPLE_MSG_REAL_MAILHOG]
+        provider_inst.ack.side_effect = ConnectionError("provider down")
+        MockProvider.return_value = provider_inst
+        db = MagicMock()
+        MockSession.return_value = db
+        db.query.return_value.filter.return_value.first.return_value = MagicMock(id="tenant-acme-uuid")
+        counters = [INGESTION_RUNS.labels("SUCCESS"), INGESTION_RUNS.labels("FAIL"),
+                    INGESTION_EMAILS.labels("processed"), INGESTION_EMAILS.labels("retried"),
+                    INGESTION_POST_COMMIT_ERRORS.labels("ack")]
+        before = [c.value for c in counters]
+
+        poll_and_ingest()
+
+        # The run is committed before the ack: it stays SUCCESS, counted once, and nothing is nacked
+        assert [c.value - b for c, b in zip(counters, before)] == [1, 0, 1, 0, 1]
+        run_obj = db.add.call_args_list[-1][0][0]
+        assert run_obj.status == "SUCCESS"
+        db.rollback.assert_not_called()
+        provider_inst.nack.assert_called_once_with([])
+        provider_inst.reject.assert_called_once_with([])
+
+    @patch("app.workers.email_poller._stream_attachments_to_disk", side_effect=ValueError("undecodable"))
+    @patch("app.workers.email_poller.SessionLocal")
+    @patch("app.workers.email_poller.get_inbound_provider")
+    def test_poison_message_is_rejected_after_max_attempts(self, MockProvider, MockSession, mock_save, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "INGESTION_MAX_ATTEMPTS", 3)
+        poison = {**SAMPLE_MSG_MIME_NULL, "ID": "msg-poison"}
+        provider_inst = MagicMock()
+        provider_inst.fetch_batch.return_value = [poison]
+        MockProvider.return_value = provider_inst
+        db = MagicMock()
+        MockSession.return_value = db
+        db.query.return_value.filter.return_value.first.return_value = MagicMock(id="tenant-uuid-1")
+
+        for _ in range(3):
+            poll_and_ingest()
+
+        nacks = [c.args[0] for c in provider_inst.nack.call_args_list]
+        rejects = [c.args[0] for c in provider_inst.reject.call_args_list]
+        assert nacks == [["msg-poison"], ["msg-poison"], []]
+        assert rejects == [[], [], ["msg-poison"]]
+
+    @patch("app.workers.email_poller.SessionLocal")
+    @patch("app.workers.email_poller.get_inbound_provider")
     def test_mixed_success_and_failure(self, MockProvider, MockSession):
         """Mix of valid and invalid messages: partial success, no crash."""
         provider_inst = MagicMock()
-        provider_inst.fetch_messages.return_value = [
+        provider_inst.fetch_batch.return_value = [
             SAMPLE_MSG_NO_TENANT,   # will fail (no tenant)
             SAMPLE_MSG_MIME_NULL_NO_ATTACH,  # will succeed but no attachment
         ]
@@ -301,22 +504,21 @@ class TestPollAndIngest:
 
         poll_and_ingest()
 
-        db.commit.assert_called_once()
+        assert db.commit.call_count == 2
         run_obj = db.add.call_args_list[-1][0][0]
         assert run_obj.failures_count == 1
         assert run_obj.emails_processed == 1  # the no-attachment msg was processed
         assert run_obj.status == "FAIL"  # 1 failure, 0 invoices → FAIL
 
     @patch("app.workers.email_poller.SessionLocal")
-    @patch("app.workers.email_poller.MailHogProvider")
+    @patch("app.workers.email_poller.get_inbound_provider")
     def test_real_mailhog_alias_only_no_crash(self, MockProvider, MockSession):
         """Regression: exact MailHog payload (MIME null, alias-only To, no attachment).
 
         Must NOT crash. Tenant 'acme' found → emails_processed=1, failures=0.
         """
         provider_inst = MagicMock()
-        provider_inst.fetch_messages.return_value = [SAMPLE_MSG_REAL_MAILHOG]
-        provider_inst.delete_message = MagicMock()
+        provider_inst.fetch_batch.return_value = [SAMPLE_MSG_REAL_MAILHOG]
         MockProvider.return_value = provider_inst
 
         db = MagicMock()
@@ -329,7 +531,7 @@ class TestPollAndIngest:
         poll_and_ingest()
 
         # Must not crash
-        db.commit.assert_called_once()
+        assert db.commit.call_count == 2
         db.close.assert_called_once()
 
         run_obj = db.add.call_args_list[-1][0][0]
@@ -338,5 +540,96 @@ class TestPollAndIngest:
         assert run_obj.failures_count == 0
         assert run_obj.invoices_created == 0  # no attachment in this message
         assert run_obj.status == "SUCCESS"
-        # Message should have been deleted from MailHog
-        provider_inst.delete_message.assert_called_once_with("real-mailhog-001@mailhog.example")
+        # Message should have been acknowledged (deleted from MailHog) after commit
+        provider_inst.ack.assert_called_once_with(["real-mailhog-001@mailhog.example"])
+        provider_inst.nack.assert_called_once_with([])
+
+
+def test_failed_message_drops_the_invoices_it_already_flushed(db, tenant, tmp_path, monkeypatch):
+    from app.models.invoice import Invoice
+    from app.workers import email_poller
+
+    monkeypatch.setattr(email_poller, "_failed_attempts", {})
+    messages = [
+        {"ID": msg_id, "To": [{"Mailbox": "testcorp", "Domain": ""}], "Content": {"Headers": {}}}
+        for msg_id in ("msg-a", "msg-b")
+    ]
+    files = {}
+    for name in ("a1.pdf", "a2.pdf", "b1.pdf"):
+        files[name] = tmp_path / name
+        files[name].write_bytes(b"%PDF-1.4 " + name.encode())
+    saved = {
+        msg_id: [SavedAttachment(name, str(files[name]), 12, "0" * 64) for name in names]
+        for msg_id, names in (("msg-a", ["a1.pdf", "a2.pdf"]), ("msg-b", ["b1.pdf"]))
+    }
+    log_event = email_poller.log_event
+    calls = []
+
+    def flaky_log_event(*args, **kwargs):
+        # The second attachment of msg-a fails after its first invoice was flushed
+        calls.append(kwargs["metadata"]["filename"])
+        if len(calls) == 2:
+            raise RuntimeError("audit write failed")
+        return log_event(*args, **kwargs)
+
+    provider = MagicMock()
+    provider.name = "MAILDIR"
+    provider.fetch_batch.return_value = messages
+    with (
+        patch("app.workers.email_poller.get_inbound_provider", return_value=provider),
+        patch("app.workers.email_poller.SessionLocal", return_value=db),
+        patch(
+            "app.workers.email_poller._stream_attachments_to_disk",
+            side_effect=lambda msg, tenant_id, message_id: saved[message_id],
+        ),
+        patch("app.workers.email_poller.log_event", side_effect=flaky_log_event),
+    ):
+        poll_and_ingest()
+
+    assert [inv.original_filename for inv in db.query(Invoice).all()] == ["b1.pdf"]
+    provider.ack.assert_called_once_with(["msg-b"])
+    provider.nack.assert_called_once_with(["msg-a"])
+    assert not files["a1.pdf"].exists() and not files["a2.pdf"].exists()
+    assert files["b1.pdf"].exists()
+
+
+def test_batch_is_flushed_and_validated_once(db, tenant, query_budget, monkeypatch):
+    from app.core.config import settings
+    from app.models.invoice import Invoice
+    from app.models.invoice_exception import InvoiceException
+
+    monkeypatch.setattr(settings, "FIELD_EXTRACTION_ENABLED", False)
+    messages = [
+        {"ID": f"msg-{i}", "To": [{"Mailbox": "testcorp", "Domain": ""}], "Content": {"Headers": {}}}
+        for i in range(3)
+    ]
+    provider = MagicMock()
+    provider.name = "MAILDIR"
+    provider.fetch_batch.return_value = messages
+    with (
+        patch("app.workers.email_poller.get_inbound_provider", return_value=provider),
+        patch("app.workers.email_poller.SessionLocal", return_value=db),
+        patch(
+            "app.workers.email_poller._stream_attachments_to_disk",
+            side_effect=lambda msg, tenant_id, message_id: [
+                SavedAttachment(f"{message_id}-{n}.pdf", f"/tmp/{message_id}-{n}.pdf", 10, f"{message_id}-{n}")
+                for n in range(2)
+            ],
+        ),
+        query_budget(100) as profile,
+    ):
+        poll_and_ingest()
+
+    def executed(prefix: str) -> int:
+        return sum(count for shape, (count, _) in profile.shapes.items() if shape.startswith(prefix))
+
+    # Six invoices from three messages: one INSERT, one bulk exception insert, one status UPDATE
+    assert executed("INSERT INTO invoices ") == 1
+    assert executed("INSERT INTO invoice_exceptions ") == 1
+    assert executed("UPDATE invoices ") == 1
+    invoices = db.query(Invoice).all()
+    assert len(invoices) == 6
+    # Email invoices have no vendor, number, date or amount yet, so every one is flagged
+    assert {inv.status for inv in invoices} == {"VALIDATED"}
+    assert db.query(InvoiceException).count() >= 6
+    provider.ack.assert_called_once_with(["msg-0", "msg-1", "msg-2"])
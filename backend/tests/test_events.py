@@ -0,0 +1,85 @@
+"""Unit tests for the in-process SSE broadcast hub and its session listeners."""
+import asyncio
+import threading
+import uuid
+from types import SimpleNamespace
+
+from app.models.audit_event import AuditEvent
+from app.models.invoice import Invoice
+from app.services import events
+from app.services.events import AUDIT_EVENT, INVOICE_EVENT, EventHub
+
+TENANT = uuid.uuid4()
+
+
+def test_publish_from_another_thread_reaches_subscriber():
+    hub = EventHub(buffer_size=10)
+
+    async def scenario():
+        sub = hub.subscribe(TENANT, [AUDIT_EVENT])
+        thread = threading.Thread(target=hub.publish, args=(TENANT, AUDIT_EVENT, {"action": "LOGIN"}))
+        thread.start()
+        thread.join()
+        message = await sub.get(timeout=1)
+        hub.unsubscribe(sub)
+        return message
+
+    _, topic, data = asyncio.run(scenario())
+    assert (topic, data) == (AUDIT_EVENT, {"action": "LOGIN"})
+    assert hub.subscriber_count() == 0
+
+
+def test_topics_and_tenants_are_isolated():
+    hub = EventHub(buffer_size=10)
+
+    async def scenario():
+        sub = hub.subscribe(TENANT, [INVOICE_EVENT])
+        hub.publish(TENANT, AUDIT_EVENT, {"action": "LOGIN"})
+        hub.publish(uuid.uuid4(), INVOICE_EVENT, {"status": "PAID"})
+        await asyncio.sleep(0)
+        return await sub.get(timeout=0.05)
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_slow_subscriber_drops_oldest():
+    hub = EventHub(buffer_size=3)
+
+    async def scenario():
+        sub = hub.subscribe(TENANT, [AUDIT_EVENT])
+        for i in range(5):
+            hub.publish(TENANT, AUDIT_EVENT, {"n": i})
+        await asyncio.sleep(0)
+        received = [(await sub.get(timeout=1))[2]["n"] for _ in range(3)]
+        return received, sub.dropped
+
+    received, dropped = asyncio.run(scenario())
+    assert received == [2, 3, 4]
+    assert dropped == 2
+
+
+def test_changes_publish_only_after_commit(monkeypatch):
+    published = []
+    monkeypatch.setattr(events.hub, "publish", lambda *args: published.append(args))
+    audit = AuditEvent(id=uuid.uuid4(), tenant_id=TENANT, action="INVOICE_UPLOADED", entity_type="invoice")
+    invoice = Invoice(id=uuid.uuid4(), tenant_id=TENANT, status="NEW", vendor="V", invoice_number="1", source="UPLOAD")
+    session = SimpleNamespace(new=[audit, invoice], dirty=[], info={})
+
+    events._collect_changes(session, None)
+    assert published == []
+    events._publish_changes(session)
+    assert [(topic, data.get("action") or data.get("status")) for _, topic, data in published] == [
+        (AUDIT_EVENT, "INVOICE_UPLOADED"),
+        (INVOICE_EVENT, "NEW"),
+    ]
+
+
+def test_rollback_discards_pending_changes(monkeypatch):
+    published = []
+    monkeypatch.setattr(events.hub, "publish", lambda *args: published.append(args))
+    session = SimpleNamespace(new=[AuditEvent(id=uuid.uuid4(), tenant_id=TENANT, action="X")], dirty=[], info={})
+
+    events._collect_changes(session, None)
+    events._discard_changes(session)
+    events._publish_changes(session)
+    assert published == []
@@ -0,0 +1,71 @@
+"""Tests for the trigger-maintained exception counters and bulk resolve."""
+from datetime import UTC, datetime
+
+from app.models.exception_stats import TenantExceptionStats
+from app.models.invoice import Invoice
+from app.models.invoice_exception import InvoiceException
+from tests.conftest import auth_headers
+
+
+def _flagged(db, tenant, *codes, status="VALIDATED"):
+    inv = Invoice(tenant_id=tenant.id, vendor="V", invoice_number="N", status=status)
+    db.add(inv)
+    db.flush()
+    for code in codes:
+        db.add(InvoiceException(tenant_id=tenant.id, invoice_id=inv.id, code=code, message=code))
+    db.flush()
+    return inv
+
+
+def test_counters_follow_insert_resolve_and_delete(db, tenant):
+    inv = _flagged(db, tenant, "MISSING_DATE", "MISSING_AMOUNT")
+    other = _flagged(db, tenant, "MISSING_DATE")
+    db.refresh(inv)
+    assert (inv.exception_count, inv.open_exception_count) == (2, 2)
+    stats = db.get(TenantExceptionStats, tenant.id)
+    db.refresh(stats)
+    assert (stats.total_exceptions, stats.open_exceptions) == (3, 3)
+    assert (stats.invoices_with_exceptions, stats.invoices_with_open_exceptions) == (2, 2)
+
+    db.query(InvoiceException).filter(InvoiceException.invoice_id == inv.id).update(
+        {InvoiceException.resolved_at: datetime.now(UTC)}, synchronize_session=False,
+    )
+    db.query(InvoiceException).filter(InvoiceException.invoice_id == other.id).delete(synchronize_session=False)
+    db.refresh(inv)
+    db.refresh(other)
+    db.refresh(stats)
+    assert (inv.exception_count, inv.open_exception_count) == (2, 0)
+    assert (other.exception_count, other.open_exception_count) == (0, 0)
+    assert (stats.total_exceptions, stats.open_exceptions) == (2, 0)
+    assert (stats.invoices_with_exceptions, stats.invoices_with_open_exceptions) == (1, 0)
+
+
+def test_bulk_resolve_moves_cleared_invoices_to_approval_pending(client, approver_user, db, tenant):
+    cleared = _flagged(db, tenant, "DUPLICATE_INVOICE")
+    still_flagged = _flagged(db, tenant, "DUPLICATE_INVOICE", "MISSING_DATE")
+    approved = _flagged(db, tenant, "DUPLICATE_INVOICE", status="APPROVED")
+
+    resp = client.post(
+        "/api/invoices/exceptions/resolve",
+        json={"invoice_ids": [str(cleared.id), str(still_flagged.id), str(approved.id)], "code": "duplicate_invoice"},
+        headers=auth_headers(approver_user),
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"resolved": 3, "invoices": 3}
+
+    for inv in (cleared, still_flagged, approved):
+        db.refresh(inv)
+    assert (cleared.status, cleared.open_exception_count) == ("APPROVAL_PENDING", 0)
+    assert (still_flagged.status, still_flagged.open_exception_count) == ("VALIDATED", 1)
+    assert approved.status == "APPROVED"
+    assert db.get(TenantExceptionStats, tenant.id).open_exceptions == 1
+
+    again = client.post(
+        "/api/invoices/exceptions/resolve", json={"invoice_ids": [str(cleared.id)]}, headers=auth_headers(approver_user),
+    )
+    assert again.json() == {"resolved": 0, "invoices": 0}
+
+
+def test_bulk_resolve_requires_a_target(client, approver_user):
+    resp = client.post("/api/invoices/exceptions/resolve", json={"code": "MISSING_DATE"}, headers=auth_headers(approver_user))
+    assert resp.status_code == 422
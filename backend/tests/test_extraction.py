@@ -0,0 +1,85 @@
+"""Unit tests for rule-based invoice field extraction (no database needed)."""
+import uuid
+from datetime import date
+
+from app.models.invoice import Invoice
+from app.services.extraction import GENERIC_KEY, extract_fields, learn_template, sender_domain
+from app.services.template_store import TemplateStore, normalize_vendor
+from app.workers.field_extractor import apply_fields
+
+GULF_INVOICE = """Gulf Office Supplies LLC
+TAX INVOICE
+Bill Ref: GOS-2231
+Invoice Date: 03/04/2026
+Due Date: 03/05/2026
+Chairs 4 AED 1,000.00
+Subtotal 1,000.00
+VAT 5% 50.00
+Grand Total: AED 1,050.00"""
+
+
+def test_generic_rules_read_labelled_fields():
+    result = extract_fields(GULF_INVOICE.replace("Bill Ref", "Invoice No"), "Billing <billing@gulfoffice.ae>")
+
+    assert result.template_key == GENERIC_KEY
+    assert result.fields == {
+        "vendor": "Gulf Office Supplies LLC",
+        "invoice_number": "GOS-2231",
+        "invoice_date": date(2026, 4, 3),  # day first, and not the due date
+        "amount": 1050.0,  # the grand total, not a line item or the subtotal
+        "currency": "AED",
+    }
+
+
+def test_learned_template_reads_later_invoices_from_the_sender():
+    first = extract_fields(GULF_INVOICE, "billing@gulfoffice.ae")
+    assert first.fields["invoice_number"] is None  # "Bill Ref" is not a generic label
+    template = learn_template("gulfoffice.ae", first)
+    assert "invoice_number" not in template.patterns
+
+    later = extract_fields(GULF_INVOICE.replace("Gulf Office Supplies LLC\n", ""), template=template)
+    assert later.template_key == "gulfoffice.ae"
+    assert later.fields["vendor"] == "Gulf Office Supplies LLC"  # kept as a constant for the sender
+    assert later.fields["amount"] == 1050.0
+
+
+def test_full_template_hit_skips_generic_rules():
+    template = learn_template("gulfoffice.ae", extract_fields(GULF_INVOICE.replace("Bill Ref", "Invoice No")))
+    assert template.positions == {"invoice_number": 2, "invoice_date": 3, "amount": 8}
+
+    # Label moved one line down: still found by the windowed search
+    hit = extract_fields(GULF_INVOICE.replace("Bill Ref", "Ref\nInvoice No"), template=template)
+    assert not hit.used_generic and not hit.labels
+    assert hit.fields["invoice_number"] == "GOS-2231"
+
+    # New layout: the generic rules fill what the template missed
+    miss = extract_fields(GULF_INVOICE.replace("Grand Total", "Amount Due"), template=template)
+    assert miss.used_generic and miss.fields["amount"] == 1050.0
+
+
+def test_template_keys_normalize_vendor():
+    tenant_id = uuid.uuid4()
+    assert normalize_vendor("  Gulf Office-Supplies, LLC ") == "gulf office supplies llc"
+    assert TemplateStore.candidates(tenant_id, "gulfoffice.ae", "Gulf LLC") == [
+        (tenant_id, "gulfoffice.ae", "gulf llc"), (tenant_id, "gulfoffice.ae", ""), (tenant_id, "", "gulf llc"),
+    ]
+    assert TemplateStore.candidates(tenant_id, None, "") == []
+
+
+def test_learning_needs_more_than_one_field():
+    assert learn_template("x.example", extract_fields("Grand Total: 10.00")) is None
+
+
+def test_sender_domain():
+    assert sender_domain("Gulf Billing <Billing@GulfOffice.ae>") == "gulfoffice.ae"
+    assert sender_domain(None) is None
+    assert sender_domain("not an address") is None
+
+
+def test_apply_fields_never_overwrites_entered_values():
+    inv = Invoice(vendor="Typed By Hand", invoice_number="", invoice_date=None, amount=None, currency="USD")
+    filled = apply_fields(inv, extract_fields(GULF_INVOICE.replace("Bill Ref", "Invoice No")).fields)
+
+    assert inv.vendor == "Typed By Hand"
+    assert (inv.invoice_number, inv.amount, inv.currency) == ("GOS-2231", 1050.0, "AED")
+    assert filled == ["invoice_number", "invoice_date", "amount", "currency"]
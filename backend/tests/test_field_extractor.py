@@ -0,0 +1,70 @@
+"""Tests for the NEW -> EXTRACTED -> VALIDATED extraction stage."""
+import pytest
+
+from app.models.audit_event import AuditEvent
+from app.models.extraction_template import ExtractionTemplate
+from app.models.invoice import Invoice
+from app.models.invoice_text import InvoiceText
+from app.services.template_store import template_store
+from app.workers.field_extractor import extract_batch, validate_extracted
+from tests.test_pdf_text import _write_pdf
+
+
+@pytest.fixture(autouse=True)
+def _fresh_template_cache():
+    # Each test's rows are rolled back, so cached templates must not outlive it
+    template_store.clear()
+    yield
+    template_store.clear()
+
+
+def test_extraction_fills_fields_then_validates(db, tenant, tmp_path):
+    path = tmp_path / "inv.pdf"
+    _write_pdf(path, ["Gulf Office Supplies LLC", "Invoice No: GOS-2231", "Invoice Date: 03/04/2026",
+                      "Grand Total: AED 1,050.00"])
+    inv = Invoice(tenant_id=tenant.id, file_path=str(path), source="EMAIL", status="NEW",
+                  email_from="billing@gulfoffice.ae")
+    unreadable = Invoice(tenant_id=tenant.id, file_path=str(tmp_path / "missing.pdf"), source="EMAIL", status="NEW")
+    db.add_all([inv, unreadable])
+    db.flush()
+
+    assert extract_batch(db, 10) == 2
+    assert inv.status == unreadable.status == "EXTRACTED"
+    assert (inv.vendor, inv.invoice_number, float(inv.amount)) == ("Gulf Office Supplies LLC", "GOS-2231", 1050.0)
+    assert db.get(InvoiceText, inv.id).content.startswith("Gulf Office Supplies LLC")
+    db.flush()
+    assert db.query(AuditEvent).filter_by(action="INVOICE_AUTO_EXTRACTED").count() == 2
+
+    assert validate_extracted(db, 10) == 2
+    db.flush()
+    db.expire_all()
+    assert inv.status == "APPROVAL_PENDING"
+    assert unreadable.status == "VALIDATED"
+    assert {e.code for e in unreadable.exceptions} >= {"MISSING_VENDOR", "MISSING_AMOUNT"}
+
+
+def test_learned_template_is_stored_and_reused(db, tenant, tmp_path):
+    def email_invoice(number):
+        path = tmp_path / f"{number}.pdf"
+        _write_pdf(path, ["Pearl Trading LLC", f"Bill Ref: {number}", "Invoice Date: 03/04/2026",
+                          "Amount Due: AED 99.00"])
+        inv = Invoice(tenant_id=tenant.id, file_path=str(path), source="EMAIL", status="NEW",
+                      email_from="Accounts <ar@pearl.example>")
+        db.add(inv)
+        db.flush()
+        return inv
+
+    email_invoice("PT-1")
+    extract_batch(db, 10)
+    stored = db.query(ExtractionTemplate).filter_by(tenant_id=tenant.id, sender_domain="pearl.example").one()
+    assert stored.constants == {"vendor": "Pearl Trading LLC"}
+
+    template_store.clear()  # as another process would: loaded from the table
+    second = email_invoice("PT-2")
+    extract_batch(db, 10)
+    assert (second.vendor, float(second.amount)) == ("Pearl Trading LLC", 99.0)
+    db.flush()
+    event = db.query(AuditEvent).filter_by(entity_id=str(second.id), action="INVOICE_AUTO_EXTRACTED").one()
+    assert event.metadata_json["template"] == "pearl.example/-"
+    db.refresh(stored)
+    assert (stored.hits, stored.misses) == (1, 0)
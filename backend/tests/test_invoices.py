@@ -40,3 +40,156 @@ def test_mark_paid(client, approver_user, db, tenant):
     assert resp.status_code == 200
     assert resp.json()["status"] == "PAID"
     assert len(resp.json()["payments"]) == 1
+
+
+def _queue(db, tenant, count: int):
+    from datetime import datetime, timedelta
+
+    from app.models.invoice import Invoice
+    base = datetime(2026, 10, 1)
+    invoices = [
+        Invoice(tenant_id=tenant.id, vendor=f"V{i}", status="APPROVAL_PENDING", created_at=base + timedelta(hours=i))
+        for i in range(count)
+    ]
+    db.add_all(invoices)
+    db.add(Invoice(tenant_id=tenant.id, vendor="done", status="PAID", created_at=base))
+    db.flush()
+    return invoices
+
+
+def test_claim_takes_oldest_unclaimed_first(client, admin_user, approver_user, db, tenant):
+    invoices = _queue(db, tenant, 4)
+
+    first = client.post("/api/invoices/review-queue/claim", params={"limit": 2}, headers=auth_headers(approver_user))
+    assert first.status_code == 200
+    assert [i["id"] for i in first.json()] == [str(invoices[0].id), str(invoices[1].id)]
+    assert all(i["claimed_by_user_id"] == str(approver_user.id) for i in first.json())
+
+    second = client.post("/api/invoices/review-queue/claim", params={"limit": 5}, headers=auth_headers(admin_user))
+    assert [i["id"] for i in second.json()] == [str(invoices[2].id), str(invoices[3].id)]
+
+
+def test_claim_blocks_other_approvers_until_released(client, admin_user, approver_user, db, tenant):
+    invoices = _queue(db, tenant, 1)
+    client.post("/api/invoices/review-queue/claim", headers=auth_headers(approver_user))
+
+    resp = client.post(f"/api/invoices/{invoices[0].id}/approve", headers=auth_headers(admin_user))
+    assert resp.status_code == 409
+
+    resp = client.post(f"/api/invoices/{invoices[0].id}/release", headers=auth_headers(approver_user))
+    assert resp.status_code == 200
+    assert resp.json()["claimed_by_user_id"] is None
+
+    resp = client.post(f"/api/invoices/{invoices[0].id}/approve", headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+
+
+def test_fuzzy_search_ranks_closest_match_first(client, admin_user, db, tenant):
+    from app.models.invoice import Invoice
+    db.add_all([
+        Invoice(tenant_id=tenant.id, vendor="Emirates Logistics LLC", invoice_number="EL-1"),
+        Invoice(tenant_id=tenant.id, vendor="Gulf Office Supplies", invoice_number="GO-7",
+                email_subject="Invoice from Emirates Logistic partner"),
+        Invoice(tenant_id=tenant.id, vendor="Unrelated Co", invoice_number="UC-3"),
+    ])
+    db.flush()
+
+    resp = client.get("/api/invoices/fuzzy-search", params={"q": "emirats logistics"}, headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    hits = resp.json()
+    assert [h["vendor"] for h in hits][:1] == ["Emirates Logistics LLC"]
+    assert "Unrelated Co" not in [h["vendor"] for h in hits]
+    assert hits == sorted(hits, key=lambda h: h["score"], reverse=True)
+
+
+def test_vendor_suggest_is_prefix_only_and_counted(client, admin_user, db, tenant):
+    from app.models.invoice import Invoice
+    for vendor in ["Acme Trading", "Acme Trading", "acme tools", "The Acme Shop"]:
+        db.add(Invoice(tenant_id=tenant.id, vendor=vendor))
+    db.flush()
+
+    resp = client.get("/api/invoices/vendors/suggest", params={"prefix": "acm"}, headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    assert resp.json() == [
+        {"vendor": "Acme Trading", "invoice_count": 2},
+        {"vendor": "acme tools", "invoice_count": 1},
+    ]
+
+
+def test_text_search_ranks_highlights_and_pages(client, admin_user, db, tenant):
+    from app.models.invoice import Invoice
+    from app.models.invoice_text import InvoiceText
+    contents = [
+        "Purchase order PO-4471 office chairs",
+        "Ref PO-4471 desks; PO-4471 delivery to site PO-4471",
+        "Purchase order PO-9000 printer toner",
+    ]
+    for i, content in enumerate(contents):
+        inv = Invoice(tenant_id=tenant.id, vendor=f"V{i}", file_path=f"/tmp/{i}.pdf")
+        db.add(inv)
+        db.flush()
+        db.add(InvoiceText(invoice_id=inv.id, tenant_id=tenant.id, file_path=inv.file_path, content=content))
+    db.flush()
+
+    resp = client.get("/api/invoices/search", params={"q": "PO-4471", "limit": 1}, headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    first = resp.json()
+    assert [h["vendor"] for h in first] == ["V1"]
+    assert "<mark>" in first[0]["headline"]
+
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get(
+        "/api/invoices/search", params={"q": "PO-4471", "limit": 1, "cursor": cursor}, headers=auth_headers(admin_user),
+    )
+    assert [h["vendor"] for h in resp.json()] == ["V0"]
+    assert first[0]["score"] > resp.json()[0]["score"]
+
+
+def test_text_search_rejects_tampered_cursor(client, admin_user):
+    resp = client.get("/api/invoices/search", params={"q": "x", "cursor": "garbage"}, headers=auth_headers(admin_user))
+    assert resp.status_code == 400
+
+
+def test_reupload_is_flagged_duplicate_and_filterable_in_review_queue(client, admin_user):
+    def upload(number, content):
+        return client.post(
+            "/api/invoices/upload",
+            files={"file": ("inv.pdf", io.BytesIO(content), "application/pdf")},
+            data={"vendor": "Gulf Office Supplies", "invoice_number": number, "amount": "50", "invoice_date": "2026-04-03"},
+            headers=auth_headers(admin_user),
+        ).json()
+
+    original = upload("INV-0042", b"first scan")
+    renamed = upload("inv 42", b"second scan")  # same key after normalization
+    rescanned = upload("OTHER-1", b"first scan")  # same file
+
+    assert not any(e["code"] == "DUPLICATE_INVOICE" for e in original["exceptions"])
+    for dup in (renamed, rescanned):
+        assert dup["status"] == "VALIDATED"
+        assert [e["message"] for e in dup["exceptions"] if e["code"] == "DUPLICATE_INVOICE"] == [
+            f"Possible duplicate of invoice {original['id']}"
+        ]
+
+    resp = client.get("/api/invoices/review-queue?exception_code=DUPLICATE_INVOICE", headers=auth_headers(admin_user))
+    assert {i["id"] for i in resp.json()["items"]} == {renamed["id"], rescanned["id"]}
+
+
+def test_sweep_flags_existing_duplicates_once(db, tenant):
+    from app.models.invoice import Invoice
+    from app.services.dedupe import sweep_duplicates
+
+    # Inserted as before the dedupe columns existed: keys NULL until the sweep backfills them
+    rows = [
+        Invoice(tenant_id=tenant.id, vendor=vendor, invoice_number="A-1", amount=10, status=status)
+        for vendor, status in [("Acme LLC", "PAID"), ("ACME", "APPROVAL_PENDING"), ("Acme", "REJECTED"), ("Other", "NEW")]
+    ]
+    db.add_all(rows)
+    db.flush()
+    db.execute(Invoice.__table__.update().values(dedupe_key=None, content_sha256=None))
+
+    assert sweep_duplicates(db) == 1
+    assert sweep_duplicates(db) == 0
+    db.expire_all()
+    assert rows[1].status == "VALIDATED"
+    assert [e.code for e in rows[1].exceptions] == ["DUPLICATE_INVOICE"]
+    assert rows[0].exceptions == rows[2].exceptions == []
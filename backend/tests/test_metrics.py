@@ -0,0 +1,98 @@
+"""Tests for the Prometheus metrics primitives (no database needed)."""
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import (
+    HTTP_IN_FLIGHT,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    RequestContext,
+    record_query,
+    render,
+    route_label,
+)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_registry():
+    registered = list(REGISTRY)
+    yield
+    REGISTRY[:] = registered
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("test_latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.labels("/api/x").observe(value)
+
+    text = render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{route="/api/x",le="0.1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/api/x",le="1"} 3' in text
+    assert 'test_latency_seconds_bucket{route="/api/x",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_sum{route="/api/x"} 3.65' in text
+    assert 'test_latency_seconds_count{route="/api/x"} 4' in text
+
+
+def test_counters_and_gauges_escape_label_values():
+    c = Counter("test_events_total", "Events.", ["kind"])
+    c.labels('say "hi"\n').inc(2)
+    g = Gauge("test_in_use", "In use.")
+    g.inc()
+    g.inc()
+    g.dec()
+
+    text = render()
+    assert 'test_events_total{kind="say \\"hi\\"\\n"} 2' in text
+    assert "test_in_use 1" in text
+    with pytest.raises(ValueError):
+        c.labels()
+
+
+def test_route_label_outside_and_inside_a_request():
+    assert route_label() == "background"
+
+    class Route:
+        path = "/api/invoices/{invoice_id}"
+
+    scope = {"type": "http"}
+    token = metrics._current_request.set(RequestContext(scope))
+    try:
+        assert route_label() == "unmatched"
+        scope["route"] = Route()
+        assert route_label() == "/api/invoices/{invoice_id}"
+    finally:
+        metrics._current_request.reset(token)
+
+
+def test_middleware_records_requests_per_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/test-items/{item_id}")
+    def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        record_query(0.25)
+        record_query(0.5)
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    sizes = [len(client.get(f"/test-items/{item_id}").content) for item_id in (1, 2, 0)]
+    client.request("PURGE", "/nowhere")
+    record_query(1.0)  # outside a request: ignored
+
+    text = render()
+    assert 'http_requests_total{method="GET",route="/test-items/{item_id}",status="200"} 2' in text
+    assert 'http_requests_total{method="GET",route="/test-items/{item_id}",status="404"} 1' in text
+    assert 'http_requests_total{method="OTHER",route="unmatched",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/test-items/{item_id}",status="200"} 2' in text
+    assert f'http_response_size_bytes_sum{{method="GET",route="/test-items/{{item_id}}"}} {sum(sizes)}' in text
+    assert 'http_request_db_queries_sum{route="/test-items/{item_id}"} 4' in text
+    assert 'http_request_db_seconds_sum{route="/test-items/{item_id}"} 1.5' in text
+    assert HTTP_IN_FLIGHT.labels().value == 0
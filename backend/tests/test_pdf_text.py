@@ -0,0 +1,63 @@
+"""Unit tests for invoice file text extraction (no database needed)."""
+import uuid
+
+from app.api.pagination import decode_rank_cursor, encode_rank_cursor
+from app.services.pdf_text import extract_text
+
+
+def _write_pdf(path, lines: list[str]):
+    """Smallest valid single-page PDF with one text line per entry."""
+    ops = " ".join(f"BT /F1 12 Tf 72 {720 - 16 * i} Td ({line}) Tj ET" for i, line in enumerate(lines))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(ops), ops.encode()),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def test_pdf_text_is_extracted_per_page(tmp_path):
+    path = tmp_path / "invoice.pdf"
+    _write_pdf(path, ["Invoice INV-2231", "Purchase order PO-4471"])
+
+    result = extract_text(str(path), max_chars=10_000)
+
+    assert result.error is None
+    assert result.page_count == 1
+    assert "PO-4471" in result.content and "INV-2231" in result.content
+
+
+def test_content_is_capped_and_nul_free(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("alpha\x00beta " * 100)
+
+    result = extract_text(str(path), max_chars=50)
+
+    assert "\x00" not in result.content
+    assert len(result.content) <= 50
+
+
+def test_unreadable_files_report_an_error_instead_of_raising(tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    assert extract_text(str(broken), 1000).error
+    assert extract_text(str(tmp_path / "missing.pdf"), 1000).error
+    assert extract_text(str(tmp_path / "scan.png"), 1000).error == "Unsupported file type: .png"
+
+
+def test_rank_cursor_round_trips_exactly():
+    row_id = uuid.uuid4()
+    assert decode_rank_cursor(encode_rank_cursor(0.1, row_id)) == (0.1, row_id)
@@ -0,0 +1,156 @@
+"""Unit tests for inbound email providers."""
+import base64
+import os
+import time
+from unittest.mock import MagicMock
+
+from app.workers.email_poller import _extract_email_metadata, _extract_to_address, _stream_attachments_to_disk
+from app.workers.providers import ImapProvider, MaildirProvider, raw_to_message
+
+RAW_INVOICE = (
+    "From: Billing <billing@vendor.example>\r\n"
+    "To: acme@inbound.local\r\n"
+    "Subject: Invoice 42\r\n"
+    "Date: Mon, 19 Oct 2026 09:30:00 +0000\r\n"
+    "MIME-Version: 1.0\r\n"
+    'Content-Type: application/pdf; name="inv.pdf"\r\n'
+    'Content-Disposition: attachment; filename="inv.pdf"\r\n'
+    "Content-Transfer-Encoding: base64\r\n"
+    "\r\n"
+    + base64.b64encode(b"%PDF-1.4 maildir").decode()
+    + "\r\n"
+)
+
+
+def _deliver(root, name: str, raw: str):
+    with open(os.path.join(root, "new", name), "w", newline="") as f:
+        f.write(raw)
+
+
+def test_raw_to_message_matches_mailhog_shape():
+    msg = raw_to_message("m1", RAW_INVOICE)
+    assert msg["ID"] == "m1"
+    assert _extract_to_address(msg) == "acme@inbound.local"
+    meta = _extract_email_metadata(msg)
+    assert meta["email_from"] == "billing@vendor.example"
+    assert meta["email_subject"] == "Invoice 42"
+
+
+def test_maildir_fetch_claims_and_ack_removes(tmp_path):
+    provider = MaildirProvider(str(tmp_path))
+    for i in range(3):
+        _deliver(tmp_path, f"msg{i}", RAW_INVOICE)
+
+    batch = provider.fetch_batch(2)
+    assert len(batch) == 2
+    assert len(os.listdir(tmp_path / "new")) == 1
+    assert len(os.listdir(tmp_path / "cur")) == 2
+
+    provider.ack([batch[0]["ID"]])
+    provider.nack([batch[1]["ID"]])
+    assert len(os.listdir(tmp_path / "cur")) == 0
+    remaining = sorted(os.listdir(tmp_path / "new"))
+    assert batch[0]["ID"] not in remaining
+    assert batch[1]["ID"] in remaining
+    assert len(remaining) == 2
+
+
+def test_maildir_reject_moves_to_quarantine(tmp_path):
+    provider = MaildirProvider(str(tmp_path))
+    _deliver(tmp_path, "msg0", RAW_INVOICE)
+
+    (msg,) = provider.fetch_batch(10)
+    provider.reject([msg["ID"]])
+    assert os.listdir(tmp_path / "quarantine") == ["msg0"]
+    assert provider.fetch_batch(10) == []
+
+
+def test_imap_reject_copies_to_quarantine_then_deletes():
+    provider = ImapProvider(host="imap.example", quarantine_mailbox="Quarantine")
+    conn = provider._conn = MagicMock()
+    conn.uid.return_value = ("OK", [b""])
+
+    provider.reject(["7", "9"])
+    assert [c.args for c in conn.uid.call_args_list] == [
+        ("COPY", "7,9", "Quarantine"),
+        ("STORE", "7,9", "+FLAGS.SILENT", "(\\Deleted)"),
+    ]
+    conn.expunge.assert_called_once()
+
+    # Without a quarantine mailbox the message stays \Seen in the inbox, out of the UNSEEN search
+    conn.reset_mock()
+    conn.uid.return_value = ("NO", [b"[TRYCREATE] no such mailbox"])
+    provider.reject(["11"])
+    assert [c.args[0] for c in conn.uid.call_args_list] == ["COPY"]
+    conn.expunge.assert_not_called()
+
+
+def test_maildir_message_streams_attachment(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    provider = MaildirProvider(str(tmp_path / "maildir"))
+    _deliver(tmp_path / "maildir", "msg0", RAW_INVOICE)
+
+    (msg,) = provider.fetch_batch(10)
+    saved = _stream_attachments_to_disk(msg, tenant_id="t1", message_id=msg["ID"])
+    assert [a.filename for a in saved] == ["inv.pdf"]
+    with open(saved[0].file_path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 maildir"
+
+
+def test_maildir_requeues_stale_claims(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INBOUND_CLAIM_TIMEOUT_SECONDS", 60)
+    provider = MaildirProvider(str(tmp_path))
+    _deliver(tmp_path, "msg0", RAW_INVOICE)
+    (msg,) = provider.fetch_batch(10)
+
+    # The poller died before ack/nack: a fresh claim is left alone, a stale one is fetched again
+    assert MaildirProvider(str(tmp_path)).fetch_batch(10) == []
+    (claimed,) = os.listdir(tmp_path / "cur")
+    old = time.time() - 120
+    os.utime(tmp_path / "cur" / claimed, (old, old))
+    assert [m["ID"] for m in MaildirProvider(str(tmp_path)).fetch_batch(10)] == [msg["ID"]]
+
+
+def test_maildir_keeps_8bit_attachment_bytes(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    payload = b"%PDF-1.4 \xe2\xe3\xcf\xd3\r\n\xff\x00\x80 binary"
+    provider = MaildirProvider(str(tmp_path / "maildir"))
+    with open(tmp_path / "maildir" / "new" / "msg0", "wb") as f:
+        f.write(
+            b"To: acme@inbound.local\r\n"
+            b"Content-Type: application/pdf\r\n"
+            b'Content-Disposition: attachment; filename="inv.pdf"\r\n'
+            b"Content-Transfer-Encoding: 8bit\r\n"
+            b"\r\n" + payload
+        )
+
+    (msg,) = provider.fetch_batch(10)
+    (saved,) = _stream_attachments_to_disk(msg, tenant_id="t1", message_id=msg["ID"])
+    with open(saved.file_path, "rb") as f:
+        assert f.read() == payload
+
+
+def test_imap_requeues_claims_older_than_the_timeout(monkeypatch):
+    from app.core.config import settings
+    from app.workers import providers
+
+    monkeypatch.setattr(providers, "_imap_claims_seen", {})
+    provider = ImapProvider(host="imap.example")
+    conn = provider._conn = MagicMock()
+    searches = {"SEEN UNDELETED": [b"5 6"], "UNSEEN UNDELETED": [b""]}
+    conn.uid.side_effect = lambda cmd, *args: ("OK", searches[args[1]] if cmd == "SEARCH" else [b""])
+
+    monkeypatch.setattr(settings, "INBOUND_CLAIM_TIMEOUT_SECONDS", 900)
+    provider.fetch_batch(10)
+    assert [c.args[0] for c in conn.uid.call_args_list] == ["SEARCH", "SEARCH"]
+
+    conn.uid.reset_mock()
+    monkeypatch.setattr(settings, "INBOUND_CLAIM_TIMEOUT_SECONDS", 0)
+    provider.fetch_batch(10)
+    assert ("STORE", "5,6", "-FLAGS.SILENT", "(\\Seen)") in [c.args for c in conn.uid.call_args_list]
@@ -0,0 +1,65 @@
+"""Query budgets for the main read endpoints.
+
+Each endpoint is called over a tenant with INVOICES invoices, every one of them
+with an exception, an approval and a payment, and must stay within its
+statement budget. Budgets do not grow with the number of rows, so a lazy load
+or a query per row (an N+1) fails here. Lower a budget when an endpoint gets
+cheaper; raise one only for a new, deliberate query.
+"""
+from datetime import UTC, datetime
+
+import pytest
+
+from app.models.approval import Approval
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.invoice_exception import InvoiceException
+from app.models.payment import Payment
+from tests.conftest import auth_headers
+
+INVOICES = 12
+
+# (url, statement budget); {invoice_id} is filled with one of the seeded invoices
+ENDPOINT_BUDGETS = [
+    ("/api/auth/me", 4),
+    ("/api/users", 3),
+    ("/api/invoices", 7),
+    ("/api/invoices/{invoice_id}", 6),
+    ("/api/invoices/review-queue", 7),
+    ("/api/payments", 3),
+    ("/api/audit", 3),
+    ("/api/analytics/overview", 5),
+    ("/api/tenants/settings", 4),
+]
+
+
+@pytest.fixture()
+def invoices(db, admin_user):
+    now = datetime.now(UTC)
+    rows = [
+        Invoice(
+            tenant_id=admin_user.tenant_id, vendor=f"Vendor {i}", invoice_number=f"INV-{i}", amount=100 + i,
+            currency="AED", status=InvoiceStatus.VALIDATED.value if i % 2 else InvoiceStatus.PAID.value,
+        )
+        for i in range(INVOICES)
+    ]
+    db.add_all(rows)
+    db.flush()
+    for inv in rows:
+        db.add_all([
+            InvoiceException(
+                tenant_id=inv.tenant_id, invoice_id=inv.id, code="MISSING_DATE", message="Invoice date is required",
+            ),
+            Approval(tenant_id=inv.tenant_id, invoice_id=inv.id, decided_by_user_id=admin_user.id, decision="APPROVED"),
+            Payment(tenant_id=inv.tenant_id, invoice_id=inv.id, paid_amount=inv.amount, paid_at=now),
+        ])
+    db.flush()
+    db.expire_all()
+    return rows
+
+
+@pytest.mark.parametrize(("url", "budget"), ENDPOINT_BUDGETS)
+def test_endpoint_stays_within_query_budget(client, admin_user, invoices, query_budget, url, budget):
+    url = url.format(invoice_id=invoices[0].id)
+    with query_budget(budget):
+        resp = client.get(url, headers=auth_headers(admin_user))
+    assert resp.status_code == 200
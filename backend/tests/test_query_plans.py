@@ -0,0 +1,123 @@
+"""Query plan regression tests for the hot endpoints.
+
+Seeds a multi-tenant volume, calls each endpoint while recording the SQL it
+runs, and EXPLAINs every recorded statement. A statement that reads invoices,
+payments or invoice_exceptions must reach them through an index, never a
+sequential scan, and its estimated cost must stay under COST_CEILING.
+"""
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from tests.conftest import auth_headers
+
+SEED_TENANTS = 50
+INVOICES_PER_TENANT = 800
+LARGE_TABLES = {"invoices", "payments", "invoice_exceptions"}
+# Planner cost units. A sequential scan of the seeded invoices costs about 9,000; whole-tenant
+# aggregates over the tenant's 800 invoices cost up to about 2,700 through the (tenant_id, ...) indexes
+COST_CEILING = 3_000
+
+SEED_SQL = (
+    """
+    INSERT INTO tenants (id, name, inbound_email_alias, allowed_currencies, settings_version, created_at)
+    SELECT gen_random_uuid(), 'Tenant ' || g, 'tenant' || g, 'AED,USD', 1, now()
+    FROM generate_series(1, :others) g
+    """,
+    # Mostly settled invoices, two years of history; one in five is still under review
+    """
+    INSERT INTO invoices (id, tenant_id, vendor, invoice_number, invoice_date, amount, currency, status, file_path,
+                          original_filename, source, attachment_count, created_at, updated_at)
+    SELECT gen_random_uuid(), t.id, 'Vendor ' || (g % 40), 'INV-' || g, (now() - g * interval '21 hours')::date,
+           100 + g % 900, 'AED',
+           CASE g % 10 WHEN 0 THEN 'VALIDATED' WHEN 1 THEN 'APPROVAL_PENDING' WHEN 2 THEN 'APPROVED'
+                       WHEN 3 THEN 'REJECTED' ELSE 'PAID' END,
+           '', '', 'EMAIL', 1, now() - g * interval '21 hours', now() - g * interval '21 hours'
+    FROM tenants t CROSS JOIN generate_series(1, :per_tenant) g
+    """,
+    """
+    INSERT INTO payments (id, tenant_id, invoice_id, paid_amount, paid_currency, paid_at, payment_method, reference,
+                          created_at)
+    SELECT gen_random_uuid(), tenant_id, id, amount, currency, created_at + interval '10 days', 'BANK', '', created_at
+    FROM invoices WHERE status = 'PAID'
+    """,
+    # Open exceptions on the VALIDATED invoices, resolved ones on some of the rest
+    """
+    INSERT INTO invoice_exceptions (id, tenant_id, invoice_id, code, message, severity, created_at, resolved_at)
+    SELECT gen_random_uuid(), tenant_id, id, 'MISSING_DATE', 'Invoice date is required', 'ERROR', created_at,
+           CASE WHEN status = 'VALIDATED' THEN NULL ELSE created_at + interval '1 day' END
+    FROM invoices WHERE status = 'VALIDATED' OR invoice_number LIKE '%7'
+    """,
+)
+
+
+@pytest.fixture()
+def seeded(db: Session, admin_user):
+    for statement in SEED_SQL:
+        db.execute(text(statement), {"others": SEED_TENANTS - 1, "per_tenant": INVOICES_PER_TENANT})
+    db.flush()
+    for table in ("tenants", "users", "invoices", "payments", "invoice_exceptions", "approvals"):
+        db.execute(text(f"ANALYZE {table}"))
+    return admin_user
+
+
+@contextmanager
+def recorded_sql(db: Session) -> Iterator[list[tuple[str, dict]]]:
+    statements: list[tuple[str, dict]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def _days_ago(days: int) -> str:
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+HOT_ENDPOINTS = [
+    "/api/invoices",
+    f"/api/invoices?status_filter=PAID&from_date={_days_ago(90)}",
+    "/api/invoices/review-queue",
+    f"/api/payments?from_date={_days_ago(90)}",
+    "/api/analytics/overview",
+    f"/api/analytics/payments?from_date={_days_ago(180)}",
+    f"/api/analytics/effectiveness?from_date={_days_ago(180)}",
+    f"/api/exports/payment-pack.csv?from={_days_ago(30)}&to={_days_ago(0)}",
+    f"/api/exports/weekly-pack.md?week_start={_days_ago(7)}",
+]
+
+
+@pytest.mark.parametrize("url", HOT_ENDPOINTS)
+def test_hot_endpoint_queries_use_indexes(client, db, seeded, url):
+    with recorded_sql(db) as statements:
+        resp = client.get(url, headers=auth_headers(seeded))
+    assert resp.status_code == 200
+
+    checked = 0
+    for statement, parameters in statements:
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()[0]["Plan"]
+        nodes = list(plan_nodes(plan))
+        if not LARGE_TABLES & {n.get("Relation Name") for n in nodes}:
+            continue
+        checked += 1
+        seq_scans = [n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan" and n["Relation Name"] in LARGE_TABLES]
+        assert not seq_scans, f"sequential scan of {seq_scans} in:\n{statement}"
+        assert plan["Total Cost"] <= COST_CEILING, f"cost {plan['Total Cost']} over {COST_CEILING} in:\n{statement}"
+    assert checked, "no query against the large tables was recorded"
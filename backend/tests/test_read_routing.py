@@ -0,0 +1,46 @@
+"""Tests for read-replica routing and the read-your-writes cookie."""
+import uuid
+
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.db.session import READ_PRIMARY_COOKIE, reads_from_primary
+from tests.conftest import auth_headers
+
+
+def _request(cookie: str = "") -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/api/invoices", "headers": headers})
+
+
+@pytest.fixture()
+def replica(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", "postgresql://replica/backoffice")
+
+
+def test_reads_use_primary_without_replica_or_after_a_write(replica, monkeypatch):
+    assert not reads_from_primary(_request())
+    assert reads_from_primary(_request(f"{READ_PRIMARY_COOKIE}=1"))
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", "")
+    assert reads_from_primary(_request())
+
+
+def test_successful_writes_set_the_read_primary_cookie(client, approver_user, replica):
+    headers = auth_headers(approver_user)
+    resolved = client.post("/api/invoices/exceptions/resolve", json={"invoice_ids": [str(uuid.uuid4())]}, headers=headers)
+    assert resolved.status_code == 200
+    cookie = resolved.headers["set-cookie"]
+    assert cookie.startswith(f"{READ_PRIMARY_COOKIE}=1") and f"Max-Age={settings.READ_YOUR_WRITES_SECONDS}" in cookie
+
+    rejected = client.post("/api/invoices/exceptions/resolve", json={}, headers=headers)
+    assert rejected.status_code == 422
+    assert "set-cookie" not in rejected.headers
+    assert "set-cookie" not in client.get("/api/invoices", headers=headers).headers
+
+
+def test_no_cookie_without_a_replica(client, approver_user):
+    resp = client.post("/api/invoices/exceptions/resolve", json={"invoice_ids": [str(uuid.uuid4())]},
+                       headers=auth_headers(approver_user))
+    assert resp.status_code == 200
+    assert "set-cookie" not in resp.headers
@@ -0,0 +1,83 @@
+"""Tests for re-validating open invoices after a tenant settings change."""
+from app.models.invoice import Invoice
+from app.models.invoice_exception import InvoiceException
+from app.workers.revalidator import advance, next_job
+from tests.conftest import auth_headers
+
+
+def _invoice(db, tenant, currency, status, open_currency_exception=False):
+    inv = Invoice(tenant_id=tenant.id, vendor="V", invoice_number="N", currency=currency, status=status, file_path="f")
+    db.add(inv)
+    db.flush()
+    if open_currency_exception:
+        db.add(InvoiceException(tenant_id=tenant.id, invoice_id=inv.id, code="INVALID_CURRENCY", message="old"))
+        db.flush()
+    return inv
+
+
+def test_settings_change_revalidates_open_invoices_in_resumable_chunks(client, admin_user, db, tenant):
+    now_allowed = _invoice(db, tenant, "JPY", "VALIDATED", open_currency_exception=True)
+    now_invalid = _invoice(db, tenant, "GBP", "APPROVAL_PENDING")
+    still_fine = _invoice(db, tenant, "AED", "APPROVAL_PENDING")
+    paid = _invoice(db, tenant, "GBP", "PAID")
+
+    resp = client.patch("/api/tenants/settings", json={"allowed_currencies": "AED,JPY"}, headers=auth_headers(admin_user))
+    job_id = resp.json()["revalidation_job_id"]
+    assert resp.json()["settings_version"] == 2
+
+    # One invoice per chunk: the cursor and counters survive between transactions
+    job = next_job(db)
+    advance(db, job, 1)
+    db.commit()
+    progress = client.get(f"/api/tenants/revalidation-jobs/{job_id}", headers=auth_headers(admin_user)).json()
+    assert (progress["status"], progress["total"], progress["processed"], progress["progress"]) == ("RUNNING", 2, 1, 0.5)
+
+    while (job := next_job(db)) is not None:
+        advance(db, job, 1)
+        db.commit()
+    db.expire_all()
+
+    progress = client.get(f"/api/tenants/revalidation-jobs/{job_id}", headers=auth_headers(admin_user)).json()
+    assert (progress["status"], progress["exceptions_resolved"], progress["exceptions_created"]) == ("DONE", 1, 1)
+    assert now_allowed.status == "APPROVAL_PENDING"
+    assert [e.resolved_at is not None for e in now_allowed.exceptions] == [True]
+    assert now_invalid.status == "VALIDATED"
+    assert [e.message for e in now_invalid.exceptions] == ["Currency 'GBP' not in allowed list: ['AED', 'JPY']"]
+    assert still_fine.status == "APPROVAL_PENDING" and not still_fine.exceptions
+    assert paid.exceptions == []
+
+
+def test_new_settings_change_supersedes_running_job(client, admin_user, db, tenant):
+    headers = auth_headers(admin_user)
+    first = client.patch("/api/tenants/settings", json={"allowed_currencies": "AED"}, headers=headers).json()
+    client.patch("/api/tenants/settings", json={"allowed_currencies": "AED,USD"}, headers=headers)
+    # Same value again: nothing to re-check
+    assert client.patch("/api/tenants/settings", json={"allowed_currencies": "AED,USD"}, headers=headers).json()[
+        "revalidation_job_id"
+    ] is None
+
+    jobs = client.get("/api/tenants/revalidation-jobs", headers=headers).json()
+    assert [(j["settings_version"], j["status"]) for j in jobs] == [(3, "PENDING"), (2, "SUPERSEDED")]
+    assert jobs[1]["id"] == first["revalidation_job_id"]
+    resp = client.post(f"/api/tenants/revalidation-jobs/{jobs[1]['id']}/resume", headers=headers)
+    assert resp.status_code == 409
+
+
+def test_invoice_that_still_fails_keeps_its_exception(client, admin_user, db, tenant):
+    still_invalid = _invoice(db, tenant, "CHF", "VALIDATED", open_currency_exception=True)
+    (before,) = still_invalid.exceptions
+    headers = auth_headers(admin_user)
+
+    client.patch("/api/tenants/settings", json={"allowed_currencies": "AED,JPY"}, headers=headers)
+    while (job := next_job(db)) is not None:
+        advance(db, job, 10)
+        db.commit()
+    db.expire_all()
+
+    (job,) = client.get("/api/tenants/revalidation-jobs", headers=headers).json()
+    assert (job["processed"], job["exceptions_resolved"], job["exceptions_created"]) == (1, 0, 0)
+    # Same row, still open, with the message for the new settings
+    assert [(e.id, e.resolved_at, e.message) for e in still_invalid.exceptions] == [
+        (before.id, None, "Currency 'CHF' not in allowed list: ['AED', 'JPY']"),
+    ]
+    assert still_invalid.status == "VALIDATED"
@@ -0,0 +1,75 @@
+"""Tests for the opt-in SQL profiler, GET /debug/sql-profiles and the query_budget fixture."""
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.profiler import SqlProfile, statement_shape
+from app.models.invoice import Invoice
+from tests.conftest import auth_headers
+
+
+def test_statement_shape_collapses_values_and_in_lists():
+    a = statement_shape("SELECT * FROM invoices\n WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND vendor = 'ACME' LIMIT 50")
+    b = statement_shape("SELECT * FROM invoices WHERE id IN (%(id_1_1)s) AND vendor = 'It''s' LIMIT 20")
+    assert a == b == "SELECT * FROM invoices WHERE id IN (?) AND vendor = ? LIMIT ?"
+
+
+def test_profile_reports_repeated_shapes():
+    profile = SqlProfile()
+    for i in range(3):
+        profile.add(f"SELECT * FROM approvals WHERE invoice_id = {i}", 0.001)
+    profile.add("SELECT * FROM invoices", 0.002)
+
+    assert profile.queries == 4
+    assert profile.repeated(3) == [
+        {"statement": "SELECT * FROM approvals WHERE invoice_id = ?", "count": 3, "db_ms": 3.0},
+    ]
+    assert profile.repeated(4) == []
+    assert profile.server_timing() == 'db;dur=5.0;desc="4 queries"'
+
+
+def test_profiling_is_off_by_default(client, admin_user):
+    resp = client.get("/api/invoices", headers=auth_headers(admin_user))
+    assert "server-timing" not in resp.headers
+    assert client.get("/debug/sql-profiles", headers=auth_headers(admin_user)).status_code == 404
+
+
+def test_profiles_are_for_admins_only(client, viewer_user, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_PROFILING", True)
+    assert client.get("/debug/sql-profiles").status_code == 401
+    assert client.get("/debug/sql-profiles", headers=auth_headers(viewer_user)).status_code == 403
+
+
+def test_profiled_request_gets_server_timing_and_is_listed(client, admin_user, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_PROFILING", True)
+    # Every shape counts as repeated, so the request is reported
+    monkeypatch.setattr(settings, "SQL_REPEAT_THRESHOLD", 1)
+
+    with caplog.at_level(logging.WARNING, logger="app.db.profiler"):
+        resp = client.get("/api/invoices", headers=auth_headers(admin_user))
+    assert resp.status_code == 200
+    assert resp.headers["server-timing"].startswith("db;dur=")
+    assert "Possible N+1 in GET /api/invoices" in caplog.text
+
+    data = client.get("/debug/sql-profiles?repeated_only=true", headers=auth_headers(admin_user)).json()
+    assert data["repeat_threshold"] == 1
+    latest = data["profiles"][0]
+    assert latest["route"] == "/api/invoices"
+    assert latest["status"] == 200
+    assert latest["queries"] >= 2
+    assert latest["repeated"]
+    assert f'desc="{latest["queries"]} queries"' in resp.headers["server-timing"]
+
+
+def test_query_budget_fails_a_query_per_row(db, query_budget, tenant):
+    db.add_all([Invoice(tenant_id=tenant.id, vendor=f"V{i}") for i in range(5)])
+    db.flush()
+    ids = db.scalars(select(Invoice.id)).all()
+
+    with pytest.raises(AssertionError, match=r"6 SQL statements, budget 2(.|\n)*5x SELECT invoices"):
+        with query_budget(2):
+            db.scalars(select(Invoice.id)).all()
+            for invoice_id in ids:
+                db.execute(select(Invoice.vendor).where(Invoice.id == invoice_id)).one()
@@ -0,0 +1,60 @@
+"""Unit tests for the compiled, batch validation rules (no database needed)."""
+import uuid
+from datetime import date
+
+from app.models.invoice import Invoice
+from app.models.tenant import Tenant
+from app.services.dedupe import dedupe_key
+from app.services.validation import compiled_rules, validate_invoice, validate_many
+
+
+def _invoice(**overrides) -> Invoice:
+    values = dict(
+        id=uuid.uuid4(), tenant_id=uuid.uuid4(), vendor="Gulf Office Supplies", invoice_number="GOS-1",
+        invoice_date=date(2026, 4, 3), amount=100, currency="AED", file_path="/data/x.pdf",
+    )
+    values.update(overrides)
+    return Invoice(**values)
+
+
+def test_validate_many_returns_rows_in_invoice_then_rule_order():
+    clean = _invoice()
+    broken = _invoice(vendor=" ", amount=-5, currency="JPY", file_path="")
+    empty = _invoice(invoice_number=None, invoice_date=None, amount=None)
+
+    rows = validate_many([clean, broken, empty])
+
+    assert [(row["invoice_id"], row["code"]) for row in rows] == [
+        (broken.id, "MISSING_VENDOR"), (broken.id, "INVALID_AMOUNT"),
+        (broken.id, "INVALID_CURRENCY"), (broken.id, "MISSING_FILE"),
+        (empty.id, "MISSING_NUMBER"), (empty.id, "MISSING_DATE"), (empty.id, "MISSING_AMOUNT"),
+    ]
+    assert rows[2]["message"] == "Currency 'JPY' not in allowed list: ['AED', 'USD', 'EUR', 'GBP']"
+    assert rows[3]["severity"] == "WARNING"
+    assert rows[0]["tenant_id"] == broken.tenant_id
+
+
+def test_rules_are_recompiled_only_when_settings_version_changes():
+    tenant = Tenant(id=uuid.uuid4(), allowed_currencies="AED, SAR", settings_version=1)
+    first = compiled_rules(tenant)
+    assert first.config.allowed_currencies == ("AED", "SAR")
+
+    tenant.allowed_currencies = "USD"
+    assert compiled_rules(tenant) is first  # same version: cached
+    tenant.settings_version = 2
+    assert compiled_rules(tenant).config.allowed_currencies == ("USD",)
+
+
+def test_validate_invoice_builds_orm_exceptions():
+    tenant = Tenant(id=uuid.uuid4(), allowed_currencies="AED", settings_version=1)
+    exceptions = validate_invoice(_invoice(currency="USD"), tenant)
+
+    assert [(e.code, e.severity) for e in exceptions] == [("INVALID_CURRENCY", "ERROR")]
+
+
+def test_dedupe_key_normalizes_vendor_number_and_amount():
+    key = dedupe_key("Gulf Office Supplies LLC", "INV-0042", 50, date(2026, 4, 3))
+
+    assert key == dedupe_key("gulf office supplies", "inv 42", "50.00", date(2026, 4, 3))
+    assert key != dedupe_key("Gulf Office Supplies", "INV-0042", 50, date(2026, 4, 4))
+    assert dedupe_key("", "INV-1", 50, None) == ""
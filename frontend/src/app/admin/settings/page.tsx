@@ -2,7 +2,7 @@
 import AuthGuard from '@/components/layout/AuthGuard';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { api } from '@/lib/api';
-import type { TenantSettings } from '@/types';
+import type { RevalidationJob, TenantSettings } from '@/types';
 import { useState, useEffect } from 'react';
 import { Settings, Save, Mail } from 'lucide-react';
 
@@ -20,9 +20,25 @@ function SettingsContent() {
     }
   }, [settings]);
 
+  // Latest re-validation job; polled while it is still working through open invoices
+  const { data: jobs } = useQuery<RevalidationJob[]>({
+    queryKey: ['revalidation-jobs'],
+    queryFn: () => api.get('/tenants/revalidation-jobs?limit=1'),
+    refetchInterval: (query) => {
+      const latest = query.state.data?.[0];
+      return latest && (latest.status === 'PENDING' || latest.status === 'RUNNING') ? 2000 : false;
+    },
+  });
+  const job = jobs?.[0];
+
   const update = useMutation({
     mutationFn: () => api.patch('/tenants/settings', { name, allowed_currencies: currencies }),
-    onSuccess: () => { qc.invalidateQueries({ queryKey: ['settings'] }); setSaved(true); setTimeout(() => setSaved(false), 2000); },
+    onSuccess: () => {
+      qc.invalidateQueries({ queryKey: ['settings'] });
+      qc.invalidateQueries({ queryKey: ['revalidation-jobs'] });
+      setSaved(true);
+      setTimeout(() => setSaved(false), 2000);
+    },
   });
 
   return (
@@ -47,6 +63,21 @@ function SettingsContent() {
             <Save className="w-4 h-4 mr-2" /> {update.isPending ? 'Saving...' : 'Save Settings'}
           </button>
           {saved && <p className="text-sm text-green-600">Settings saved!</p>}
+          {job && job.status !== 'SUPERSEDED' && (
+            <div className="text-sm text-gray-600">
+              <p>
+                Re-checking open invoices: {job.status === 'DONE' ? 'done' : job.status.toLowerCase()}
+                {job.total !== null && ` (${job.processed} of ${job.total})`}
+                {job.status === 'DONE' && `, ${job.exceptions_created} exceptions raised, ${job.exceptions_resolved} cleared`}
+              </p>
+              {job.status !== 'DONE' && (
+                <div className="mt-1 h-1.5 bg-gray-100 rounded-full overflow-hidden">
+                  <div className="h-full bg-brand-600" style={{ width: `${Math.round(job.progress * 100)}%` }} />
+                </div>
+              )}
+              {job.error && <p className="text-xs text-red-600 mt-1">{job.error}</p>}
+            </div>
+          )}
         </div>
       </div>
 
@@ -1,7 +1,8 @@
 'use client';
 import AuthGuard from '@/components/layout/AuthGuard';
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { api } from '@/lib/api';
+import { useEventStream } from '@/lib/stream';
 import { formatDateTime } from '@/lib/utils';
 import type { AuditEvent, AuditEffectivenessData } from '@/types';
 import { useState } from 'react';
@@ -10,22 +11,50 @@ import { Activity, Search } from 'lucide-react';
 
 function AuditContent() {
   const [actionFilter, setActionFilter] = useState('');
-  const [page, setPage] = useState(1);
+  const [metaKey, setMetaKey] = useState('message_id');
+  const [metaValue, setMetaValue] = useState('');
+  const [metaFilter, setMetaFilter] = useState('');
+  // Cursor of every page visited so far; '' is the first page
+  const [cursors, setCursors] = useState<string[]>(['']);
+  const cursor = cursors[cursors.length - 1];
 
-  const { data: events } = useQuery<AuditEvent[]>({
-    queryKey: ['audit', actionFilter, page],
+  const { data } = useQuery({
+    queryKey: ['audit', actionFilter, metaFilter, cursor],
     queryFn: () => {
-      const params = new URLSearchParams({ page: String(page), page_size: '30' });
+      const params = new URLSearchParams({ page_size: '30' });
+      if (cursor) params.set('cursor', cursor);
       if (actionFilter) params.set('action', actionFilter);
-      return api.get(`/audit?${params}`);
+      if (metaFilter) params.set('metadata', metaFilter);
+      return api.getPage<AuditEvent>(`/audit?${params}`);
     },
   });
+  const events = data?.items;
+  const nextCursor = data?.nextCursor;
+
+  // Live deltas: prepend new events to the first page instead of re-fetching it
+  const qc = useQueryClient();
+  const firstPageKey = ['audit', actionFilter, metaFilter, ''];
+  useEventStream({
+    audit: (raw) => {
+      const ev = raw as AuditEvent;
+      if (cursor || metaFilter || (actionFilter && ev.action !== actionFilter)) return;
+      qc.setQueryData<{ items: AuditEvent[]; nextCursor: string | null }>(firstPageKey, old =>
+        old && !old.items.some(e => e.id === ev.id) ? { ...old, items: [ev, ...old.items].slice(0, 30) } : old);
+    },
+    overflow: () => qc.invalidateQueries({ queryKey: ['audit'] }),
+  });
 
   const { data: auditEff } = useQuery<AuditEffectivenessData>({
     queryKey: ['audit-effectiveness'],
     queryFn: () => api.get('/analytics/audit-effectiveness'),
   });
 
+  const metadataKeys = ['message_id', 'filename', 'from_email', 'subject', 'sha256', 'vendor', 'email'];
+  const applyMetadata = () => {
+    setMetaFilter(metaValue.trim() ? JSON.stringify({ [metaKey]: metaValue.trim() }) : '');
+    setCursors(['']);
+  };
+
   const actions = ['', 'LOGIN', 'INVOICE_UPLOADED', 'INVOICE_APPROVED', 'INVOICE_REJECTED', 'INVOICE_PAID', 'EMAIL_RECEIVED', 'USER_CREATED'];
 
   return (
@@ -69,10 +98,22 @@ function AuditContent() {
       {/* Filters */}
       <div className="card p-4 flex items-center gap-3">
         <Activity className="w-4 h-4 text-gray-400" />
-        <select className="input-field w-56" value={actionFilter} onChange={e => { setActionFilter(e.target.value); setPage(1); }}>
+        <select className="input-field w-56" value={actionFilter} onChange={e => { setActionFilter(e.target.value); setCursors(['']); }}>
           <option value="">All Actions</option>
           {actions.filter(Boolean).map(a => <option key={a} value={a}>{a}</option>)}
         </select>
+        <Search className="w-4 h-4 text-gray-400 ml-2" />
+        <select className="input-field w-40" value={metaKey} onChange={e => setMetaKey(e.target.value)}>
+          {metadataKeys.map(k => <option key={k} value={k}>{k}</option>)}
+        </select>
+        <input
+          className="input-field w-64"
+          placeholder="Exact metadata value"
+          value={metaValue}
+          onChange={e => setMetaValue(e.target.value)}
+          onKeyDown={e => { if (e.key === 'Enter') applyMetadata(); }}
+          onBlur={applyMetadata}
+        />
       </div>
 
       {/* Table */}
@@ -103,9 +144,9 @@ function AuditContent() {
         </table>
 
         <div className="flex items-center justify-end gap-2 px-4 py-3 border-t border-gray-200 bg-gray-50">
-          <button onClick={() => setPage(p => Math.max(1, p - 1))} disabled={page === 1} className="btn-secondary py-1 px-3 text-xs">Previous</button>
-          <span className="text-xs text-gray-500">Page {page}</span>
-          <button onClick={() => setPage(p => p + 1)} disabled={(events?.length || 0) < 30} className="btn-secondary py-1 px-3 text-xs">Next</button>
+          <button onClick={() => setCursors(c => c.slice(0, -1))} disabled={cursors.length === 1} className="btn-secondary py-1 px-3 text-xs">Previous</button>
+          <span className="text-xs text-gray-500">Page {cursors.length}</span>
+          <button onClick={() => nextCursor && setCursors(c => [...c, nextCursor])} disabled={!nextCursor} className="btn-secondary py-1 px-3 text-xs">Next</button>
         </div>
       </div>
     </div>
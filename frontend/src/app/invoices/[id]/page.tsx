@@ -4,7 +4,7 @@ import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { api } from '@/lib/api';
 import { useAuth } from '@/lib/auth';
 import { formatCurrency, formatDate, formatDateTime, statusColor, canApprove } from '@/lib/utils';
-import type { Invoice } from '@/types';
+import type { AuditEntityHistory, Invoice } from '@/types';
 import { useParams, useRouter } from 'next/navigation';
 import { ArrowLeft, Download, Check, X, DollarSign, AlertCircle, FileText, Clock, User } from 'lucide-react';
 
@@ -19,19 +19,35 @@ function InvoiceDetail() {
     queryFn: () => api.get(`/invoices/${id}`),
   });
 
+  // One batched request for the invoice's and its payments' audit trail
+  const canSeeAudit = !!user && ['ADMIN', 'AUDITOR', 'APPROVER'].includes(user.role);
+  const { data: histories } = useQuery<AuditEntityHistory[]>({
+    queryKey: ['invoice-timeline', id, inv?.payments.length],
+    queryFn: () => api.post('/audit/entity/batch', {
+      entities: [
+        { entity_type: 'invoice', entity_id: id },
+        ...(inv?.payments || []).map(p => ({ entity_type: 'payment', entity_id: p.id })),
+      ],
+    }),
+    enabled: canSeeAudit && !!inv,
+  });
+  const timeline = (histories || [])
+    .flatMap(h => h.events)
+    .sort((a, b) => a.timestamp.localeCompare(b.timestamp));
+
   const approve = useMutation({
     mutationFn: () => api.post(`/invoices/${id}/approve`),
-    onSuccess: () => { qc.invalidateQueries({ queryKey: ['invoice', id] }); qc.invalidateQueries({ queryKey: ['invoices'] }); },
+    onSuccess: () => { qc.invalidateQueries({ queryKey: ['invoice', id] }); qc.invalidateQueries({ queryKey: ['invoices'] }); qc.invalidateQueries({ queryKey: ['invoice-timeline', id] }); },
   });
 
   const reject = useMutation({
     mutationFn: () => api.post(`/invoices/${id}/reject`),
-    onSuccess: () => { qc.invalidateQueries({ queryKey: ['invoice', id] }); qc.invalidateQueries({ queryKey: ['invoices'] }); },
+    onSuccess: () => { qc.invalidateQueries({ queryKey: ['invoice', id] }); qc.invalidateQueries({ queryKey: ['invoices'] }); qc.invalidateQueries({ queryKey: ['invoice-timeline', id] }); },
   });
 
   const markPaid = useMutation({
     mutationFn: () => api.post(`/invoices/${id}/mark-paid`),
-    onSuccess: () => { qc.invalidateQueries({ queryKey: ['invoice', id] }); qc.invalidateQueries({ queryKey: ['invoices'] }); },
+    onSuccess: () => { qc.invalidateQueries({ queryKey: ['invoice', id] }); qc.invalidateQueries({ queryKey: ['invoices'] }); qc.invalidateQueries({ queryKey: ['invoice-timeline', id] }); },
   });
 
   if (isLoading) return <div className="flex items-center justify-center h-64"><div className="animate-spin rounded-full h-8 w-8 border-b-2 border-brand-600" /></div>;
@@ -152,6 +168,26 @@ function InvoiceDetail() {
               </div>
             </div>
           )}
+
+          {/* Audit Timeline */}
+          {timeline.length > 0 && (
+            <div className="card p-6">
+              <h3 className="text-sm font-semibold text-gray-900 mb-3 flex items-center gap-2"><Clock className="w-4 h-4 text-gray-400" /> Timeline</h3>
+              <div className="space-y-3">
+                {timeline.map(ev => (
+                  <div key={ev.id} className="flex items-start gap-3">
+                    <div className="w-6 h-6 rounded-full flex items-center justify-center bg-blue-100">
+                      {ev.actor_user_id ? <User className="w-3 h-3 text-blue-700" /> : <FileText className="w-3 h-3 text-blue-700" />}
+                    </div>
+                    <div>
+                      <p className="text-sm font-medium text-gray-900">{ev.action}</p>
+                      <p className="text-xs text-gray-500">{formatDateTime(ev.timestamp)}</p>
+                    </div>
+                  </div>
+                ))}
+              </div>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -1,13 +1,13 @@
 'use client';
 import AuthGuard from '@/components/layout/AuthGuard';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { api } from '@/lib/api';
 import { useAuth } from '@/lib/auth';
 import { formatCurrency, formatDate, statusColor, canUpload } from '@/lib/utils';
-import type { InvoiceListResponse } from '@/types';
+import type { InvoiceListResponse, InvoiceTextHit, VendorSuggestion } from '@/types';
 import { useState } from 'react';
 import Link from 'next/link';
-import { Upload, Search, ChevronLeft, ChevronRight } from 'lucide-react';
+import { Upload, Search, ChevronLeft, ChevronRight, FileSearch } from 'lucide-react';
 
 function UploadModal({ open, onClose }: { open: boolean; onClose: () => void }) {
   const qc = useQueryClient();
@@ -67,6 +67,56 @@ function UploadModal({ open, onClose }: { open: boolean; onClose: () => void })
   );
 }
 
+// Headlines wrap matches in <mark>; everything else is raw document text, so render it as text only
+function Headline({ text }: { text: string }) {
+  const parts = text.split(/<mark>|<\/mark>/);
+  return <>{parts.map((part, i) => (i % 2 ? <mark key={i} className="bg-yellow-100">{part}</mark> : <span key={i}>{part}</span>))}</>;
+}
+
+function DocumentSearch() {
+  const [input, setInput] = useState('');
+  const [query, setQuery] = useState('');
+
+  const { data, isFetching, hasNextPage, fetchNextPage } = useInfiniteQuery({
+    queryKey: ['invoice-text-search', query],
+    queryFn: ({ pageParam }) => {
+      const params = new URLSearchParams({ q: query, limit: '10' });
+      if (pageParam) params.set('cursor', pageParam);
+      return api.getPage<InvoiceTextHit>(`/invoices/search?${params}`);
+    },
+    initialPageParam: '',
+    getNextPageParam: last => last.nextCursor ?? undefined,
+    enabled: query.length > 0,
+  });
+  const hits = data?.pages.flatMap(p => p.items) ?? [];
+
+  return (
+    <div className="card p-4 space-y-3">
+      <form className="flex items-center gap-2" onSubmit={e => { e.preventDefault(); setQuery(input.trim()); }}>
+        <FileSearch className="w-4 h-4 text-gray-400" />
+        <input placeholder='Search document text, e.g. "PO-4471"' className="input-field flex-1" value={input} onChange={e => setInput(e.target.value)} />
+        <button type="submit" className="btn-secondary" disabled={!input.trim()}>Search</button>
+      </form>
+      {query && (
+        <ul className="divide-y divide-gray-100">
+          {hits.map(hit => (
+            <li key={hit.id} className="py-2">
+              <Link href={`/invoices/${hit.id}`} className="text-sm font-medium text-brand-600 hover:text-brand-700">
+                {hit.invoice_number || 'No number'} · {hit.vendor || '—'}
+              </Link>
+              <p className="text-xs text-gray-600 mt-0.5"><Headline text={hit.headline} /></p>
+            </li>
+          ))}
+          {!isFetching && !hits.length && <li className="py-2 text-sm text-gray-400">No documents match</li>}
+        </ul>
+      )}
+      {hasNextPage && (
+        <button onClick={() => fetchNextPage()} disabled={isFetching} className="btn-secondary py-1 px-2 text-xs">Load more</button>
+      )}
+    </div>
+  );
+}
+
 function InvoicesContent() {
   const { user } = useAuth();
   const [page, setPage] = useState(1);
@@ -84,7 +134,14 @@ function InvoicesContent() {
     },
   });
 
-  const statuses = ['', 'NEW', 'VALIDATED', 'APPROVAL_PENDING', 'APPROVED', 'REJECTED', 'PAID'];
+  const { data: vendorSuggestions } = useQuery<VendorSuggestion[]>({
+    queryKey: ['vendor-suggest', vendorFilter],
+    queryFn: () => api.get(`/invoices/vendors/suggest?${new URLSearchParams({ prefix: vendorFilter })}`),
+    enabled: vendorFilter.trim().length > 0,
+    staleTime: 60_000,
+  });
+
+  const statuses = ['', 'NEW', 'EXTRACTED', 'VALIDATED', 'APPROVAL_PENDING', 'APPROVED', 'REJECTED', 'PAID'];
 
   return (
     <div className="space-y-6">
@@ -102,7 +159,10 @@ function InvoicesContent() {
       <div className="card p-4 flex flex-wrap gap-3">
         <div className="flex items-center gap-2">
           <Search className="w-4 h-4 text-gray-400" />
-          <input placeholder="Search vendor..." className="input-field w-48" value={vendorFilter} onChange={e => { setVendorFilter(e.target.value); setPage(1); }} />
+          <input placeholder="Search vendor..." className="input-field w-48" list="vendor-suggestions" value={vendorFilter} onChange={e => { setVendorFilter(e.target.value); setPage(1); }} />
+          <datalist id="vendor-suggestions">
+            {vendorSuggestions?.map(s => <option key={s.vendor} value={s.vendor}>{s.invoice_count} invoices</option>)}
+          </datalist>
         </div>
         <select className="input-field w-48" value={statusFilter} onChange={e => { setStatusFilter(e.target.value); setPage(1); }}>
           <option value="">All Statuses</option>
@@ -110,6 +170,8 @@ function InvoicesContent() {
         </select>
       </div>
 
+      <DocumentSearch />
+
       {/* Table */}
       <div className="card overflow-hidden">
         <table className="w-full">
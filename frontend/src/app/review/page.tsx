@@ -1,28 +1,72 @@
 'use client';
 import AuthGuard from '@/components/layout/AuthGuard';
-import { useQuery } from '@tanstack/react-query';
+import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { api } from '@/lib/api';
+import { useEventStream } from '@/lib/stream';
 import { useAuth } from '@/lib/auth';
 import { formatCurrency, formatDate, formatDateTime, statusColor, canApprove } from '@/lib/utils';
-import type { InvoiceListResponse } from '@/types';
+import type { Invoice, InvoiceListResponse } from '@/types';
 import { useState } from 'react';
 import Link from 'next/link';
-import { ClipboardList, Mail, Upload, ChevronLeft, ChevronRight, AlertCircle } from 'lucide-react';
+import { useRouter } from 'next/navigation';
+import { ClipboardList, Mail, Upload, ChevronLeft, ChevronRight, AlertCircle, Lock } from 'lucide-react';
+
+// Mirrors review_queue in backend/app/api/routers/invoices.py
+const REVIEW_STATUSES = ['NEW', 'VALIDATED', 'APPROVAL_PENDING'];
 
 function ReviewQueueContent() {
   const { user } = useAuth();
+  const router = useRouter();
   const [page, setPage] = useState(1);
   const [sourceFilter, setSourceFilter] = useState('');
+  const [exceptionFilter, setExceptionFilter] = useState('');
 
   const { data, isLoading } = useQuery<InvoiceListResponse>({
-    queryKey: ['review-queue', page, sourceFilter],
+    queryKey: ['review-queue', page, sourceFilter, exceptionFilter],
     queryFn: () => {
       const params = new URLSearchParams({ page: String(page), page_size: '20' });
       if (sourceFilter) params.set('source', sourceFilter);
+      if (exceptionFilter) params.set('exception_code', exceptionFilter);
       return api.get(`/invoices/review-queue?${params}`);
     },
   });
 
+  // Live deltas: patch the visible page in place; only a new arrival needs a re-fetch
+  const qc = useQueryClient();
+  useEventStream({
+    invoice: (ev) => {
+      const key = ['review-queue', page, sourceFilter, exceptionFilter];
+      const current = qc.getQueryData<InvoiceListResponse>(key);
+      if (!current) return;
+      const inQueue = REVIEW_STATUSES.includes(ev.status);
+      const onPage = current.items.some(i => i.id === ev.id);
+      if (onPage) {
+        qc.setQueryData<InvoiceListResponse>(key, {
+          ...current,
+          items: inQueue
+            ? current.items.map(i => (i.id === ev.id ? { ...i, status: ev.status } : i))
+            : current.items.filter(i => i.id !== ev.id),
+          total: inQueue ? current.total : current.total - 1,
+        });
+      } else if (inQueue && !(ev.previous_status && REVIEW_STATUSES.includes(ev.previous_status))) {
+        if (!sourceFilter || sourceFilter === ev.source) qc.invalidateQueries({ queryKey: ['review-queue'] });
+      }
+    },
+    overflow: () => qc.invalidateQueries({ queryKey: ['review-queue'] }),
+  });
+
+  // Claim a batch so no other approver works the same invoices, then open the first one
+  const claimNext = useMutation({
+    mutationFn: () => api.post<Invoice[]>(`/invoices/review-queue/claim?limit=5${sourceFilter ? `&source=${sourceFilter}` : ''}`),
+    onSuccess: (claimed) => {
+      qc.invalidateQueries({ queryKey: ['review-queue'] });
+      if (claimed.length) router.push(`/invoices/${claimed[0].id}`);
+    },
+  });
+  const isDuplicate = (inv: Invoice) => inv.exceptions.some(e => e.code === 'DUPLICATE_INVOICE' && !e.resolved_at);
+  const claimedByOther = (inv: Invoice) =>
+    !!inv.claimed_by_user_id && inv.claimed_by_user_id !== user?.id && !!inv.claimed_until && new Date(inv.claimed_until + 'Z') > new Date();
+
   return (
     <div className="space-y-6">
       <div className="flex items-center justify-between">
@@ -32,6 +76,11 @@ function ReviewQueueContent() {
             {data?.total || 0} invoice{(data?.total || 0) !== 1 ? 's' : ''} awaiting review
           </p>
         </div>
+        {user && canApprove(user.role) && (
+          <button onClick={() => claimNext.mutate()} disabled={claimNext.isPending} className="btn-primary">
+            Claim next 5
+          </button>
+        )}
       </div>
 
       {/* Filters */}
@@ -45,6 +94,14 @@ function ReviewQueueContent() {
           <option value="EMAIL">Email Ingested</option>
           <option value="UPLOAD">Manual Upload</option>
         </select>
+        <select
+          className="input-field w-48"
+          value={exceptionFilter}
+          onChange={e => { setExceptionFilter(e.target.value); setPage(1); }}
+        >
+          <option value="">All Exceptions</option>
+          <option value="DUPLICATE_INVOICE">Possible Duplicates</option>
+        </select>
       </div>
 
       {/* Table */}
@@ -103,6 +160,11 @@ function ReviewQueueContent() {
                   <span className={`inline-flex px-2 py-0.5 text-xs font-medium rounded-full ${statusColor(inv.status)}`}>
                     {inv.status}
                   </span>
+                  {claimedByOther(inv) && (
+                    <span className="ml-1 inline-flex items-center text-xs text-gray-400" title="Claimed by another approver">
+                      <Lock className="w-3 h-3" />
+                    </span>
+                  )}
                 </td>
                 <td className="px-4 py-3 text-center">
                   {inv.exceptions.length > 0 ? (
@@ -110,6 +172,11 @@ function ReviewQueueContent() {
                       <AlertCircle className="w-3 h-3" />{inv.exceptions.length}
                     </span>
                   ) : <span className="text-xs text-gray-400">—</span>}
+                  {isDuplicate(inv) && (
+                    <span className="ml-1 inline-flex px-2 py-0.5 text-xs font-medium rounded-full bg-orange-100 text-orange-700">
+                      Duplicate?
+                    </span>
+                  )}
                 </td>
                 <td className="px-4 py-3 text-xs text-gray-500">{formatDateTime(inv.created_at)}</td>
               </tr>
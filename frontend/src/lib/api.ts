@@ -1,6 +1,6 @@
 const API_BASE = '/api';
 
-async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
+async function request<T>(path: string, options: RequestInit = {}, onHeaders?: (headers: Headers) => void): Promise<T> {
   const token = typeof window !== 'undefined' ? localStorage.getItem('token') : null;
   const headers: Record<string, string> = {
     ...(options.headers as Record<string, string> || {}),
@@ -30,6 +30,7 @@ async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
     throw new Error(err.detail || 'Request failed');
   }
 
+  onHeaders?.(res.headers);
   const contentType = res.headers.get('content-type') || '';
   if (contentType.includes('application/json')) {
     return res.json();
@@ -39,6 +40,12 @@ async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
 
 export const api = {
   get: <T>(path: string) => request<T>(path),
+  // Keyset-paginated lists return the cursor for the next page in X-Next-Cursor
+  getPage: async <T>(path: string): Promise<{ items: T[]; nextCursor: string | null }> => {
+    let nextCursor: string | null = null;
+    const items = await request<T[]>(path, {}, headers => { nextCursor = headers.get('X-Next-Cursor'); });
+    return { items, nextCursor };
+  },
   post: <T>(path: string, body?: unknown) =>
     request<T>(path, { method: 'POST', body: body ? JSON.stringify(body) : undefined }),
   patch: <T>(path: string, body: unknown) =>
@@ -0,0 +1,35 @@
+import { useEffect, useRef } from 'react';
+
+export interface InvoiceStatusEvent {
+  id: string;
+  status: string;
+  previous_status: string | null;
+  vendor: string;
+  invoice_number: string;
+  source: string;
+}
+
+type Handlers = {
+  audit?: (data: unknown) => void;
+  invoice?: (data: InvoiceStatusEvent) => void;
+  // Sent when this client fell behind and missed deltas; re-fetch instead of patching
+  overflow?: () => void;
+};
+
+/** Subscribe to /api/stream/events (SSE) for the lifetime of the component. */
+export function useEventStream(handlers: Handlers, enabled: boolean = true) {
+  const ref = useRef(handlers);
+  ref.current = handlers;
+
+  useEffect(() => {
+    if (!enabled || typeof window === 'undefined') return;
+    const source = new EventSource('/api/stream/events', { withCredentials: true });
+    const onAudit = (e: MessageEvent) => ref.current.audit?.(JSON.parse(e.data));
+    const onInvoice = (e: MessageEvent) => ref.current.invoice?.(JSON.parse(e.data));
+    const onOverflow = () => ref.current.overflow?.();
+    source.addEventListener('audit', onAudit);
+    source.addEventListener('invoice', onInvoice);
+    source.addEventListener('overflow', onOverflow);
+    return () => source.close();
+  }, [enabled]);
+}
@@ -57,6 +57,8 @@ export interface Invoice {
   email_subject: string | null;
   email_from: string | null;
   attachment_count: number;
+  claimed_by_user_id: string | null;
+  claimed_until: string | null;
   created_at: string;
   updated_at: string;
   exceptions: InvoiceException[];
@@ -71,6 +73,20 @@ export interface InvoiceListResponse {
   page_size: number;
 }
 
+export interface InvoiceSearchHit extends Invoice {
+  score: number;
+}
+
+export interface InvoiceTextHit extends Invoice {
+  score: number;
+  headline: string;
+}
+
+export interface VendorSuggestion {
+  vendor: string;
+  invoice_count: number;
+}
+
 export interface AuditEvent {
   id: string;
   tenant_id: string;
@@ -82,11 +98,19 @@ export interface AuditEvent {
   metadata_json: Record<string, unknown> | null;
 }
 
+export interface AuditEntityHistory {
+  entity_type: string;
+  entity_id: string;
+  events: AuditEvent[];
+}
+
 export interface OverviewData {
   total_invoices: number;
   by_status: Record<string, number>;
   total_paid: number;
   total_exceptions: number;
+  open_exceptions: number;
+  invoices_with_open_exceptions: number;
   clean_invoice_count: number;
   clean_invoice_pct: number;
 }
@@ -127,7 +151,24 @@ export interface TenantSettings {
   name: string;
   inbound_email_alias: string;
   allowed_currencies: string;
+  settings_version: number;
+  created_at: string;
+  revalidation_job_id?: string | null;
+}
+
+export interface RevalidationJob {
+  id: string;
+  settings_version: number;
+  status: 'PENDING' | 'RUNNING' | 'DONE' | 'FAILED' | 'SUPERSEDED';
+  total: number | null;
+  processed: number;
+  progress: number;
+  exceptions_resolved: number;
+  exceptions_created: number;
+  error: string | null;
   created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
 }
 
 export type Role = 'ADMIN' | 'AUDITOR' | 'APPROVER' | 'UPLOADER' | 'VIEWER';